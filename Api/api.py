@@ -2,25 +2,46 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from pymongo import MongoClient
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
 import sys
 import os
+import threading
+from datetime import datetime, timezone
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from Model.educator_agent.combined_agent import CombinedEducationalAgent
+from Model.pdf_agent.index_store import index_exists
+from chat_log import ChatLog
+from ingestion import IngestionQueue, QueueFullError, index_dir_for, is_deleted_pdf
+from pdf_storage import PdfStorage
+from request_metrics import MongoCommandMetrics, init_request_metrics
+from traffic_capture import init_traffic_capture
 
 app = Flask(__name__)
 CORS(app)  # Permite cereri din orice origine
+init_request_metrics(app)  # Latențe pe etape, expuse pe /metrics
+init_traffic_capture(app)  # Opțional: înregistrarea sesiunilor pentru reluare (TRAFFIC_CAPTURE_FILE)
 
 UPLOAD_FOLDER = 'uploads/'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+INDEX_FOLDER = 'indexes/'
+app.config['INDEX_FOLDER'] = INDEX_FOLDER
 
-# Asigurăm că folderul există
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+# Asigurăm că folderele există
+for folder in (UPLOAD_FOLDER, INDEX_FOLDER):
+    if not os.path.exists(folder):
+        os.makedirs(folder)
 
-ai = AiResponse(api_key='key')
+# Cheile API se citesc din variabilele de mediu
+ai = CombinedEducationalAgent(
+    openai_api_key=os.environ.get("OPENAI_API_KEY"),
+    groq_api_key=os.environ.get("GROQ_API_KEY")
+)
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
 
 try:
-    client = MongoClient("mongodb://localhost:27017/")
+    # connect=False: conexiunile se deschid la prima interogare, deci după fork în serve.py
+    client = MongoClient(MONGO_URI, connect=False, event_listeners=[MongoCommandMetrics()])
     db = client["databaseAPI"]
     print("Conexiune la MongoDB reușită!")
 except Exception as e:
@@ -31,7 +52,47 @@ users_collection = db["users"]             # Documente: { "userID": <int>, "user
 courses_collection = db["courses"]           # Documente: { "courseID": <int>, "courseName": <str>, "specializationID": <int>, "description": <str> }
 specializations_collection = db["specializations"]  # Documente: { "specializationID": <int>, "specializationName": <str> }
 lectures_collection = db["lectures"]         # Documente: { "lectureName": <str> }
-chat_prompts_collection = db["chatPrompts"]  # Documente: { "chat": <str> }
+chat_log = ChatLog(db)                       # Documente: vezi chat_log.py (chatPrompts)
+
+def get_qa_agent():
+    ai._ensure_qa_agent()
+    return ai.qa_agent
+
+def get_embedding_model():
+    # Modelul agentului QA, refolosit de căutarea web; None dacă agentul nu este disponibil
+    qa_agent = get_qa_agent()
+    return qa_agent.embedding_model if qa_agent is not None else None
+
+# PDF-urile încărcate sunt salvate după hash-ul conținutului (vezi pdf_storage.py)
+pdf_storage = PdfStorage(db["pdfBlobs"], UPLOAD_FOLDER)
+# și procesate în fundal (vezi ingestion.py)
+ingestion_queue = IngestionQueue(get_qa_agent, courses_collection, INDEX_FOLDER, pdf_storage=pdf_storage,
+                                 jobs_collection=db["ingestionJobs"])
+
+# Starea încălzirii (modelul de embedding și indecșii cursurilor populare), raportată pe /ready.
+# serve.py o completează înainte de a porni procesele; serverul de dezvoltare pornește fără încălzire.
+readiness = {"ready": False, "modelLoaded": False, "indexesLoaded": 0, "warmupSeconds": None}
+
+# Asistentul de căutare web este creat la prima cerere și refolosit de toate cererile următoare
+web_search = None
+web_search_lock = threading.Lock()
+
+def get_web_search():
+    global web_search
+    with web_search_lock:
+        if web_search is None:
+            from Model.scraping_agent.ai_search_engine import WebSearchAssistant
+            web_search = WebSearchAssistant(
+                openai_api_key=os.environ.get("OPENAI_API_KEY"),
+                serp_api_key=os.environ.get("SERP_API_KEY"),
+                embedder_provider=get_embedding_model
+            )
+    return web_search
+
+@app.route('/ready', methods=['GET'])
+def get_ready():
+    body = {"status": "ready" if readiness["ready"] else "warming", "pid": os.getpid(), **readiness}
+    return jsonify(body), 200 if readiness["ready"] else 503
 
 # ---------------------- Endpoint-uri pentru utilizatori ----------------------
 
@@ -190,19 +251,105 @@ def upload_pdf():
         if not file.filename.lower().endswith('.pdf'):
             return jsonify({"status": "error", "message": "Fișierul nu este un PDF valid."}), 400
 
-        # 3. Salvăm fișierul pe server (sau îl procesăm dacă e necesar)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filepath)
-
-        # 4. Poți adăuga orice procesare a fișierului PDF aici (de exemplu, extragerea de text, etc.)
-
-        # 5. Răspuns JSON cu mesaj
-        return jsonify({"status": "success", "message": "Fișierul PDF a fost încărcat cu succes."}), 200
+        course_id = request.form.get("course_id", type=int)
+        pdf_title = request.form.get("pdfTitle", "").strip() or os.path.splitext(file.filename)[0]
+
+        # Versiune revizuită a unui PDF existent: `replaces` este pdf_id-ul documentului înlocuit
+        replaces = request.form.get("replaces", type=int)
+        previous_index = None
+        if replaces is not None:
+            course = courses_collection.find_one({"courseID": course_id}, {"pdfs": 1}) if course_id is not None else None
+            pdfs = course.get("pdfs", []) if course else []
+            if not 0 <= replaces < len(pdfs) or is_deleted_pdf(pdfs[replaces]):
+                return jsonify({"status": "error", "message": "PDF-ul de înlocuit nu a fost găsit în curs."}), 404
+            previous_index = pdfs[replaces].get("indexPath")
+
+        # 3. Salvăm fișierul pe server, în flux, sub numele hash-ului conținutului
+        sha256, filepath, is_new = pdf_storage.store(file.stream, course_id=course_id)
+
+        # Document deja indexat: nu mai refacem extragerea și embedding-ul
+        index_dir = index_dir_for(INDEX_FOLDER, filepath)
+        if not is_new and index_exists(index_dir):
+            pdf_id = None
+            try:
+                if course_id is not None and replaces is not None:
+                    pdf_id = ingestion_queue.replace_in_course(course_id, replaces, pdf_title, filepath, index_dir)
+                elif course_id is not None:
+                    pdf_id = ingestion_queue.attach_to_course(course_id, pdf_title, filepath, index_dir)
+            except ValueError as e:
+                # Documentul nu a fost atașat: eliberăm referința adăugată de store()
+                ingestion_queue.release_unattached(course_id, filepath, sha256=sha256)
+                return jsonify({"status": "error", "message": str(e)}), 409
+            return jsonify({
+                "status": "success",
+                "message": "Fișierul PDF există deja și este gata de utilizare.",
+                "sha256": sha256,
+                "pdf_id": pdf_id
+            }), 200
+
+        # 4. Extragerea, embedding-ul și indexarea rulează în fundal; clientul urmărește job-ul
+        try:
+            job_id = ingestion_queue.submit(filepath, pdf_title, course_id=course_id, replaces=replaces,
+                                            previous_index=previous_index, sha256=sha256)
+        except QueueFullError as e:
+            ingestion_queue.release_unattached(course_id, filepath, sha256=sha256)
+            return jsonify({"status": "error", "message": str(e)}), 503
+
+        # 5. Răspuns JSON cu id-ul job-ului
+        return jsonify({
+            "status": "success",
+            "message": "Fișierul PDF a fost încărcat și este în curs de procesare.",
+            "sha256": sha256,
+            "job_id": job_id
+        }), 202
 
     except Exception as e:
         # 6. Gestionarea erorilor
         return jsonify({"status": "error", "message": f"Eroare la procesarea fișierului: {str(e)}"}), 500
 
+@app.route('/upload-pdf/<job_id>', methods=['GET'])
+def get_upload_status(job_id):
+    job = ingestion_queue.status(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job-ul nu a fost găsit."}), 404
+    return jsonify({"status": "success", "job": job})
+
+@app.route('/course/pdf', methods=['DELETE'])
+def delete_course_pdf():
+    try:
+        data = request.get_json(silent=True) or {}
+        course_id = data.get("course_id")
+        pdf_id = data.get("pdf_id")
+        if course_id is None or pdf_id is None:
+            return jsonify({"status": "error", "message": "Parametrii 'course_id' și 'pdf_id' sunt necesari."}), 400
+        if not isinstance(course_id, int) or not isinstance(pdf_id, int) or isinstance(pdf_id, bool):
+            return jsonify({"status": "error", "message": "Parametrii 'course_id' și 'pdf_id' trebuie să fie numere întregi."}), 400
+
+        course = courses_collection.find_one({"courseID": course_id}, {"pdfs": 1})
+        pdfs = course.get("pdfs", []) if course else []
+        if not 0 <= pdf_id < len(pdfs) or is_deleted_pdf(pdfs[pdf_id]):
+            return jsonify({"status": "error", "message": "PDF-ul nu a fost găsit."}), 404
+
+        # pdf_id este poziția în listă (folosită de /sample-page, jurnalul de chat, job-urile de
+        # înlocuire), deci nu scoatem intrarea din listă: o înlocuim cu un marcaj de ștergere,
+        # ca pozițiile PDF-urilor următoare să rămână aceleași
+        pdf = pdfs[pdf_id]
+        result = courses_collection.update_one(
+            {"courseID": course_id, f"pdfs.{pdf_id}.pdfPath": pdf.get("pdfPath")},
+            {"$set": {f"pdfs.{pdf_id}": {"deleted": True, "pdfTitle": pdf.get("pdfTitle"),
+                                          "deletedAt": datetime.now(timezone.utc).isoformat()}}}
+        )
+        if result.modified_count == 0:
+            return jsonify({"status": "error", "message": "Lista de PDF-uri a cursului s-a modificat între timp."}), 409
+
+        # Fișierul și indexul se șterg doar când niciun curs nu mai folosește documentul
+        sha256 = os.path.splitext(os.path.basename(pdf["pdfPath"]))[0]
+        removed = pdf_storage.release(sha256, course_id, index_dir=pdf.get("indexPath"))
+        return jsonify({"status": "success", "message": "PDF eliminat din curs.", "file_removed": removed})
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"Eroare la ștergerea PDF-ului: {str(e)}"}), 500
+
 @app.route('/lectures', methods=['GET'])
 def get_lectures():
     lectures = list(lectures_collection.find())
@@ -240,6 +387,7 @@ def post_chat_prompt():
         chat_text = data.get("chat") if data else None
         course_id = data.get("course_id") if data else None
         pdf_id = data.get("pdf_id") if data else None
+        user_id = data.get("user_id") if data else None
         print(pdf_id)
         # Verificăm dacă datele esențiale sunt furnizate
         if not isinstance(chat_text, str) or not chat_text.strip():
@@ -258,27 +406,38 @@ def post_chat_prompt():
                 # Găsim PDF-ul asociat în lecțiile cursului pe baza pdf_id
                 if pdf_id is not None:
                     pdf = next((pdf for index, pdf in enumerate(course.get('pdfs', [])) if index == pdf_id), None)
+                    # PDF-urile șterse din curs rămân în listă doar ca marcaj
+                    if pdf is not None and is_deleted_pdf(pdf):
+                        pdf = None
                     if pdf:
                         print(f"PDF găsit: {pdf['pdfTitle']} - {pdf['pdfPath']}")
-                        pdf_path = pdf
+                        pdf_path = pdf['pdfPath']
 
         print("here")
+        # Documentul este ales pentru fiecare cerere și transmis agentului, nu încărcat în el:
+        # cererile simultane (mai multe fire în fiecare proces) pot întreba despre PDF-uri diferite
+        document = None
         if pdf is not None :
-            ai.load_pdf(pdf_path=pdf_path)
+            # Folosim indexul construit la upload, dacă există; altfel procesăm PDF-ul acum
+            index_path = pdf.get('indexPath')
+            if index_path and index_exists(index_path):
+                document = ai.open_document(index_dir=index_path)
+            else:
+                document = ai.open_document(pdf_path=pdf_path)
             print(pdf)
 
-        ai_response = ai.query(chat_text)
+        ai_response = ai.query(chat_text, document=document)
         print(ai_response['answer'])
         resp = ai_response['answer']
-        # Creăm prompt-ul de chat
-        chat_prompt = {
-            "chat": chat_text,
-            "ai_response": resp
-        }
-
-        # Inserăm prompt-ul de chat în colecția de chat
-        result = chat_prompts_collection.insert_one(chat_prompt)
-        inserted_id = str(result.inserted_id)
+        # Salvăm prompt-ul de chat în jurnal, împreună cu utilizatorul, cursul și PDF-ul
+        inserted_id = chat_log.record(
+            chat_text,
+            resp,
+            user_id=user_id,
+            course_id=course_id,
+            pdf_id=pdf_id,
+            mode=ai_response.get('mode')
+        )
 
         # Returnăm un răspuns de succes
         return jsonify({
@@ -286,6 +445,7 @@ def post_chat_prompt():
             "message": "Chat prompt adăugat și procesat de AI.",
             "prompt_id": inserted_id,
             "ai_response": resp,
+            "mode": ai_response.get('mode'),
             "course_id": course_id,
             "pdf_id": pdf_id
         })
@@ -294,7 +454,60 @@ def post_chat_prompt():
         print("❌ Eroare:", e)
         return jsonify({"status": "error", "message": f"Eroare la salvare: {str(e)}"}), 500
 
+@app.route('/web-search', methods=['POST'])
+def post_web_search():
+    data = request.get_json(silent=True) or {}
+    question = data.get("question")
+    if not isinstance(question, str) or not question.strip():
+        return jsonify({"status": "error", "message": "Întrebarea este necesară."}), 400
+    source = data.get("source", "general")
+    lang = data.get("lang")
+    if lang not in (None, "ro", "en"):
+        return jsonify({"status": "error", "message": "Limba trebuie să fie 'ro' sau 'en'."}), 400
+
+    try:
+        reply = get_web_search().answer(
+            question.strip(),
+            domain=data.get("domain") or "general",
+            level=data.get("level") or "elev",
+            source=source,
+            lang=lang
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        print("❌ Eroare la căutarea web:", e)
+        return jsonify({"status": "error", "message": f"Eroare la căutarea web: {str(e)}"}), 500
+
+    inserted_id = chat_log.record(question.strip(), reply["answer"], user_id=data.get("user_id"), mode="web")
+    return jsonify({
+        "status": "success",
+        "prompt_id": inserted_id,
+        "ai_response": reply["answer"],
+        "lang": reply["lang"],
+        "sources": reply["sources"]
+    })
+
+@app.route('/chat-history', methods=['GET'])
+def get_chat_history():
+    user_id = request.args.get("user_id", "").strip() or None
+    course_id = request.args.get("course_id", type=int)
+    limit = request.args.get("limit", default=20, type=int)
+    before = request.args.get("before", "").strip() or None
+
+    if user_id is None and course_id is None:
+        return jsonify({"status": "error", "message": "Parametrul 'user_id' sau 'course_id' este necesar."}), 400
+
+    try:
+        messages, next_cursor = chat_log.history(user_id=user_id, course_id=course_id, limit=limit, before=before)
+    except InvalidId:
+        return jsonify({"status": "error", "message": "Cursorul 'before' nu este valid."}), 400
+
+    return jsonify({"status": "success", "messages": messages, "next_cursor": next_cursor})
+
 
 if __name__ == '__main__':
+    # Server de dezvoltare; în producție folosiți serve.py
+    readiness["ready"] = True
     app.run(threaded=True,debug=True, host='127.0.0.1', port=5000)
 
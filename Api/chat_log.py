@@ -0,0 +1,165 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+# Jurnalul de chat: fiecare mesaj păstrează utilizatorul, cursul, PDF-ul și momentul
+# în care a fost trimis. Documente:
+# { "userID": <str>, "courseID": <int>, "pdfID": <int>, "mode": <str>,
+#   "chat": <str>, "ai_response": <str>, "createdAt": <datetime> }
+
+CHAT_COLLECTION = "chatPrompts"
+
+# Opțional: mesajele mai vechi de CHAT_TTL_DAYS zile sunt șterse automat de MongoDB.
+CHAT_TTL_DAYS = int(os.environ.get("CHAT_TTL_DAYS", "0"))
+# Opțional: câte o colecție pe lună (chatPrompts_YYYYMM), ca istoricul vechi să poată fi
+# arhivat sau șters cu un simplu drop, fără să încarce indecșii colecției curente.
+CHAT_PARTITION_MONTHLY = os.environ.get("CHAT_PARTITION_MONTHLY", "0") == "1"
+# Câte partiții lunare parcurgem înapoi când completăm o pagină de istoric.
+CHAT_HISTORY_MAX_MONTHS = int(os.environ.get("CHAT_HISTORY_MAX_MONTHS", "24"))
+
+MAX_PAGE_SIZE = 100
+
+
+class ChatLog:
+    def __init__(self, db):
+        self.db = db
+        self._indexed = set()
+
+    def _collection_name(self, moment):
+        if not CHAT_PARTITION_MONTHLY:
+            return CHAT_COLLECTION
+        return f"{CHAT_COLLECTION}_{moment.year:04d}{moment.month:02d}"
+
+    def _collection(self, moment):
+        name = self._collection_name(moment)
+        collection = self.db[name]
+        if name not in self._indexed:
+            self._ensure_indexes(collection)
+            self._indexed.add(name)
+        return collection
+
+    def _ensure_indexes(self, collection):
+        # _id (ObjectId) crește odată cu timpul, deci îl folosim drept cursor de paginare:
+        # interogările de istoric devin un simplu range scan pe index, oricât de mare e colecția.
+        collection.create_index(
+            [("userID", ASCENDING), ("courseID", ASCENDING), ("_id", DESCENDING)],
+            name="user_course_recent"
+        )
+        # Istoricul unui utilizator fără filtru de curs: user_course_recent nu dă ordinea după _id
+        # (courseID este între cele două câmpuri), deci ar trebui sortate în memorie toate mesajele lui
+        collection.create_index(
+            [("userID", ASCENDING), ("_id", DESCENDING)],
+            name="user_recent"
+        )
+        collection.create_index(
+            [("courseID", ASCENDING), ("_id", DESCENDING)],
+            name="course_recent"
+        )
+
+        # createdAt este indexat mereu (hot_pdfs filtrează după el); indexul devine TTL doar dacă
+        # CHAT_TTL_DAYS este setat. MongoDB nu permite două indexuri pe aceeași cheie, deci
+        # refolosim indexul existent și îi schimbăm durata cu collMod.
+        ttl = CHAT_TTL_DAYS * 24 * 3600
+        created_at = next((info for info in collection.index_information().values()
+                           if list(info["key"]) == [("createdAt", ASCENDING)]), None)
+        if created_at is None:
+            if ttl > 0:
+                collection.create_index("createdAt", name="createdAt_ttl", expireAfterSeconds=ttl)
+            else:
+                collection.create_index("createdAt", name="createdAt_recent")
+        elif ttl > 0 and created_at.get("expireAfterSeconds") != ttl:
+            self.db.command("collMod", collection.name,
+                            index={"keyPattern": {"createdAt": ASCENDING}, "expireAfterSeconds": ttl})
+
+    def record(self, chat, ai_response, user_id=None, course_id=None, pdf_id=None, mode=None):
+        now = datetime.now(timezone.utc)
+        document = {
+            "userID": user_id,
+            "courseID": course_id,
+            "pdfID": pdf_id,
+            "mode": mode,
+            "chat": chat,
+            "ai_response": ai_response,
+            "createdAt": now
+        }
+        result = self._collection(now).insert_one(document)
+        return str(result.inserted_id)
+
+    def hot_pdfs(self, limit=10, days=7):
+        # PDF-urile cu cele mai multe întrebări în ultimele `days` zile: [(courseID, pdfID), ...]
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(days=days)
+        pipeline = [
+            {"$match": {"createdAt": {"$gte": since},
+                        "courseID": {"$ne": None}, "pdfID": {"$ne": None}}},
+            {"$group": {"_id": {"courseID": "$courseID", "pdfID": "$pdfID"}, "count": {"$sum": 1}}}
+        ]
+
+        # Fără partiționare toate lunile sunt în aceeași colecție; altfel numărăm în fiecare
+        # partiție lunară din interval și adunăm rezultatele
+        if CHAT_PARTITION_MONTHLY:
+            first_month = datetime(since.year, since.month, 1, tzinfo=timezone.utc)
+            existing = set(self.db.list_collection_names())
+            months = [month for month in self._months_back(now)
+                      if month >= first_month and self._collection_name(month) in existing]
+        else:
+            months = [now]
+
+        counts = {}
+        for month in months:
+            # Prin _collection: colecțiile create înainte de indexul pe createdAt îl primesc acum
+            for row in self._collection(month).aggregate(pipeline):
+                key = (row["_id"]["courseID"], row["_id"]["pdfID"])
+                counts[key] = counts.get(key, 0) + row["count"]
+        return sorted(counts, key=counts.get, reverse=True)[:limit]
+
+    def _months_back(self, start):
+        year, month = start.year, start.month
+        for _ in range(CHAT_HISTORY_MAX_MONTHS):
+            yield datetime(year, month, 1, tzinfo=timezone.utc)
+            month -= 1
+            if month == 0:
+                year, month = year - 1, 12
+
+    def history(self, user_id=None, course_id=None, limit=20, before=None):
+        """Returnează o pagină de mesaje, de la cel mai nou la cel mai vechi.
+
+        `before` este cursorul întors de pagina anterioară (id-ul ultimului mesaj).
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        query = {}
+        if user_id is not None:
+            query["userID"] = user_id
+        if course_id is not None:
+            query["courseID"] = course_id
+
+        if before:
+            cursor_id = ObjectId(before)
+            query["_id"] = {"$lt": cursor_id}
+            start = cursor_id.generation_time
+        else:
+            start = datetime.now(timezone.utc)
+
+        months = self._months_back(start) if CHAT_PARTITION_MONTHLY else [start]
+        existing = set(self.db.list_collection_names()) if CHAT_PARTITION_MONTHLY else None
+
+        messages = []
+        for month in months:
+            name = self._collection_name(month)
+            if existing is not None and name not in existing:
+                continue
+            remaining = limit - len(messages)
+            docs = self._collection(month).find(query).sort("_id", DESCENDING).limit(remaining)
+            messages.extend(docs)
+            if len(messages) >= limit:
+                break
+
+        for message in messages:
+            message["_id"] = str(message["_id"])
+            if isinstance(message.get("createdAt"), datetime):
+                message["createdAt"] = message["createdAt"].isoformat()
+
+        next_cursor = messages[-1]["_id"] if len(messages) == limit else None
+        return messages, next_cursor
@@ -0,0 +1,412 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+# api.py adaugă rădăcina proiectului în sys.path înainte de a importa acest modul
+from Model.pdf_agent.embedding_pool import EmbeddingPool
+from Model.pdf_agent.index_store import index_exists, load_index, save_index
+from Model.pdf_agent.text_cache import extract_pages
+
+# Coada de ingestie: la upload, PDF-ul este extras, împărțit în bucăți, vectorizat și
+# indexat în fundal, apoi atașat listei `pdfs` a cursului. Astfel, documentul este gata
+# de interogat înainte ca primul student să pună o întrebare.
+#
+# Bucățile nu trec peste granița paginilor, iar indexul reține hash-ul fiecărei pagini și
+# pagina fiecărei bucăți. Când profesorul încarcă o versiune revizuită a unui PDF
+# (`replaces`), paginile neschimbate își păstrează bucățile și vectorii din indexul vechi;
+# doar paginile modificate sunt împărțite și vectorizate din nou. Versiunea veche este
+# eliberată după atașare și ștearsă de pe disc când niciun curs nu o mai folosește.
+
+INGESTION_WORKERS = int(os.environ.get("INGESTION_WORKERS", "2"))
+INGESTION_MAX_PENDING = int(os.environ.get("INGESTION_MAX_PENDING", "50"))
+INGESTION_MAX_RETRIES = int(os.environ.get("INGESTION_MAX_RETRIES", "2"))
+# Cât timp (secunde) rămân în memorie job-urile terminate; apoi starea lor este citită din Mongo
+INGESTION_JOB_RETENTION = float(os.environ.get("INGESTION_JOB_RETENTION", "3600"))
+EMBED_BATCH_SIZE = 64
+# Procese pentru embedding la încărcări masive (0 = în procesul API-ului, cu modelul agentului QA)
+INGESTION_EMBED_PROCESSES = int(os.environ.get("INGESTION_EMBED_PROCESSES", "0"))
+# Paginile scurte (titluri de slide) devin o singură bucată, altfel s-ar pierde
+MIN_PAGE_CHARS = 50
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+STOPPED_ERROR = "Procesul serverului s-a oprit înainte de finalizarea ingestiei. Încărcați documentul din nou."
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class IngestionQueue:
+    def __init__(self, qa_agent_provider, courses_collection, index_folder, pdf_storage=None,
+                 workers=INGESTION_WORKERS, max_pending=INGESTION_MAX_PENDING,
+                 max_retries=INGESTION_MAX_RETRIES, embed_processes=INGESTION_EMBED_PROCESSES,
+                 jobs_collection=None, job_retention=INGESTION_JOB_RETENTION):
+        # qa_agent_provider() întoarce instanța PDFContextQA folosită pentru extragere și embedding,
+        # ca modelul de embedding să fie încărcat o singură dată în proces
+        self.qa_agent_provider = qa_agent_provider
+        self.courses_collection = courses_collection
+        self.index_folder = index_folder
+        self.pdf_storage = pdf_storage
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.embed_processes = embed_processes
+        self.embedding_pool = None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingestion")
+        self.jobs = {}
+        # job_id -> momentul (time.monotonic) în care job-ul s-a terminat, în ordinea terminării
+        self.finished = {}
+        self.job_retention = job_retention
+        self.lock = threading.Lock()
+        # Un lacăt per document (sha256): două job-uri pentru același conținut nu construiesc
+        # indexul în paralel; al doilea îl așteaptă pe primul și apoi îl refolosește
+        self.index_locks = {}
+        # Opțional: starea job-urilor este copiată în Mongo, ca serverul cu mai multe procese
+        # (vezi serve.py) să poată răspunde la /upload-pdf/<job_id> din orice proces
+        self.jobs_collection = jobs_collection
+        # Setat de shutdown(): nu mai primim job-uri, iar cele în curs nu mai sunt reîncercate
+        self.stopping = threading.Event()
+
+    def submit(self, pdf_path, pdf_title, course_id=None, replaces=None, previous_index=None, sha256=None):
+        sha256 = sha256 or os.path.splitext(os.path.basename(pdf_path))[0]
+        with self.lock:
+            if self.stopping.is_set():
+                raise QueueFullError("Serverul se oprește, încercați din nou.")
+            self._evict_finished()
+            in_flight = [job for job in self.jobs.values() if job["status"] in (STATUS_QUEUED, STATUS_RUNNING)]
+            # Același document încărcat din nou pentru același curs (ex. două upload-uri simultane):
+            # întoarcem job-ul existent în loc să refacem ingestia
+            for job in in_flight:
+                if job["sha256"] == sha256 and job["course_id"] == course_id and job["replaces"] == replaces:
+                    return job["job_id"]
+            if len(in_flight) >= self.max_pending:
+                raise QueueFullError("Prea multe documente în curs de procesare.")
+
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "status": STATUS_QUEUED,
+                "stage": None,
+                "progress": 0.0,
+                "attempts": 0,
+                "error": None,
+                "pdfPath": pdf_path,
+                "sha256": sha256,
+                "pdfTitle": pdf_title,
+                "course_id": course_id,
+                "replaces": replaces,
+                "previousIndex": previous_index,
+                "reusedPages": 0,
+                "pdf_id": None,
+                "submittedAt": datetime.now(timezone.utc).isoformat(),
+                "finishedAt": None
+            }
+            job = dict(self.jobs[job_id])
+
+        self._publish(job)
+        self.executor.submit(self._run, job_id)
+        return job_id
+
+    def status(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job:
+                return dict(job)
+        if self.jobs_collection is not None:
+            return self.jobs_collection.find_one({"_id": job_id}, {"_id": 0})
+        return None
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            self.jobs[job_id].update(fields)
+            job = dict(self.jobs[job_id])
+            if fields.get("status") in (STATUS_DONE, STATUS_FAILED):
+                self.finished.pop(job_id, None)
+                self.finished[job_id] = time.monotonic()
+        self._publish(job)
+
+    def _evict_finished(self):
+        # Apelat cu lacătul ținut. Job-urile sunt copiate în Mongo, deci /upload-pdf/<job_id>
+        # le găsește și după ce ies din memorie (fără jobs_collection, doar în perioada de retenție)
+        cutoff = time.monotonic() - self.job_retention
+        while self.finished:
+            job_id, finished_at = next(iter(self.finished.items()))
+            if finished_at > cutoff:
+                break
+            del self.finished[job_id]
+            self.jobs.pop(job_id, None)
+
+    def _publish(self, job):
+        if self.jobs_collection is None:
+            return
+        try:
+            self.jobs_collection.replace_one({"_id": job["job_id"]}, {"_id": job["job_id"], **job}, upsert=True)
+        except Exception as e:
+            print("Eroare la salvarea stării job-ului de ingestie:", e)
+
+    def _run(self, job_id):
+        job = self.status(job_id)
+        try:
+            for attempt in range(1, self.max_retries + 2):
+                self._update(job_id, status=STATUS_RUNNING, attempts=attempt, error=None)
+                try:
+                    self._ingest(job_id, job)
+                    self._update(job_id, status=STATUS_DONE, stage=None, progress=1.0,
+                                 finishedAt=datetime.now(timezone.utc).isoformat())
+                    return
+                except Exception as e:
+                    print(f"❌ Eroare la ingestia {job['pdfPath']} (încercarea {attempt}):", e)
+                    self._update(job_id, error=str(e))
+                    # Pauză înainte de reîncercare, întreruptă dacă procesul se oprește
+                    if attempt > self.max_retries or self.stopping.wait(2 ** attempt):
+                        break
+
+            self._update(job_id, status=STATUS_FAILED, finishedAt=datetime.now(timezone.utc).isoformat())
+            self._release_failed(job)
+        finally:
+            self._release_index_lock(job["sha256"])
+
+    def shutdown(self, timeout):
+        """Oprește coada: așteaptă job-urile în curs cel mult `timeout` secunde, apoi le marchează eșuate.
+
+        Apelat de serve.py înainte ca un proces să iasă; altfel job-urile ar rămâne "running"
+        în Mongo pentru totdeauna. Întoarce numărul de job-uri marcate eșuate.
+        """
+        self.stopping.set()
+        # Job-urile care nu au pornit încă sunt anulate
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if not any(job["status"] == STATUS_RUNNING for job in self.jobs.values()):
+                    break
+            time.sleep(0.1)
+
+        with self.lock:
+            unfinished = [job_id for job_id, job in self.jobs.items() if job["status"] in (STATUS_QUEUED, STATUS_RUNNING)]
+        for job_id in unfinished:
+            self._update(job_id, status=STATUS_FAILED, error=STOPPED_ERROR,
+                         finishedAt=datetime.now(timezone.utc).isoformat())
+        for job_id in unfinished:
+            self._release_failed(self.status(job_id))
+        if self.embedding_pool is not None:
+            self.embedding_pool.close()
+        return len(unfinished)
+
+    def _release_failed(self, job):
+        try:
+            self.release_unattached(job["course_id"], job["pdfPath"], sha256=job["sha256"])
+        except Exception as e:
+            print(f"Eroare la eliberarea referinței pentru {job['pdfPath']}:", e)
+
+    def release_unattached(self, course_id, pdf_path, sha256=None):
+        # PdfStorage.store adaugă referința cursului la upload; dacă documentul nu a ajuns în
+        # lista cursului (ingestie eșuată, înlocuire respinsă), referința este eliberată aici
+        if course_id is None or self.pdf_storage is None:
+            return False
+        sha256 = sha256 or os.path.splitext(os.path.basename(pdf_path))[0]
+        with self.lock:
+            # Alt job pentru același document și curs încă poate atașa documentul
+            if any(job["sha256"] == sha256 and job["course_id"] == course_id
+                   and job["status"] in (STATUS_QUEUED, STATUS_RUNNING) for job in self.jobs.values()):
+                return False
+        course = self.courses_collection.find_one({"courseID": course_id}, {"pdfs.pdfPath": 1})
+        if course and any(pdf.get("pdfPath") == pdf_path for pdf in course.get("pdfs", [])):
+            return False
+        return self.pdf_storage.release(sha256, course_id, index_dir=index_dir_for(self.index_folder, pdf_path))
+
+    def _release_index_lock(self, sha256):
+        with self.lock:
+            if not any(job["sha256"] == sha256 and job["status"] in (STATUS_QUEUED, STATUS_RUNNING)
+                       for job in self.jobs.values()):
+                self.index_locks.pop(sha256, None)
+
+    def _ingest(self, job_id, job):
+        index_dir = index_dir_for(self.index_folder, job["pdfPath"])
+
+        with self.lock:
+            index_lock = self.index_locks.setdefault(job["sha256"], threading.Lock())
+        with index_lock:
+            # Documentul a fost deja indexat (același conținut, încărcat de alt curs sau job)
+            if not index_exists(index_dir):
+                self._build_index(job_id, job, index_dir)
+
+        # 5. Atașarea la curs, abia acum documentul devine vizibil studenților
+        self._update(job_id, stage="attach", progress=0.95)
+        if job["course_id"] is not None and job["replaces"] is not None:
+            pdf_id = self.replace_in_course(job["course_id"], job["replaces"], job["pdfTitle"], job["pdfPath"], index_dir)
+            self._update(job_id, pdf_id=pdf_id)
+        elif job["course_id"] is not None:
+            pdf_id = self.attach_to_course(job["course_id"], job["pdfTitle"], job["pdfPath"], index_dir)
+            self._update(job_id, pdf_id=pdf_id)
+
+    def _get_embedding_pool(self):
+        # Pornit la prima ingestie, nu la importul API-ului; partajat de toate job-urile
+        with self.lock:
+            if self.embedding_pool is None and self.embed_processes > 0:
+                self.embedding_pool = EmbeddingPool(processes=self.embed_processes,
+                                                    max_pending=2 * self.embed_processes)
+            return self.embedding_pool
+
+    def _build_index(self, job_id, job, index_dir):
+        qa_agent = self.qa_agent_provider()
+        if qa_agent is None:
+            raise RuntimeError("Agentul QA nu este disponibil (lipsește cheia Groq).")
+
+        # 1. Extragere text, pagină cu pagină
+        self._update(job_id, stage="extract", progress=0.05)
+        pages = extract_pages(job["pdfPath"])
+        page_hashes = [page_hash(page) for page in pages]
+
+        # Paginile versiunii anterioare, după hash: (bucăți, vectori)
+        previous = self._previous_pages(job["previousIndex"])
+
+        # 2. Împărțire în bucăți; paginile neschimbate le refolosesc pe cele vechi
+        self._update(job_id, stage="chunk", progress=0.2)
+        chunks, chunk_pages, reused_rows, new_chunks = [], [], [], []
+        reused_pages = 0
+        for page_num, (page, digest) in enumerate(zip(pages, page_hashes)):
+            if digest in previous:
+                reused_pages += 1
+                for chunk, embedding in zip(*previous[digest]):
+                    reused_rows.append((len(chunks), embedding))
+                    chunks.append(chunk)
+                    chunk_pages.append(page_num)
+            else:
+                page_chunks = qa_agent.split_into_chunks(page)
+                if not page_chunks and len(page.strip()) >= MIN_PAGE_CHARS:
+                    page_chunks = [page.strip()]
+                for chunk in page_chunks:
+                    new_chunks.append(len(chunks))
+                    chunks.append(chunk)
+                    chunk_pages.append(page_num)
+        if not chunks:
+            raise ValueError("PDF-ul nu conține text extractibil.")
+        self._update(job_id, reusedPages=reused_pages)
+
+        # 3. Embedding pe loturi (doar bucățile noi), ca să putem raporta progresul
+        self._update(job_id, stage="embed", progress=0.25)
+        texts = [chunks[i] for i in new_chunks]
+        text_batches = [texts[start:start + EMBED_BATCH_SIZE] for start in range(0, len(texts), EMBED_BATCH_SIZE)]
+        pool = self._get_embedding_pool()
+        if pool is not None:
+            # Loturile rulează în paralel pe procesele pool-ului, rezultatele vin în ordine
+            encoded = pool.imap(text_batches)
+        else:
+            encoded = (qa_agent.encode(batch) for batch in text_batches)
+        batches = []
+        for batch in encoded:
+            batches.append(np.asarray(batch, dtype=np.float32))
+            done = sum(len(b) for b in batches) / len(texts)
+            self._update(job_id, progress=0.25 + 0.65 * done)
+
+        dimension = batches[0].shape[1] if batches else len(reused_rows[0][1])
+        embeddings = np.empty((len(chunks), dimension), dtype=np.float32)
+        if batches:
+            embeddings[new_chunks] = np.vstack(batches)
+        for row, embedding in reused_rows:
+            embeddings[row] = embedding
+
+        # 4. Salvarea indexului
+        self._update(job_id, stage="index", progress=0.9)
+        save_index(index_dir, chunks, embeddings, {
+            "pdfPath": job["pdfPath"],
+            "pdfTitle": job["pdfTitle"],
+            "pageHashes": page_hashes,
+            "chunkPages": chunk_pages,
+            "reusedPages": reused_pages
+        })
+
+    def _previous_pages(self, index_dir):
+        if not index_dir or not index_exists(index_dir):
+            return {}
+        try:
+            chunks, embeddings, metadata = load_index(index_dir)
+        except Exception as e:
+            print(f"Indexul anterior {index_dir} nu poate fi citit, reconstruim tot:", e)
+            return {}
+        # Indexurile construite înainte de indexarea pe pagini nu pot fi refolosite
+        if "pageHashes" not in metadata or "chunkPages" not in metadata:
+            return {}
+
+        rows_by_page = {}
+        for row, page_num in enumerate(metadata["chunkPages"]):
+            rows_by_page.setdefault(page_num, []).append(row)
+        previous = {}
+        for page_num, digest in enumerate(metadata["pageHashes"]):
+            rows = rows_by_page.get(page_num, [])
+            previous[digest] = ([chunks[row] for row in rows], embeddings[rows])
+        return previous
+
+    def attach_to_course(self, course_id, pdf_title, pdf_path, index_dir):
+        course = self.courses_collection.find_one({"courseID": course_id}, {"pdfs": 1})
+        if course is None:
+            raise ValueError(f"Cursul {course_id} nu a fost găsit.")
+
+        # pdf_id este poziția în lista `pdfs`, la fel ca în /sample-page
+        pdfs = course.get("pdfs", [])
+        for index, pdf in enumerate(pdfs):
+            if pdf.get("pdfPath") == pdf_path:
+                return index
+
+        pdf_entry = {"pdfTitle": pdf_title, "pdfPath": pdf_path, "indexPath": index_dir}
+        self.courses_collection.update_one({"courseID": course_id}, {"$push": {"pdfs": pdf_entry}})
+        course = self.courses_collection.find_one({"courseID": course_id}, {"pdfs": 1})
+        pdfs = course.get("pdfs", [])
+        for index in range(len(pdfs) - 1, -1, -1):
+            if pdfs[index].get("pdfPath") == pdf_path:
+                return index
+        return None
+
+
+    def replace_in_course(self, course_id, pdf_id, pdf_title, pdf_path, index_dir):
+        course = self.courses_collection.find_one({"courseID": course_id}, {"pdfs": 1})
+        if course is None:
+            raise ValueError(f"Cursul {course_id} nu a fost găsit.")
+        pdfs = course.get("pdfs", [])
+        if not 0 <= pdf_id < len(pdfs):
+            raise ValueError(f"PDF-ul {pdf_id} nu există în cursul {course_id}.")
+
+        old = pdfs[pdf_id]
+        if is_deleted_pdf(old):
+            raise ValueError(f"PDF-ul {pdf_id} a fost șters din cursul {course_id}.")
+        if old.get("pdfPath") == pdf_path:
+            return pdf_id
+
+        # Noua versiune ia locul celei vechi în listă, deci pdf_id rămâne același pentru studenți
+        pdf_entry = {"pdfTitle": pdf_title, "pdfPath": pdf_path, "indexPath": index_dir}
+        result = self.courses_collection.update_one(
+            {"courseID": course_id, f"pdfs.{pdf_id}.pdfPath": old.get("pdfPath")},
+            {"$set": {f"pdfs.{pdf_id}": pdf_entry}}
+        )
+        if result.modified_count == 0:
+            raise ValueError("Lista de PDF-uri a cursului s-a modificat între timp.")
+
+        if self.pdf_storage is not None:
+            sha256 = os.path.splitext(os.path.basename(old["pdfPath"]))[0]
+            self.pdf_storage.release(sha256, course_id, index_dir=old.get("indexPath"))
+        return pdf_id
+
+
+def is_deleted_pdf(pdf):
+    # DELETE /course/pdf păstrează poziția PDF-ului în listă, cu un marcaj în locul documentului
+    return bool(pdf.get("deleted")) or not pdf.get("pdfPath")
+
+
+def page_hash(text):
+    # Spațiile albe nu contează: o pagină re-exportată identic își păstrează vectorii
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def index_dir_for(index_folder, pdf_path):
+    name = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(index_folder, name)
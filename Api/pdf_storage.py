@@ -0,0 +1,100 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from pymongo import ReturnDocument
+
+# Stocare adresată prin conținut: fiecare PDF este salvat o singură dată, sub numele
+# hash-ului SHA-256 (uploads/<sha256>.pdf), oricâți profesori l-ar încărca.
+# Documente în colecția pdfBlobs:
+# { "_id": <sha256>, "path": <str>, "size": <int>, "courses": [<courseID>, ...], "createdAt": <datetime> }
+# Lista `courses` ține evidența referințelor; când rămâne goală, fișierul și indexul se șterg.
+# store() și release() pentru același document sunt serializate cu un lacăt pe fișier (valabil
+# între procesele serverului, vezi serve.py), ca o ștergere să nu se intercaleze cu un upload.
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+# Lacătele sunt împărțite după primele caractere ale hash-ului, deci există cel mult 256 de fișiere
+LOCK_PREFIX_CHARS = 2
+
+
+class PdfStorage:
+    def __init__(self, blobs_collection, upload_folder):
+        self.blobs_collection = blobs_collection
+        self.upload_folder = upload_folder
+
+    def path_for(self, sha256):
+        return os.path.join(self.upload_folder, f"{sha256}.pdf")
+
+    @contextmanager
+    def _locked(self, sha256):
+        lock_path = os.path.join(self.upload_folder, f".lock-{sha256[:LOCK_PREFIX_CHARS]}")
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def store(self, stream, course_id=None):
+        """Scrie fluxul pe disc pe bucăți, calculând hash-ul pe parcurs.
+
+        Întoarce (sha256, cale, nou), unde `nou` este False dacă documentul exista deja.
+        """
+        tmp_path = os.path.join(self.upload_folder, f".upload-{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                while True:
+                    chunk = stream.read(STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+
+            sha256 = digest.hexdigest()
+            path = self.path_for(sha256)
+            update = {"$setOnInsert": {"path": path, "size": size, "createdAt": datetime.now(timezone.utc)}}
+            # Un upload fără curs nu adaugă nicio referință (altfel `courses` ar conține null și
+            # fișierul nu ar mai fi șters niciodată)
+            if course_id is not None:
+                update["$addToSet"] = {"courses": course_id}
+
+            # Verificarea fișierului și referința sunt făcute sub lacăt: un release() simultan
+            # fie termină ștergerea înainte (și fișierul este scris din nou), fie vede referința
+            with self._locked(sha256):
+                is_new = not os.path.exists(path)
+                if is_new:
+                    os.replace(tmp_path, path)
+                self.blobs_collection.update_one({"_id": sha256}, update, upsert=True)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return sha256, path, is_new
+
+    def release(self, sha256, course_id, index_dir=None):
+        """Elimină referința cursului; șterge fișierul (și indexul) când nu mai e folosit."""
+        with self._locked(sha256):
+            blob = self.blobs_collection.find_one_and_update(
+                {"_id": sha256},
+                {"$pull": {"courses": course_id}},
+                return_document=ReturnDocument.AFTER
+            )
+            if blob is None or blob.get("courses"):
+                return False
+
+            # Ștergem documentul doar dacă nimeni nu a adăugat o referință între timp
+            result = self.blobs_collection.delete_one({"_id": sha256, "courses": {"$size": 0}})
+            if result.deleted_count == 0:
+                return False
+
+            if os.path.exists(blob["path"]):
+                os.remove(blob["path"])
+            if index_dir and os.path.isdir(index_dir):
+                shutil.rmtree(index_dir, ignore_errors=True)
+            return True
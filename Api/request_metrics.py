@@ -0,0 +1,98 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+from flask import Response, g, request
+from pymongo import monitoring
+
+# api.py adaugă rădăcina proiectului în sys.path înainte de a importa acest modul
+from Model.monitoring.metrics import (
+    HTTP_SECONDS, MONGO_SECONDS, record_timing, render_metrics, start_request_timings, stop_request_timings
+)
+from Model.monitoring.profiler import StackSampler
+
+# Profilarea la cerere: clientul trimite antetul "X-Profile: 1", iar dacă cererea
+# durează cel puțin PROFILE_MIN_MS, stivele eșantionate se salvează în PROFILE_FOLDER
+# (format "collapsed", gata pentru flamegraph.pl / speedscope).
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILE_MIN_MS = float(os.environ.get("PROFILE_MIN_MS", "0"))
+PROFILE_FOLDER = os.environ.get("PROFILE_FOLDER", "profiles/")
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    # Măsoară durata fiecărei comenzi MongoDB (find, insert, update, ...)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, status="ok")
+        record_timing("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, status="error")
+        record_timing("mongo", event.duration_micros / 1e6)
+
+
+def _summarize(timings):
+    # Adunăm duratele pe etape: o etapă (ex. mongo) poate apărea de mai multe ori într-o cerere
+    summary = OrderedDict()
+    for name, seconds in timings:
+        entry = summary.setdefault(name, {"ms": 0.0, "count": 0})
+        entry["ms"] += seconds * 1000
+        entry["count"] += 1
+    for entry in summary.values():
+        entry["ms"] = round(entry["ms"], 2)
+    return summary
+
+
+def _server_timing_header(summary, total_ms):
+    parts = [f'{name};dur={entry["ms"]};desc="{entry["count"]}x"' for name, entry in summary.items()]
+    parts.append(f"total;dur={round(total_ms, 2)}")
+    return ", ".join(parts)
+
+
+def init_request_metrics(app):
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        g.timings_token = start_request_timings()
+        g.sampler = None
+        if PROFILING_ENABLED and request.headers.get("X-Profile") == "1":
+            g.sampler = StackSampler().start()
+
+    @app.after_request
+    def record_request_time(response):
+        start = g.get("request_start")
+        if start is None:
+            return response
+
+        total = time.perf_counter() - start
+        # Folosim regula rutei (ex. /upload-pdf/<job_id>), nu URL-ul, ca numărul de serii să rămână mic
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_SECONDS.observe(total, method=request.method, endpoint=endpoint, status=response.status_code)
+
+        summary = _summarize(stop_request_timings(g.timings_token))
+        response.headers["Server-Timing"] = _server_timing_header(summary, total * 1000)
+        response.headers["Timing-Allow-Origin"] = "*"
+
+        sampler = g.get("sampler")
+        if sampler is not None:
+            sampler.stop()
+            if total * 1000 >= PROFILE_MIN_MS:
+                path = sampler.dump(PROFILE_FOLDER, f"{request.method}-{endpoint}")
+                response.headers["X-Profile-File"] = os.path.basename(path)
+
+        # Bloc JSON opțional cu aceleași durate, pentru clienții care nu citesc antetele
+        if request.headers.get("X-Debug-Timing") == "1" and response.is_json:
+            body = response.get_json(silent=True)
+            if isinstance(body, dict):
+                body["timings"] = {"total_ms": round(total * 1000, 2), "stages": summary}
+                response.set_data(json.dumps(body, ensure_ascii=False))
+        return response
+
+    # Cu serverul pre-fork (serve.py), valorile sunt suma tuturor proceselor, nu doar ale celui care răspunde
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4; charset=utf-8")
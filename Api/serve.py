@@ -0,0 +1,331 @@
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from pymongo import MongoClient
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Model.monitoring import metrics
+
+# Server de producție cu procese pre-fork:
+#
+#   python serve.py --workers 4 --port 5000
+#
+# Procesul master importă API-ul, încarcă modelul de embedding și indecșii PDF-urilor cele
+# mai folosite, apoi creează N procese copil cu fork(). Copiii partajează memoria master-ului
+# (copy-on-write), deci modelul și indecșii nu sunt încărcați din nou în fiecare proces.
+# Matricile de embedding sunt deschise cu mmap (vezi index_store.py), deci și indecșii încărcați
+# mai târziu de un proces copil au o singură copie în memorie, în page cache.
+# Toate procesele acceptă conexiuni pe același socket.
+#
+# Cât timp master-ul se încălzește, orice cerere primește 503 (iar /ready raportează "warming").
+# Un proces copil este înlocuit după --max-requests cereri, fără să întrerupă cererile în curs;
+# SIGHUP reciclează toate procesele, pe rând; SIGTERM/SIGINT oprește serverul. Un proces care se oprește
+# așteaptă și job-urile de ingestie pornite în el (tot în limita --graceful-timeout).
+#
+# Metricile (/metrics) sunt ținute în memoria fiecărui proces. Fiecare proces le scrie periodic în
+# --metrics-dir, iar /metrics întoarce suma tuturor, din orice proces ar răspunde; valorile unui
+# proces oprit sunt adăugate la totalul proceselor retrase, deci contoarele nu scad la reciclare.
+
+WARMUP_TEXT = "Încălzirea modelului de embedding."
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Server de producție pentru API, cu procese pre-fork.")
+    parser.add_argument("--host", default=os.environ.get("SERVE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SERVE_PORT", "5000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SERVE_WORKERS", str(os.cpu_count() or 1))))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("SERVE_THREADS", "0")),
+                        help="Fire de calcul pentru embedding în fiecare proces (0 = nuclee / procese)")
+    parser.add_argument("--max-requests", type=int, default=int(os.environ.get("SERVE_MAX_REQUESTS", "2000")),
+                        help="Cereri după care un proces este înlocuit (0 = niciodată)")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="Secunde acordate cererilor în curs la oprirea unui proces")
+    parser.add_argument("--preload-indexes", type=int, default=int(os.environ.get("SERVE_PRELOAD_INDEXES", "8")),
+                        help="Câți indecși ai PDF-urilor populare sunt încărcați înainte de fork")
+    parser.add_argument("--backlog", type=int, default=1024)
+    parser.add_argument("--metrics-dir", default=os.environ.get("SERVE_METRICS_DIR"),
+                        help="Director pentru metricile proceselor (implicit unul temporar, golit la pornire)")
+    return parser.parse_args()
+
+
+def warming_app(environ, start_response):
+    # Răspunsul tuturor cererilor până când procesele sunt pornite
+    body = json.dumps({"status": "warming", "pid": os.getpid()}).encode("utf-8")
+    start_response("503 Service Unavailable", [("Content-Type", "application/json"),
+                                                ("Retry-After", "5"),
+                                                ("Content-Length", str(len(body)))])
+    return [body]
+
+
+def hot_index_paths(api, limit):
+    # Indecșii PDF-urilor cu cele mai multe întrebări recente, completați cu ale celorlalte cursuri.
+    # Folosim un client Mongo separat, închis înainte de fork; cel al API-ului rămâne neconectat.
+    client = MongoClient(api.MONGO_URI, serverSelectionTimeoutMS=5000)
+    try:
+        db = client[api.db.name]
+        courses = {course["courseID"]: course.get("pdfs", [])
+                   for course in db["courses"].find({}, {"courseID": 1, "pdfs.indexPath": 1})}
+        paths = []
+        for course_id, pdf_id in api.ChatLog(db).hot_pdfs(limit=limit):
+            pdfs = courses.get(course_id, [])
+            if isinstance(pdf_id, int) and 0 <= pdf_id < len(pdfs) and pdfs[pdf_id].get("indexPath"):
+                paths.append(pdfs[pdf_id]["indexPath"])
+        for pdfs in courses.values():
+            paths.extend(pdf["indexPath"] for pdf in pdfs if pdf.get("indexPath"))
+        return list(dict.fromkeys(paths))[:limit]
+    finally:
+        client.close()
+
+
+def warm_up(api, args):
+    started = time.perf_counter()
+    qa_agent = api.get_qa_agent()
+    if qa_agent is None:
+        print("Fără GROQ_API_KEY: modelul și indecșii vor fi încărcați la prima cerere.")
+    else:
+        # Master-ul rulează pe un singur fir: un pool de fire creat înainte de fork nu ar exista în copii
+        embedder = qa_agent.embedding_model
+        embedder.set_threads(1)
+        embedder.encode([WARMUP_TEXT])
+        api.readiness["modelLoaded"] = True
+        print(f"Model de embedding încărcat: {getattr(embedder, 'name', type(embedder).__name__)}")
+
+        if args.preload_indexes > 0:
+            try:
+                paths = hot_index_paths(api, args.preload_indexes)
+            except Exception as e:
+                print("Eroare la citirea cursurilor pentru preîncărcare:", e)
+                paths = []
+            for path in paths:
+                if not api.index_exists(path):
+                    continue
+                try:
+                    qa_agent.preload_index(path)
+                    api.readiness["indexesLoaded"] += 1
+                except Exception as e:
+                    print(f"Eroare la preîncărcarea indexului {path}:", e)
+            print(f"Indecși preîncărcați: {api.readiness['indexesLoaded']}")
+
+    api.readiness["warmupSeconds"] = round(time.perf_counter() - started, 3)
+    api.readiness["ready"] = True
+
+
+def worker_snapshot_name(pid):
+    return f"worker-{pid}"
+
+
+class Worker:
+    def __init__(self, app, sock, args, threads):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.threads = threads
+        self.served = 0
+        self.active = 0
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        # Un mic decalaj, ca procesele să nu fie reciclate toate în același moment
+        self.max_requests = args.max_requests + random.randint(0, args.max_requests // 10) if args.max_requests else 0
+        self.server = None
+
+    def __call__(self, environ, start_response):
+        with self.lock:
+            self.active += 1
+        try:
+            app_iter = self.app(environ, start_response)
+        except BaseException:
+            self._finished()
+            raise
+        # close() este apelat după ce răspunsul a fost scris complet
+        return ClosingIterator(app_iter, self._finished)
+
+    def _finished(self):
+        with self.lock:
+            self.active -= 1
+            self.served += 1
+            recycle = self.max_requests and self.served >= self.max_requests
+        if recycle:
+            self.stop()
+
+    def stop(self, *_):
+        if not self.stopping.is_set():
+            self.stopping.set()
+            if self.server is None:
+                return
+            # shutdown() așteaptă ieșirea din serve_forever, deci nu poate fi apelat din firul acesteia
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def run(self, api):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        metrics.start_process_snapshots(worker_snapshot_name(os.getpid()))
+        qa_agent = api.ai.qa_agent
+        if qa_agent is not None and api.readiness["modelLoaded"]:
+            qa_agent.embedding_model.set_threads(self.threads)
+
+        self.server = make_server(self.args.host, self.args.port, self, threaded=True, fd=self.sock.fileno())
+        if not self.stopping.is_set():
+            self.server.serve_forever()
+
+        # Nu mai acceptăm conexiuni noi; așteptăm cererile în curs
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if self.active == 0:
+                    break
+            time.sleep(0.05)
+
+        # Apoi job-urile de ingestie pornite de acest proces: os._exit le-ar opri la jumătate și
+        # ar rămâne "running" în Mongo. Cele care nu se termină la timp sunt marcate eșuate.
+        failed = api.ingestion_queue.shutdown(timeout=max(0.0, deadline - time.monotonic()))
+        if failed:
+            print(f"Procesul {os.getpid()}: {failed} job-uri de ingestie întrerupte au fost marcate eșuate.")
+        metrics.write_snapshot()
+        print(f"Procesul {os.getpid()} se oprește după {self.served} cereri.")
+
+
+class Master:
+    def __init__(self, api, sock, args):
+        self.api = api
+        self.sock = sock
+        self.args = args
+        self.threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+        self.workers = {}
+        self.running = True
+        self.to_recycle = []
+        self.recycling = None
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                random.seed()
+                Worker(self.api.app, self.sock, self.args, self.threads).run(self.api)
+            except Exception as e:
+                print(f"Eroare în procesul {os.getpid()}:", e)
+                code = 1
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+        self.workers[pid] = time.monotonic()
+        return pid
+
+    def on_stop(self, *_):
+        self.running = False
+
+    def on_recycle(self, *_):
+        # Reciclare pe rând: cel mult un proces lipsește la un moment dat
+        self.to_recycle = list(self.workers)
+
+    def reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            metrics.retire_snapshot(worker_snapshot_name(pid))
+            if pid == self.recycling:
+                self.recycling = None
+            if not self.running:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0 and started is not None and time.monotonic() - started < 1:
+                # Procesul a căzut imediat după pornire; nu îl repornim în buclă strânsă
+                print(f"Procesul {pid} a ieșit cu codul {code}; îl repornim într-o secundă.")
+                time.sleep(1)
+            self.spawn()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.on_stop)
+        signal.signal(signal.SIGINT, self.on_stop)
+        signal.signal(signal.SIGHUP, self.on_recycle)
+        for _ in range(self.args.workers):
+            self.spawn()
+        print(f"Server pornit pe http://{self.args.host}:{self.args.port} cu {self.args.workers} procese "
+              f"({self.threads} fire de calcul fiecare).")
+
+        while self.running:
+            self.reap()
+            if self.recycling is None and self.to_recycle:
+                pid = self.to_recycle.pop(0)
+                if pid in self.workers:
+                    self.recycling = pid
+                    os.kill(pid, signal.SIGTERM)
+            time.sleep(0.2)
+
+        print("Oprirea serverului...")
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+
+
+def main():
+    args = parse_args()
+    if args.workers < 1:
+        print("Numărul de procese trebuie să fie cel puțin 1.")
+        sys.exit(1)
+
+    # Socket-ul este deschis înainte de încălzire, ca verificările de sănătate să primească 503, nu refuz
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+    # Toate procesele sunt trezite de o conexiune nouă, dar doar unul o primește; ceilalți nu trebuie
+    # să rămână blocați în accept() (socketserver ignoră eroarea EAGAIN)
+    sock.setblocking(False)
+
+    warming = make_server(args.host, args.port, warming_app, threaded=False, fd=sock.fileno())
+    warming_thread = threading.Thread(target=warming.serve_forever, name="warming", daemon=True)
+    warming_thread.start()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import api
+    # Metricile pornirii anterioare nu aparțin acestui server
+    metrics_dir = args.metrics_dir or os.path.join(tempfile.gettempdir(), f"edu-api-metrics-{args.port}")
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    metrics.enable_multiprocess(metrics_dir, "master")
+    warm_up(api, args)
+    # Valorile master-ului (încălzirea) sunt scrise o dată; copiii pornesc de la zero
+    metrics.write_snapshot()
+
+    # Nu lăsăm niciun fir în master înainte de fork
+    warming.shutdown()
+    warming_thread.join()
+    warming.server_close()
+    # Obiectele încărcate până acum nu mai sunt vizitate de colectorul de gunoi, ca paginile lor
+    # să nu fie copiate în fiecare proces copil
+    gc.collect()
+    gc.freeze()
+
+    Master(api, sock, args).run()
+
+
+if __name__ == '__main__':
+    main()
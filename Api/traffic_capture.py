@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+from flask import g, request
+
+# Captura traficului: dacă TRAFFIC_CAPTURE_FILE este setat, fiecare cerere este adăugată
+# (anonimizată) într-un fișier JSONL, grupată pe sesiuni. Fișierul poate fi apoi rulat din nou
+# cu "Model Testing/load-testing/replay.py", pentru teste de capacitate cu trafic real.
+TRAFFIC_CAPTURE_FILE = os.environ.get("TRAFFIC_CAPTURE_FILE")
+TRAFFIC_CAPTURE_SALT = os.environ.get("TRAFFIC_CAPTURE_SALT", "")
+
+# Rute care nu sunt interesante pentru reluare
+SKIPPED_PATHS = ("/metrics",)
+
+# Sesiunile fără cereri de atâtea secunde sunt uitate (altfel dicționarul crește la nesfârșit)
+SESSION_IDLE_SECONDS = 1800
+
+# Parametrii de căutare păstrați ca atare; ceilalți (ex. username, user_id) pot identifica
+# o persoană, deci sunt înlocuiți cu hash-ul lor
+SAFE_QUERY_PARAMS = ("courseName", "course_id", "limit", "before")
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+LONG_NUMBER_RE = re.compile(r"\d{6,}")
+URL_RE = re.compile(r"https?://\S+")
+
+
+def anonymize_text(text):
+    # Eliminăm datele personale evidente din întrebări, păstrând forma și lungimea textului
+    text = EMAIL_RE.sub("<email>", text)
+    text = URL_RE.sub("<url>", text)
+    return LONG_NUMBER_RE.sub(lambda m: "0" * len(m.group()), text)
+
+
+def _hash(value):
+    return hashlib.sha256((TRAFFIC_CAPTURE_SALT + str(value)).encode("utf-8")).hexdigest()[:16]
+
+
+class TrafficRecorder:
+    def __init__(self, path):
+        self.path = path
+        self.sessions = {}
+        self.next_eviction = 0.0
+        self._start_writer()
+        # Firul de scriere nu supraviețuiește unui fork (serve.py): fiecare proces pornește unul nou
+        os.register_at_fork(after_in_child=self._start_writer)
+
+    def _start_writer(self):
+        self.records = queue.Queue()
+        self.lock = threading.Lock()
+        # Scrierea pe disc se face pe un fir separat, ca să nu întârziem răspunsurile
+        threading.Thread(target=self._write_loop, name="traffic-capture", daemon=True).start()
+
+    def _write_loop(self):
+        # Mai multe procese (serve.py) scriu în același fișier: fiecare linie este scrisă cu un
+        # singur os.write pe un descriptor O_APPEND, deci liniile nu se amestecă între procese
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        while True:
+            record = self.records.get()
+            os.write(fd, (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def _session_id(self, data):
+        session = request.headers.get("X-Session-Id") or data.get("user_id") or data.get("email")
+        if not session:
+            session = f"{request.remote_addr}|{request.headers.get('User-Agent', '')}"
+        return _hash(session)
+
+    def _evict_idle(self, now):
+        # Apelat cel mult o dată pe minut, cu lacătul ținut
+        idle = [session for session, state in self.sessions.items() if now - state["last"] > SESSION_IDLE_SECONDS]
+        for session in idle:
+            del self.sessions[session]
+        self.next_eviction = now + 60
+
+    def record(self, response, duration):
+        if request.path in SKIPPED_PATHS:
+            return
+        data = request.get_json(silent=True) if request.is_json else None
+        data = data if isinstance(data, dict) else {}
+
+        session = self._session_id(data)
+        started = time.time() - duration
+        # seq și offset_sec sunt numărate în procesul curent; cu mai multe procese, cererile unei
+        # sesiuni sunt împărțite între ele, deci replay.py ordonează și temporizează după ts
+        with self.lock:
+            state = self.sessions.setdefault(session, {"start": started, "seq": 0})
+            state["seq"] += 1
+            state["last"] = started
+            seq, offset = state["seq"], started - state["start"]
+            if started >= self.next_eviction:
+                self._evict_idle(started)
+
+        record = {
+            "session": session,
+            "seq": seq,
+            "ts": round(started, 3),
+            "offset_sec": round(offset, 3),
+            "method": request.method,
+            "path": request.path,
+            "route": request.url_rule.rule if request.url_rule else None,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 2)
+        }
+
+        if request.path == "/sample-page":
+            body = response.get_json(silent=True) or {}
+            question = data.get("chat")
+            record["question"] = anonymize_text(question) if isinstance(question, str) else None
+            record["mode"] = body.get("mode")
+            record["course_id"] = data.get("course_id")
+            record["pdf_id"] = data.get("pdf_id")
+        elif request.method == "GET" and request.args:
+            record["query"] = {key: value if key in SAFE_QUERY_PARAMS else _hash(value)
+                               for key, value in request.args.items()}
+
+        self.records.put(record)
+
+
+def init_traffic_capture(app):
+    if not TRAFFIC_CAPTURE_FILE:
+        return None
+
+    recorder = TrafficRecorder(TRAFFIC_CAPTURE_FILE)
+
+    @app.before_request
+    def start_capture_timer():
+        g.capture_start = time.perf_counter()
+
+    @app.after_request
+    def capture_request(response):
+        start = g.get("capture_start")
+        if start is not None:
+            try:
+                recorder.record(response, time.perf_counter() - start)
+            except Exception as e:
+                print("Eroare la captura traficului:", e)
+        return response
+
+    print(f"Captura traficului activă: {TRAFFIC_CAPTURE_FILE}")
+    return recorder
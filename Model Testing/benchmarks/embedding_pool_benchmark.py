@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Embedding Pool Scaling Benchmark
+
+Encodes the same synthetic chunks with EmbeddingPool at increasing process
+counts and reports throughput, speedup over one process and parallel
+efficiency, to check that bulk ingestion scales with the number of cores:
+
+    python embedding_pool_benchmark.py --processes 1,2,4,8,16,32 --texts 4096 --output pool.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from Model.pdf_agent.embedding_pool import EmbeddingPool
+from Model.pdf_agent.embeddings import BACKENDS
+
+from retrieval_benchmark import WORDS, git_commit
+
+
+def synthetic_chunks(count, words_per_chunk=160, seed=0):
+    """Chunk-sized texts (about 1000 characters, like split_into_chunks produces)."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_chunk)) for _ in range(count)]
+
+
+def bench_processes(processes, texts, backend, batch_size, repeats):
+    start = time.perf_counter()
+    pool = EmbeddingPool(processes=processes, backend=backend)
+    startup = time.perf_counter() - start
+    try:
+        pool.encode(texts[:processes * batch_size], batch_size)  # warm-up, every worker gets a batch
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            embeddings = pool.encode(texts, batch_size)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        assert len(embeddings) == len(texts)
+    finally:
+        pool.close()
+    return {
+        "startup_sec": round(startup, 2),
+        "seconds": round(best, 3),
+        "texts_per_sec": round(len(texts) / best, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how EmbeddingPool scales with the number of processes.")
+    cpus = os.cpu_count() or 1
+    default_counts = sorted({n for n in (1, 2, 4, 8, 16, 32, 64) if n <= cpus} | {cpus})
+    parser.add_argument("--processes", default=",".join(map(str, default_counts)),
+                        help="Comma separated process counts")
+    parser.add_argument("--texts", type=int, default=2048, help="Chunks encoded per run")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=2, help="Runs per process count, the fastest is kept")
+    parser.add_argument("--backend", default="sentence-transformers", choices=BACKENDS)
+    parser.add_argument("--output", default="embedding_pool_benchmark.json")
+    args = parser.parse_args()
+
+    texts = synthetic_chunks(args.texts)
+    counts = [int(n) for n in args.processes.split(",") if n]
+    results = {}
+    baseline = None
+    print(f"{'processes':>10}{'texts/s':>12}{'speedup':>10}{'efficiency':>12}")
+    for processes in counts:
+        entry = bench_processes(processes, texts, args.backend, args.batch_size, args.repeats)
+        if baseline is None:
+            baseline = entry["texts_per_sec"] / processes
+        entry["speedup"] = round(entry["texts_per_sec"] / baseline, 2)
+        entry["efficiency"] = round(entry["speedup"] / processes, 3)
+        results[str(processes)] = entry
+        print(f"{processes:>10}{entry['texts_per_sec']:>12}{entry['speedup']:>10}{entry['efficiency']:>12}")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"cpus": cpus},
+        "config": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Import-Time Budget Check
+
+Imports each entry point in a fresh interpreter and fails when it takes longer
+than its budget, or when it loads a heavy dependency (torch, sentence-transformers,
+the LLM clients) that should only be loaded on first use:
+
+    python import_budget.py
+    python import_budget.py --serve    # also time the API until /specializations answers
+
+Exits with status 1 when a budget is exceeded, so it can run in CI.
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+API_DIR = os.path.join(ROOT, "Api")
+
+# Loaded on first use only; importing an entry point must not pull them in
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "onnxruntime", "groq", "openai")
+
+# (module, directory it is imported from, budget in seconds)
+TARGETS = [
+    ("Model.educator_agent.combined_agent", ROOT, 0.3),
+    ("Model.educator_agent.text_guide_interactive", ROOT, 0.3),
+    ("api", API_DIR, 1.0),
+]
+
+PROBE = """
+import json, sys, time
+sys.path[:0] = {paths!r}
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure_import(module, cwd, heavy=HEAVY_MODULES):
+    """
+    Import a module in a fresh interpreter.
+
+    Args:
+        module: Dotted module name
+        cwd: Working directory (also put first on sys.path)
+        heavy: Module names reported if the import loaded them
+
+    Returns:
+        Dict with "seconds" and the "heavy" modules loaded, or "error"
+    """
+    code = PROBE.format(paths=[cwd, ROOT], module=module, heavy=list(heavy))
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, timeout=120)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        return {"error": (result.stderr.strip().splitlines() or ["unknown error"])[-1]}
+    return json.loads(lines[-1])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_serve(path="/specializations", timeout=30.0):
+    """Start the API and time until `path` answers with 200."""
+    port = free_port()
+    code = f"import api; api.app.run(host='127.0.0.1', port={port}, threaded=True)"
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=API_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                return {"error": f"API exited with status {process.returncode}"}
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    if response.status == 200:
+                        return {"seconds": time.perf_counter() - start}
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.02)
+        return {"error": f"{path} did not answer within {timeout:.0f}s"}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import times of the entry points against a budget.")
+    parser.add_argument("--serve", action="store_true", help="Also start the API and time the first catalog request")
+    parser.add_argument("--serve-budget", type=float, default=1.0, help="Seconds until the API serves /specializations")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget (slow CI machines)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    failed = False
+    results = {}
+    print(f"{'module':<46}{'seconds':>9}{'budget':>9}  result")
+    for module, cwd, budget in TARGETS:
+        budget *= args.scale
+        measured = measure_import(module, cwd)
+        results[module] = {**measured, "budget": budget}
+        if "error" in measured:
+            ok, detail = False, measured["error"]
+        elif measured["heavy"]:
+            ok, detail = False, f"loaded {', '.join(measured['heavy'])}"
+        else:
+            ok, detail = measured["seconds"] <= budget, "ok" if measured["seconds"] <= budget else "over budget"
+        failed |= not ok
+        seconds = f"{measured['seconds']:.3f}" if "seconds" in measured else "-"
+        print(f"{module:<46}{seconds:>9}{budget:>9.2f}  {'✓' if ok else '✗'} {detail}")
+
+    if args.serve:
+        budget = args.serve_budget * args.scale
+        measured = measure_serve()
+        results["serve /specializations"] = {**measured, "budget": budget}
+        ok = "seconds" in measured and measured["seconds"] <= budget
+        failed |= not ok
+        seconds = f"{measured['seconds']:.3f}" if "seconds" in measured else "-"
+        print(f"{'serve /specializations':<46}{seconds:>9}{budget:>9.2f}  {'✓' if ok else '✗'} "
+              f"{measured.get('error', 'ok' if ok else 'over budget')}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+PDFContextQA Retrieval Benchmark
+
+Measures the document pipeline on synthetic data:
+  - PDF text extraction (pages/sec) on generated PDFs, without and with the text cache
+  - chunking speed (chars/sec)
+  - embedding encode throughput (texts/sec)
+  - index build time and memory, get_relevant_chunks p50/p99 latency
+    and recall@k for every retrieval backend, from 1 up to 1M chunks
+
+Results are written as JSON so runs from different commits can be compared:
+
+    python retrieval_benchmark.py --output bench_new.json --compare bench_old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from Model.pdf_agent.retrieval import BACKENDS, ExactIndex, create_index
+
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+WORDS = (
+    "matrix vector algebra theorem proof lemma function derivative integral limit series "
+    "graph tree node edge sort merge quick heap stack queue array list hash table pointer "
+    "geometry triangle circle angle area volume plane line point complex number real imaginary "
+    "regression linear model error gradient descent sample data variance mean estimate"
+).split()
+
+
+def make_synthetic_pdf(path, pages, seed=0):
+    """
+    Write a PDF with `pages` pages of random course-like text.
+
+    Args:
+        path: Output path
+        pages: Number of pages
+        seed: Random seed
+    """
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        paragraphs = []
+        for _ in range(6):
+            paragraphs.append(" ".join(rng.choice(WORDS) for _ in range(60)))
+        text = f"Chapter {page_num + 1}\n\n" + "\n\n".join(paragraphs)
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def synthetic_embeddings(count, dim=EMBEDDING_DIM, clusters=256, seed=0):
+    """
+    Normalized vectors grouped around random topics, like real chunk embeddings.
+
+    Args:
+        count: Number of vectors
+        dim: Vector dimension
+        clusters: Number of topics
+        seed: Random seed
+
+    Returns:
+        float32 matrix of shape (count, dim)
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.empty((count, dim), dtype=np.float32)
+    block = 100000
+    for start in range(0, count, block):
+        size = min(block, count - start)
+        topics = rng.integers(0, clusters, size)
+        vectors[start:start + size] = centers[topics] + 0.6 * rng.standard_normal((size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 4)
+
+
+def bench_pipeline(pages, encode_samples, embedding_backend="sentence-transformers"):
+    """Benchmark extraction, chunking and encoding through PDFContextQA."""
+    from Model.pdf_agent.groq_pdf_processor import PDFContextQA
+    from Model.pdf_agent.text_cache import extract_document
+
+    # The Groq client is never called, so any key works
+    qa = PDFContextQA(api_key="benchmark", embedding_backend=embedding_backend)
+    results = {"embedding_backend": qa.embedding_model.name}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "synthetic.pdf")
+        make_synthetic_pdf(pdf_path, pages)
+
+        # Extract into an empty cache first (cold), then again from the cache (warm)
+        cache_dir = os.path.join(tmp, "text_cache")
+        start = time.perf_counter()
+        extract_document(pdf_path, cache_dir=cache_dir)
+        elapsed = time.perf_counter() - start
+        results["extraction_pages_per_sec"] = round(pages / elapsed, 2)
+
+        start = time.perf_counter()
+        text = "\n".join(extract_document(pdf_path, cache_dir=cache_dir)["pages"])
+        elapsed = time.perf_counter() - start
+        results["cached_extraction_pages_per_sec"] = round(pages / elapsed, 2)
+
+    start = time.perf_counter()
+    chunks = qa.split_into_chunks(text)
+    elapsed = time.perf_counter() - start
+    results["chunking_chars_per_sec"] = round(len(text) / max(elapsed, 1e-9), 2)
+    results["chunk_count"] = len(chunks)
+
+    sample = (chunks * (encode_samples // max(len(chunks), 1) + 1))[:encode_samples]
+    qa.encode(sample[:8])  # warm-up
+    start = time.perf_counter()
+    qa.encode(sample)
+    elapsed = time.perf_counter() - start
+    results["encode_texts_per_sec"] = round(len(sample) / elapsed, 2)
+
+    start = time.perf_counter()
+    for text_sample in sample[:50]:
+        qa.encode(text_sample)
+    results["encode_query_ms"] = round((time.perf_counter() - start) / min(len(sample), 50) * 1000, 4)
+
+    return results
+
+
+def bench_backend(index, queries, top_k, truth):
+    latencies = []
+    hits = 0
+    expected_total = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = index.search(query, top_k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(found) & set(expected))
+        expected_total += len(expected)
+    return {
+        "p50_ms": percentile_ms(latencies, 50),
+        "p99_ms": percentile_ms(latencies, 99),
+        f"recall_at_{top_k}": round(hits / max(expected_total, 1), 4),
+    }
+
+
+def bench_retrieval(sizes, query_count, top_k, n_probes):
+    """Benchmark every retrieval backend on synthetic embedding matrices."""
+    results = {}
+    rng = np.random.default_rng(1)
+
+    for size in sizes:
+        print(f"  {size} chunks...")
+        embeddings = synthetic_embeddings(size)
+        # Queries close to existing chunks, like real questions about the document
+        anchors = embeddings[rng.integers(0, size, query_count)]
+        queries = anchors + 0.3 * rng.standard_normal(anchors.shape).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        exact = ExactIndex(embeddings)
+        truth = [exact.search(q, top_k) for q in queries]
+        size_results = {}
+
+        for backend in BACKENDS:
+            start = time.perf_counter()
+            index = create_index(backend, embeddings)
+            build_seconds = time.perf_counter() - start
+
+            settings = n_probes if backend == "ivf" else [None]
+            for n_probe in settings:
+                name = backend if n_probe is None else f"{backend}_nprobe{n_probe}"
+                if n_probe is not None:
+                    index.n_probe = n_probe
+                entry = bench_backend(index, queries, top_k, truth)
+                entry["build_ms"] = round(build_seconds * 1000, 4)
+                entry["index_memory_bytes"] = int(index.memory_bytes())
+                size_results[name] = entry
+
+        results[str(size)] = size_results
+        del embeddings, exact
+
+    return results
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline, tolerance):
+    """
+    Compare two result files and list the metrics that got worse.
+
+    Args:
+        current: Results of this run
+        baseline: Results of an earlier run
+        tolerance: Allowed relative slowdown (0.2 = 20%)
+
+    Returns:
+        List of human-readable regression descriptions
+    """
+    regressions = []
+    new, old = flatten(current["results"]), flatten(baseline["results"])
+    for name, old_value in sorted(old.items()):
+        if name not in new or not old_value:
+            continue
+        new_value = new[name]
+        if "recall" in name:
+            # Recall is compared in absolute terms
+            if new_value < old_value - 0.02:
+                regressions.append(f"{name}: {old_value} -> {new_value}")
+        elif name.endswith("_ms"):
+            if new_value > old_value * (1 + tolerance):
+                regressions.append(f"{name}: {old_value} -> {new_value} (slower)")
+        elif name.endswith("_per_sec"):
+            if new_value < old_value * (1 - tolerance):
+                regressions.append(f"{name}: {old_value} -> {new_value} (lower throughput)")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PDFContextQA retrieval pipeline.")
+    parser.add_argument("--pages", type=int, default=50, help="Pages in the synthetic PDF")
+    parser.add_argument("--encode-samples", type=int, default=256, help="Chunks encoded for the throughput test")
+    parser.add_argument("--sizes", default="1,10,100,1000,10000,100000,1000000",
+                        help="Comma separated corpus sizes (number of chunks)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per corpus size")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--n-probes", default="1,4,16,64", help="IVF n_probe values to sweep")
+    parser.add_argument("--embedding-backend", default="sentence-transformers",
+                        help="sentence-transformers, onnx or onnx-int8")
+    parser.add_argument("--skip-pipeline", action="store_true",
+                        help="Only run the retrieval benchmark (no PDF or embedding model needed)")
+    parser.add_argument("--output", default="retrieval_benchmark.json")
+    parser.add_argument("--compare", help="Earlier result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "config": vars(args),
+        "results": {},
+    }
+
+    if not args.skip_pipeline:
+        print("Benchmarking extraction, chunking and encoding...")
+        report["results"]["pipeline"] = bench_pipeline(args.pages, args.encode_samples, args.embedding_backend)
+
+    print("Benchmarking retrieval backends...")
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    n_probes = [int(n) for n in args.n_probes.split(",") if n]
+    report["results"]["retrieval"] = bench_retrieval(sizes, args.queries, args.top_k, n_probes)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    for name, value in sorted(flatten(report["results"]).items()):
+        print(f"  {name}: {value}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) compared to {args.compare}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\n✓ No regressions compared to {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Fake LLM Server
+
+A local stand-in for the OpenAI and Groq chat completions APIs, so the Flask API
+can be load-tested without paying for (or being rate-limited by) the real providers.
+
+It answers both request paths used by the client libraries:
+  - POST /v1/chat/completions          (openai, base_url http://host:port/v1)
+  - POST /openai/v1/chat/completions   (groq,   base_url http://host:port)
+
+Point the API at it through the environment variables the SDKs already read:
+
+    python fake_llm_server.py --port 8100 --latency-ms 800 --tokens-per-sec 250
+    export OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+    export GROQ_BASE_URL=http://127.0.0.1:8100
+    export OPENAI_API_KEY=fake GROQ_API_KEY=fake
+
+Note that both SDKs retry 429/5xx responses on their own (2 retries by default),
+so injected errors also show up as extra latency on the API side.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETION_PATHS = ("/v1/chat/completions", "/openai/v1/chat/completions")
+FILLER = (
+    "Let's work through this step by step. First, identify what is given and what is asked. "
+    "Then recall the definition that connects them and try to apply it to the first part. "
+)
+
+
+class FakeLLMConfig:
+    """
+    Behaviour of the fake server.
+    """
+
+    def __init__(self, latency_ms=500.0, latency_sigma=0.5, tokens_per_sec=200.0,
+                 completion_tokens=150, error_rate=0.0, rate_limit_rate=0.0, seed=None):
+        """
+        Initialize the configuration.
+
+        Args:
+            latency_ms: Median time to first token, in milliseconds
+            latency_sigma: Spread of the log-normal latency distribution (0 = constant)
+            tokens_per_sec: Generation speed, added on top of the first-token latency
+            completion_tokens: Mean number of completion tokens per answer
+            error_rate: Fraction of requests answered with HTTP 500
+            rate_limit_rate: Fraction of requests answered with HTTP 429
+            seed: Random seed, for reproducible runs
+        """
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_sec = tokens_per_sec
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sample(self):
+        """Draw (outcome, first token seconds, completion tokens) for one request."""
+        with self.lock:
+            roll = self.random.random()
+            first_token = self.latency_ms / 1000 * self.random.lognormvariate(0, self.latency_sigma)
+            tokens = max(1, int(self.random.gauss(self.completion_tokens, self.completion_tokens * 0.3)))
+        if roll < self.error_rate:
+            outcome = "error"
+        elif roll < self.error_rate + self.rate_limit_rate:
+            outcome = "rate_limit"
+        else:
+            outcome = "ok"
+        return outcome, first_token, tokens
+
+
+def count_tokens(messages):
+    # Rough estimate (4 characters per token), good enough for usage numbers
+    text = "".join(str(message.get("content", "")) for message in messages)
+    return max(1, len(text) // 4)
+
+
+def make_handler(config):
+    class FakeLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+            else:
+                self._send_json(404, {"error": {"message": "Not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send_json(400, {"error": {"message": "Invalid JSON", "type": "invalid_request_error"}})
+                return
+
+            if self.path not in COMPLETION_PATHS:
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+
+            outcome, first_token, completion_tokens = config.sample()
+            time.sleep(first_token)
+
+            if outcome == "error":
+                self._send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+                return
+            if outcome == "rate_limit":
+                self._send_json(429, {"error": {"message": "Injected rate limit", "type": "rate_limit_exceeded"}},
+                                headers={"Retry-After": "1"})
+                return
+
+            time.sleep(completion_tokens / config.tokens_per_sec)
+
+            messages = request.get("messages", [])
+            prompt_tokens = count_tokens(messages)
+            words = (FILLER * (completion_tokens // 30 + 1)).split()[:completion_tokens]
+            self._send_json(200, {
+                "id": f"chatcmpl-fake-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake-model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                    "logprobs": None
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            })
+
+    return FakeLLMHandler
+
+
+def serve(host="127.0.0.1", port=8100, config=None):
+    """
+    Create the fake server (call serve_forever() on the result to run it).
+
+    Args:
+        host: Address to bind
+        port: Port to bind, 0 picks a free port
+        config: FakeLLMConfig, defaults to FakeLLMConfig()
+
+    Returns:
+        The ThreadingHTTPServer instance
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(config or FakeLLMConfig()))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI/Groq chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Median time to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal spread of the latency")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 500 answers")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of HTTP 429 answers")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(args.latency_ms, args.latency_sigma, args.tokens_per_sec,
+                           args.completion_tokens, args.error_rate, args.rate_limit_rate, args.seed)
+    server = serve(args.host, args.port, config)
+    print(f"Fake LLM server listening on http://{args.host}:{server.server_address[1]}")
+    print(f"  OPENAI_BASE_URL=http://{args.host}:{server.server_address[1]}/v1")
+    print(f"  GROQ_BASE_URL=http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping fake LLM server.")
+
+
+if __name__ == "__main__":
+    main()
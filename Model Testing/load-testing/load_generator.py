@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+API Load Generator
+
+Drives Api/api.py with a configurable mix of requests and reports throughput
+and latency percentiles per endpoint. Run the API against fake_llm_server.py
+so chat requests don't reach the real providers:
+
+    python load_generator.py --base-url http://127.0.0.1:5000 --concurrency 16 --duration 60 \\
+        --mix sample-page=3,login=1,courses=2,specializations=1,lectures=1
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+QUESTIONS = [
+    "What is a binary search tree?",
+    "Explain the quadratic formula.",
+    "How does merge sort work?",
+    "What is the derivative of x^2?",
+    "Define a complex number.",
+    "What is linear regression used for?",
+]
+
+
+def build_request(name, args, rng):
+    """
+    Build (method, path, JSON body) for one request of the given kind.
+
+    Args:
+        name: Request kind, one of SCENARIOS
+        args: Parsed command line arguments
+        rng: random.Random instance
+    """
+    if name == "sample-page":
+        body = {"chat": rng.choice(QUESTIONS)}
+        if args.course_id is not None:
+            body["course_id"] = args.course_id
+            body["pdf_id"] = args.pdf_id
+        return "POST", "/sample-page", body
+    if name == "login":
+        return "POST", "/dashboard/default/login", {"email": args.email, "password": args.password}
+    if name == "courses":
+        return "GET", "/dashboard/courses", None
+    if name == "specializations":
+        return "GET", "/specializations", None
+    if name == "lectures":
+        return "GET", "/lectures", None
+    raise ValueError(f"Unknown scenario '{name}'")
+
+
+SCENARIOS = ("sample-page", "login", "courses", "specializations", "lectures")
+
+
+def send(base_url, method, path, body, timeout, headers=None):
+    """
+    Send one HTTP request.
+
+    Returns:
+        (HTTP status or 0 on connection error, seconds elapsed)
+    """
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json", **(headers or {})})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+class LatencyReport:
+    """
+    Thread-safe collector of request outcomes, summarized per endpoint.
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add(self, name, status, seconds):
+        with self.lock:
+            self.samples.setdefault(name, []).append((status, seconds))
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        result = {"elapsed_sec": round(elapsed, 3), "endpoints": {}}
+        all_latencies = []
+        total = errors = 0
+        with self.lock:
+            items = sorted(self.samples.items())
+        for name, samples in items:
+            latencies = [seconds for _, seconds in samples]
+            failed = sum(1 for status, _ in samples if not 200 <= status < 400)
+            all_latencies.extend(latencies)
+            total += len(samples)
+            errors += failed
+            result["endpoints"][name] = _stats(latencies, len(samples), failed, elapsed)
+        result["overall"] = _stats(all_latencies, total, errors, elapsed)
+        return result
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"\nElapsed: {summary['elapsed_sec']}s")
+        print(f"{'endpoint':<18}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+        rows = list(summary["endpoints"].items()) + [("TOTAL", summary["overall"])]
+        for name, stats in rows:
+            print(f"{name:<18}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>9}"
+                  f"{stats['p50_ms']:>10}{stats['p90_ms']:>10}{stats['p99_ms']:>10}")
+        return summary
+
+
+def percentile(sorted_values, q):
+    # Linear interpolation between closest ranks, same as numpy's default
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _stats(latencies, count, errors, elapsed):
+    if not latencies:
+        return {"requests": 0, "errors": 0, "throughput_rps": 0.0, "p50_ms": 0.0, "p90_ms": 0.0, "p99_ms": 0.0}
+    ordered = sorted(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+        "p90_ms": round(percentile(ordered, 90) * 1000, 1),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+    }
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}'. Choose from: {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def run_load(args):
+    weights = parse_mix(args.mix)
+    names, values = list(weights), list(weights.values())
+    report = LatencyReport()
+    deadline = time.perf_counter() + args.duration
+    remaining = [args.requests] if args.requests else None
+    counter_lock = threading.Lock()
+
+    def worker(worker_id):
+        rng = random.Random(args.seed + worker_id if args.seed is not None else None)
+        while time.perf_counter() < deadline:
+            if remaining is not None:
+                with counter_lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+            name = rng.choices(names, values)[0]
+            method, path, body = build_request(name, args, rng)
+            status, seconds = send(args.base_url, method, path, body, args.timeout)
+            report.add(name, status, seconds)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report.finish()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the educational platform API.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = no limit)")
+    parser.add_argument("--mix", default="sample-page=3,login=1,courses=2,specializations=1,lectures=1",
+                        help="Weighted request mix, name=weight")
+    parser.add_argument("--course-id", type=int, help="course_id sent with /sample-page")
+    parser.add_argument("--pdf-id", type=int, default=0, help="pdf_id sent with /sample-page")
+    parser.add_argument("--email", default="andrei@gmail.com")
+    parser.add_argument("--password", default="secret123")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"Running load test against {args.base_url} with {args.concurrency} clients...")
+    report = run_load(args)
+    summary = report.print_summary()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nSummary written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Traffic Replay
+
+Re-runs sessions captured by the API (TRAFFIC_CAPTURE_FILE, see Api/traffic_capture.py)
+against a running build, keeping the order of requests inside each session and the
+time between them, optionally sped up. Order and timing come from each record's
+timestamp: with several server processes, seq and offset_sec are counted per process. Run the API against fake_llm_server.py so
+the replay exercises the whole stack without calling the real providers:
+
+    python replay.py capture.jsonl --base-url http://127.0.0.1:5000 --speed 4
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from load_generator import LatencyReport, send
+
+# Requests that can't be replayed from the capture alone
+UNREPLAYABLE_ROUTES = ("/upload-pdf", "/upload-pdf/<job_id>", "/course/pdf", "/dashboard/default/register")
+
+
+def load_sessions(path, max_sessions=None):
+    """
+    Read a capture file and group its records by session.
+
+    Args:
+        path: Capture file (JSONL)
+        max_sessions: Keep only the first N sessions
+
+    Returns:
+        List of sessions, each a list of records ordered by timestamp
+    """
+    sessions = defaultdict(list)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                sessions[record["session"]].append(record)
+
+    ordered = sorted(sessions.values(), key=lambda records: min(r["ts"] for r in records))
+    if max_sessions:
+        ordered = ordered[:max_sessions]
+    return [sorted(records, key=lambda r: r["ts"]) for records in ordered]
+
+
+def build_request(record, args):
+    """
+    Rebuild (method, path, body) for a captured record, or None if it can't be replayed.
+    """
+    route = record.get("route")
+    if route is None or route in UNREPLAYABLE_ROUTES:
+        return None
+
+    if record["path"] == "/sample-page":
+        body = {"chat": record.get("question") or "", "user_id": f"replay-{record['session']}"}
+        if record.get("course_id") is not None:
+            body["course_id"] = record["course_id"]
+            body["pdf_id"] = record.get("pdf_id")
+        return "POST", "/sample-page", body
+    if record["path"] == "/dashboard/default/login":
+        return "POST", record["path"], {"email": args.email, "password": args.password}
+    if record["method"] == "GET":
+        query = record.get("query")
+        path = record["path"]
+        if query:
+            path = f"{path}?{urlencode(query)}"
+        return "GET", path, None
+    return None
+
+
+def replay(sessions, args):
+    report = LatencyReport()
+    skipped = [0]
+    lock = threading.Lock()
+    first_ts = min(records[0]["ts"] for records in sessions)
+    started = time.perf_counter()
+
+    def run_session(records):
+        for record in records:
+            # Wait until this request's original time, scaled by the speed factor
+            due = (record["ts"] - first_ts) / args.speed
+            delay = due - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+            built = build_request(record, args)
+            if built is None:
+                with lock:
+                    skipped[0] += 1
+                continue
+            method, path, body = built
+            status, seconds = send(args.base_url, method, path, body, args.timeout,
+                                   headers={"X-Session-Id": f"replay-{record['session']}"})
+            report.add(record.get("route") or record["path"], status, seconds)
+
+    threads = [threading.Thread(target=run_session, args=(records,), daemon=True) for records in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report.finish()
+    return report, skipped[0]
+
+
+def recorded_summary(sessions):
+    """Latency summary of the original requests, for comparison with the replay."""
+    report = LatencyReport()
+    timestamps = []
+    for records in sessions:
+        for record in records:
+            report.add(record.get("route") or record["path"], record["status"], record["duration_ms"] / 1000)
+            timestamps.append(record["ts"] + record["duration_ms"] / 1000)
+    # Throughput over the captured time span, not over the time spent summarizing
+    report.started = min(r[0]["ts"] for r in sessions)
+    report.finished = max(timestamps)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured API sessions.")
+    parser.add_argument("capture", help="Capture file written by the API (JSONL)")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression factor (2 = twice as fast)")
+    parser.add_argument("--sessions", type=int, help="Replay only the first N sessions")
+    parser.add_argument("--email", default="andrei@gmail.com", help="Credentials used for login requests")
+    parser.add_argument("--password", default="secret123")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", help="Also write the replay summary to this file")
+    args = parser.parse_args()
+
+    if args.speed <= 0:
+        print("Error: --speed must be positive")
+        sys.exit(1)
+
+    sessions = load_sessions(args.capture, args.sessions)
+    if not sessions:
+        print("No sessions found in the capture file.")
+        sys.exit(1)
+    total = sum(len(records) for records in sessions)
+    print(f"Replaying {total} requests from {len(sessions)} sessions at {args.speed}x against {args.base_url}...")
+
+    report, skipped = replay(sessions, args)
+    print("\nRecorded:")
+    recorded_summary(sessions).print_summary()
+    print("\nReplayed:")
+    summary = report.print_summary()
+    if skipped:
+        print(f"\n{skipped} request(s) could not be replayed (uploads, registrations).")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"speed": args.speed, "skipped": skipped, **summary}, f, indent=2)
+        print(f"\nSummary written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Index Store Tester
+
+Checks the versioned index layout of pdf_agent.index_store: embeddings opened
+memory-mapped and read-only, new versions published atomically while readers
+keep loading, old versions cleaned up, and indexes saved before versioning.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from Model.pdf_agent.index_store import (CURRENT_FILE, VERSION_PREFIX, KEEP_VERSIONS,
+                                         index_exists, load_index, save_index)
+
+def make_index(rows, dimension=8, value=0.0):
+    chunks = [f"chunk {i}" for i in range(rows)]
+    return chunks, np.full((rows, dimension), value, dtype=np.float32)
+
+def test_index_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = os.path.join(tmp, "index")
+
+        print("\n1. Embeddings are memory-mapped and read-only:")
+        save_index(index_dir, *make_index(100, value=1.0), {"source": "v1"})
+        chunks, embeddings, meta = load_index(index_dir)
+        ok = isinstance(embeddings, np.memmap) and not embeddings.flags.writeable and meta["source"] == "v1"
+        print(f"{'✓' if ok else '✗'} {type(embeddings).__name__}, writeable={embeddings.flags.writeable}")
+
+        print("\n2. A new version is published; the old mapping stays readable:")
+        save_index(index_dir, *make_index(50, value=2.0), {"source": "v2"})
+        _, new_embeddings, new_meta = load_index(index_dir)
+        ok = new_meta["source"] == "v2" and float(embeddings[0, 0]) == 1.0 and float(new_embeddings[0, 0]) == 2.0
+        print(f"{'✓' if ok else '✗'} published {os.path.basename(new_meta['version_dir'])}")
+
+        print("\n3. Readers never see a partial index during publishing:")
+        errors, loads = [], [0]
+        stop = threading.Event()
+
+        def reader():
+            while not stop.is_set():
+                try:
+                    chunks, embeddings, meta = load_index(index_dir)
+                    if len(chunks) != len(embeddings) or len(chunks) != meta["chunk_count"]:
+                        errors.append("inconsistent index")
+                    loads[0] += 1
+                except Exception as e:
+                    errors.append(repr(e))
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for version in range(20):
+            save_index(index_dir, *make_index(10 + version, value=float(version)))
+        stop.set()
+        for thread in threads:
+            thread.join()
+        print(f"{'✓' if not errors else '✗'} {loads[0]} loads, errors: {errors[:3]}")
+
+        print("\n4. Old versions are removed:")
+        versions = [name for name in os.listdir(index_dir) if name.startswith(VERSION_PREFIX)]
+        ok = len(versions) == KEEP_VERSIONS
+        print(f"{'✓' if ok else '✗'} {len(versions)} versions kept")
+
+        print("\n5. Indexes saved before versioning still load and are migrated on save:")
+        legacy_dir = os.path.join(tmp, "legacy")
+        os.makedirs(legacy_dir)
+        chunks, embeddings = make_index(5, value=3.0)
+        with open(os.path.join(legacy_dir, "chunks.json"), "w", encoding="utf-8") as f:
+            json.dump(chunks, f)
+        np.save(os.path.join(legacy_dir, "embeddings.npy"), embeddings)
+        with open(os.path.join(legacy_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"chunk_count": 5}, f)
+        loaded = index_exists(legacy_dir) and len(load_index(legacy_dir)[0]) == 5
+        save_index(legacy_dir, *make_index(6))
+        migrated = os.path.exists(os.path.join(legacy_dir, CURRENT_FILE)) and \
+            not os.path.exists(os.path.join(legacy_dir, "meta.json")) and len(load_index(legacy_dir)[0]) == 6
+        print(f"{'✓' if loaded and migrated else '✗'} loaded: {loaded}, migrated: {migrated}")
+
+        print("\n6. Empty index:")
+        save_index(os.path.join(tmp, "empty"), [], np.zeros((0, 8), dtype=np.float32))
+        chunks, embeddings, _ = load_index(os.path.join(tmp, "empty"))
+        print(f"{'✓' if chunks == [] and len(embeddings) == 0 else '✗'} shape {embeddings.shape}")
+
+    print("\nAll tests completed!")
+
+if __name__ == "__main__":
+    test_index_store()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+PageFetcher Tester
+
+Runs the page fetch stage of the scraping agent against a local HTTP stand-in:
+concurrent downloads, the per-host limit, timeouts, readable text extraction
+and passage splitting. Pass --retrieval to also embed the passages and rank
+them (loads the embedding model).
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../Model/scraping_agent')))
+from page_fetcher import PageFetcher, best_passages, extract_readable_text, split_passages
+
+ARTICLE = """<html><head><title>Derivative</title><style>body {{ color: red; }}</style>
+<script>var tracking = "should not appear";</script></head><body>
+<nav><a href="/">Home</a> <a href="/about">About</a></nav>
+<h1>The derivative of a function</h1>
+<p>{text}</p>
+<footer>Copyright footer that should not appear in the extracted text.</footer>
+</body></html>"""
+
+PAGES = {
+    "/derivative": "The derivative measures how fast a function changes as its input changes. " * 8,
+    "/integral": "The integral adds up infinitely many small pieces to find an area under a curve. " * 8,
+    "/matrix": "A matrix is a rectangular array of numbers used to represent linear maps. " * 8,
+}
+PAGE_DELAY = 0.3
+
+class StandIn(BaseHTTPRequestHandler):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with StandIn.lock:
+            StandIn.active += 1
+            StandIn.peak = max(StandIn.peak, StandIn.active)
+        try:
+            if self.path == "/slow":
+                time.sleep(3)
+            else:
+                time.sleep(PAGE_DELAY)
+            path = self.path.split("?")[0]
+            if path not in PAGES and path != "/slow":
+                self.send_error(404)
+                return
+            body = ARTICLE.format(text=PAGES.get(path, "Slow page.")).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with StandIn.lock:
+                StandIn.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+def test_page_fetcher(with_retrieval=False):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    fetcher = PageFetcher(max_connections=8, per_host=2, timeout=1.0)
+
+    try:
+        print("\n1. Readable text extraction:")
+        title, text = extract_readable_text(ARTICLE.format(text=PAGES["/derivative"]))
+        ok = title == "Derivative" and "derivative measures" in text and "tracking" not in text and "Copyright" not in text
+        print(f"{'✓' if ok else '✗'} title: {title!r}, {len(text)} characters")
+
+        print("\n2. Passage splitting:")
+        passages = split_passages(text, size=200, overlap=40)
+        ok = len(passages) > 1 and all(len(p) <= 200 for p in passages)
+        print(f"{'✓' if ok else '✗'} {len(passages)} passages")
+
+        print("\n3. Concurrent fetch within the per-host limit:")
+        urls = [f"{base}{path}?copy={i}" for i in range(3) for path in PAGES]
+        start = time.perf_counter()
+        pages = fetcher.fetch_all(urls)
+        elapsed = time.perf_counter() - start
+        # 9 pages, 2 at a time: about 5 rounds of PAGE_DELAY instead of 9
+        ok = len(pages) == len(urls) and StandIn.peak <= 2 and elapsed < len(urls) * PAGE_DELAY
+        print(f"{'✓' if ok else '✗'} {len(pages)} pages in {elapsed:.2f}s, peak concurrency {StandIn.peak}")
+
+        print("\n4. Slow and missing pages are skipped:")
+        pages = fetcher.fetch_all([f"{base}/slow", f"{base}/missing", f"{base}/matrix"], deadline=2.5)
+        ok = [page["url"] for page in pages] == [f"{base}/matrix"]
+        print(f"{'✓' if ok else '✗'} fetched: {[page['url'] for page in pages]}")
+
+        if with_retrieval:
+            print("\n5. Best passages for a question:")
+            pages = fetcher.fetch_all([f"{base}{path}" for path in PAGES])
+            best = best_passages("How fast does a function change?", pages, top_k=1)
+            ok = bool(best) and best[0]["url"].endswith("/derivative")
+            print(f"{'✓' if ok else '✗'} best passage from: {best[0]['url'] if best else None}")
+    finally:
+        fetcher.close()
+        server.shutdown()
+
+    print("\nAll tests completed!")
+
+if __name__ == "__main__":
+    test_page_fetcher(with_retrieval="--retrieval" in sys.argv)
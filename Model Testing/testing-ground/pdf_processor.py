@@ -1,11 +1,87 @@
-import fitz  # PyMuPDF
+import math
 import os
+import re
+import sys
+import sqlite3
+import threading
 from typing import Dict, List, Optional, Tuple, Any
 import json
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from Model.pdf_agent.text_cache import extract_document
+
+DATABASE_FILE = "documents.sqlite3"
+TOKEN_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]+)"|(\S+)')
+SNIPPET_CONTEXT = 100
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    metadata TEXT NOT NULL,
+    toc TEXT NOT NULL,
+    page_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    doc_id TEXT NOT NULL REFERENCES documents(doc_id) ON DELETE CASCADE,
+    page_num INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    token_count INTEGER,
+    PRIMARY KEY (doc_id, page_num)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id TEXT NOT NULL REFERENCES documents(doc_id) ON DELETE CASCADE,
+    page_num INTEGER NOT NULL,
+    positions TEXT NOT NULL,
+    PRIMARY KEY (term, doc_id, page_num)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+"""
+
+
+def tokenize(text: str) -> List[Tuple[str, int]]:
+    """
+    Split text into lower-cased word tokens.
+    
+    Args:
+        text: Text to split.
+        
+    Returns:
+        List of (term, character offset) pairs, in order.
+    """
+    return [(match.group().lower(), match.start()) for match in TOKEN_RE.finditer(text)]
+
+
+def parse_query(query: str) -> List[List[str]]:
+    """
+    Split a search query into phrases: "quoted words" form one phrase, other words are single terms.
+    
+    Args:
+        query: The search query.
+        
+    Returns:
+        List of phrases, each a list of terms.
+    """
+    phrases = []
+    for quoted, word in QUERY_RE.findall(query):
+        terms = [term for term, _ in tokenize(quoted or word)]
+        if quoted and terms:
+            phrases.append(terms)
+        else:
+            phrases.extend([term] for term in terms)
+    return phrases
+
 class PDFProcessor:
     """
     A class for processing PDF documents and extracting their contents.
+    
+    Documents are kept in a SQLite page store inside the storage directory, so
+    metadata, a single page or a page range can be read without loading the
+    whole document.
     """
     
     def __init__(self, storage_dir: str = "pdf_storage"):
@@ -17,6 +93,18 @@ class PDFProcessor:
         """
         self.storage_dir = storage_dir
         os.makedirs(storage_dir, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(storage_dir, DATABASE_FILE), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+        # Stores created before pages had a token_count: the column is added here, and
+        # _index_documents indexes every page that does not have one yet
+        if "token_count" not in [row[1] for row in self._db.execute("PRAGMA table_info(pages)")]:
+            self._db.execute("ALTER TABLE pages ADD COLUMN token_count INTEGER")
+        self._import_json_documents()
+        self._index_documents()
     
     def process_pdf(self, pdf_path: str, doc_id: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -36,42 +124,24 @@ class PDFProcessor:
         if doc_id is None:
             doc_id = os.path.basename(pdf_path).replace('.pdf', '')
         
-        # Open the PDF
-        doc = fitz.open(pdf_path)
+        # Pages, TOC and metadata come from the shared text cache, parsed once per file version
+        document = extract_document(pdf_path)
+        pdf_metadata = document["metadata"]
         
         # Extract document metadata
         metadata = {
-            "title": doc.metadata.get("title", ""),
-            "author": doc.metadata.get("author", ""),
-            "subject": doc.metadata.get("subject", ""),
-            "keywords": doc.metadata.get("keywords", ""),
-            "creator": doc.metadata.get("creator", ""),
-            "producer": doc.metadata.get("producer", ""),
-            "page_count": len(doc),
+            "title": pdf_metadata.get("title", ""),
+            "author": pdf_metadata.get("author", ""),
+            "subject": pdf_metadata.get("subject", ""),
+            "keywords": pdf_metadata.get("keywords", ""),
+            "creator": pdf_metadata.get("creator", ""),
+            "producer": pdf_metadata.get("producer", ""),
+            "page_count": len(document["pages"]),
             "doc_id": doc_id
         }
         
-        # Extract text and structure from each page
-        pages = []
-        toc = doc.get_toc()
-        
-        for page_num, page in enumerate(doc):
-            # Extract text
-            text = page.get_text()
-            
-            # Extract images (optional)
-            # images = self._extract_images(page)
-            
-            # Extract tables (requires additional processing)
-            # tables = self._extract_tables(page)
-            
-            # Add page data
-            pages.append({
-                "page_num": page_num + 1,
-                "text": text,
-                # "images": images,
-                # "tables": tables
-            })
+        toc = document["toc"]
+        pages = [{"page_num": page_num + 1, "text": text} for page_num, text in enumerate(document["pages"])]
         
         # Create the document data structure
         document_data = {
@@ -83,9 +153,6 @@ class PDFProcessor:
         # Save the extracted content
         self._save_document_data(doc_id, document_data)
         
-        # Close the document
-        doc.close()
-        
         return document_data
     
     def get_document_content(self, doc_id: str) -> Dict[str, Any]:
@@ -98,13 +165,12 @@ class PDFProcessor:
         Returns:
             The document data.
         """
-        json_path = os.path.join(self.storage_dir, f"{doc_id}.json")
-        
-        if not os.path.exists(json_path):
-            raise FileNotFoundError(f"Document data not found: {json_path}")
-        
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        metadata, toc, page_count = self._document_row(doc_id)
+        return {
+            "metadata": metadata,
+            "toc": toc,
+            "pages": self.get_pages(doc_id, 1, page_count)
+        }
     
     def get_document_text(self, doc_id: str) -> str:
         """
@@ -116,12 +182,49 @@ class PDFProcessor:
         Returns:
             The document text.
         """
-        doc_data = self.get_document_content(doc_id)
+        self._document_row(doc_id)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT text FROM pages WHERE doc_id = ? ORDER BY page_num", (doc_id,)).fetchall()
         
         # Concatenate text from all pages
-        full_text = "\n\n".join(page["text"] for page in doc_data["pages"])
+        return "\n\n".join(text for (text,) in rows)
+    
+    def get_page(self, doc_id: str, page_num: int) -> Dict[str, Any]:
+        """
+        Get a single page of a document.
+        
+        Args:
+            doc_id: The document ID.
+            page_num: Page number, starting at 1.
+            
+        Returns:
+            The page data.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT text FROM pages WHERE doc_id = ? AND page_num = ?", (doc_id, page_num)).fetchone()
+        if row is None:
+            raise KeyError(f"Page {page_num} of document {doc_id} not found")
+        return {"page_num": page_num, "text": row[0]}
+    
+    def get_pages(self, doc_id: str, start: int, end: int) -> List[Dict[str, Any]]:
+        """
+        Get a range of pages of a document.
         
-        return full_text
+        Args:
+            doc_id: The document ID.
+            start: First page number, starting at 1.
+            end: Last page number (inclusive).
+            
+        Returns:
+            The pages in the range, in order.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT page_num, text FROM pages WHERE doc_id = ? AND page_num BETWEEN ? AND ? ORDER BY page_num",
+                (doc_id, start, end)).fetchall()
+        return [{"page_num": page_num, "text": text} for page_num, text in rows]
     
     def _save_document_data(self, doc_id: str, data: Dict[str, Any]) -> None:
         """
@@ -131,10 +234,64 @@ class PDFProcessor:
             doc_id: The document ID.
             data: The document data to save.
         """
-        json_path = os.path.join(self.storage_dir, f"{doc_id}.json")
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # One transaction, so readers see either the old or the new version of the document
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            self._db.execute(
+                "INSERT INTO documents (doc_id, metadata, toc, page_count) VALUES (?, ?, ?, ?)",
+                (doc_id, json.dumps(data["metadata"], ensure_ascii=False),
+                 json.dumps(data["toc"], ensure_ascii=False), len(data["pages"])))
+            self._db.executemany(
+                "INSERT INTO pages (doc_id, page_num, text) VALUES (?, ?, ?)",
+                ((doc_id, page["page_num"], page["text"]) for page in data["pages"]))
+            for page in data["pages"]:
+                self._index_page(doc_id, page["page_num"], page["text"])
+    
+    def _index_page(self, doc_id: str, page_num: int, text: str) -> None:
+        """
+        Add the postings of one page to the inverted index (caller holds the lock and transaction).
+        """
+        tokens = tokenize(text)
+        positions: Dict[str, List[List[int]]] = {}
+        for index, (term, offset) in enumerate(tokens):
+            positions.setdefault(term, []).append([index, offset])
+        self._db.executemany(
+            "INSERT INTO postings (term, doc_id, page_num, positions) VALUES (?, ?, ?, ?)",
+            ((term, doc_id, page_num, json.dumps(term_positions)) for term, term_positions in positions.items()))
+        self._db.execute("UPDATE pages SET token_count = ? WHERE doc_id = ? AND page_num = ?",
+                         (len(tokens), doc_id, page_num))
+    
+    def _index_documents(self) -> None:
+        """
+        Build the inverted index for pages stored before the index existed.
+        """
+        with self._lock, self._db:
+            rows = self._db.execute(
+                "SELECT doc_id, page_num, text FROM pages WHERE token_count IS NULL").fetchall()
+            for doc_id, page_num, text in rows:
+                self._db.execute("DELETE FROM postings WHERE doc_id = ? AND page_num = ?", (doc_id, page_num))
+                self._index_page(doc_id, page_num, text)
+    
+    def _document_row(self, doc_id: str) -> Tuple[Dict[str, Any], List[Any], int]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT metadata, toc, page_count FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Document data not found: {doc_id}")
+        return json.loads(row[0]), json.loads(row[1]), row[2]
+    
+    def _import_json_documents(self) -> None:
+        """
+        Move documents saved as <doc_id>.json by earlier versions into the page store.
+        """
+        for filename in os.listdir(self.storage_dir):
+            if not filename.endswith(".json"):
+                continue
+            json_path = os.path.join(self.storage_dir, filename)
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._save_document_data(filename.replace('.json', ''), data)
+            os.remove(json_path)
     
     def list_documents(self) -> List[str]:
         """
@@ -143,14 +300,9 @@ class PDFProcessor:
         Returns:
             A list of document IDs.
         """
-        documents = []
-        
-        for filename in os.listdir(self.storage_dir):
-            if filename.endswith(".json"):
-                doc_id = filename.replace('.json', '')
-                documents.append(doc_id)
-        
-        return documents
+        with self._lock:
+            rows = self._db.execute("SELECT doc_id FROM documents ORDER BY doc_id").fetchall()
+        return [doc_id for (doc_id,) in rows]
     
     def get_document_summary(self, doc_id: str) -> Dict[str, Any]:
         """
@@ -162,8 +314,67 @@ class PDFProcessor:
         Returns:
             Document metadata.
         """
-        doc_data = self.get_document_content(doc_id)
-        return doc_data["metadata"]
+        metadata, _, _ = self._document_row(doc_id)
+        return metadata
+    
+    def _phrase_matches(self, phrase: List[str], doc_id: Optional[str] = None) -> Dict[Tuple[str, int], List[Tuple[int, int]]]:
+        """
+        Find the pages that contain one phrase.
+        
+        Returns:
+            {(doc_id, page_num): (start offset, end offset) occurrences}
+        """
+        postings = []
+        for term in phrase:
+            query = "SELECT doc_id, page_num, positions FROM postings WHERE term = ?"
+            params = [term]
+            if doc_id is not None:
+                query += " AND doc_id = ?"
+                params.append(doc_id)
+            with self._lock:
+                rows = self._db.execute(query, params).fetchall()
+            postings.append({(row[0], row[1]): json.loads(row[2]) for row in rows})
+        
+        # Pages with every term of the phrase, then the term positions have to follow each other
+        phrase_matches = {}
+        for page in set(postings[0]).intersection(*postings[1:]):
+            following = [{index: offset for index, offset in term_postings[page]} for term_postings in postings[1:]]
+            occurrences = []
+            for index, offset in postings[0][page]:
+                if all(index + i + 1 in positions for i, positions in enumerate(following)):
+                    last_offset = following[-1][index + len(following)] if following else offset
+                    occurrences.append((offset, last_offset + len(phrase[-1])))
+            if occurrences:
+                phrase_matches[page] = occurrences
+        return phrase_matches
+    
+    @staticmethod
+    def _pages_with_all(per_phrase: List[Dict[Tuple[str, int], List[Tuple[int, int]]]]) -> Dict[Tuple[str, int], List[List[Tuple[int, int]]]]:
+        """
+        Keep the pages matched by every phrase, with one list of occurrences per phrase.
+        """
+        if not per_phrase:
+            return {}
+        pages = set(per_phrase[0]).intersection(*per_phrase[1:])
+        return {page: [phrase_matches[page] for phrase_matches in per_phrase] for page in pages}
+    
+    def _match_phrases(self, phrases: List[List[str]], doc_id: Optional[str] = None) -> Dict[Tuple[str, int], List[List[Tuple[int, int]]]]:
+        """
+        Find the pages that contain every phrase.
+        
+        Returns:
+            {(doc_id, page_num): one list per phrase of (start offset, end offset) occurrences}
+        """
+        per_phrase = []
+        for phrase in phrases:
+            phrase_matches = self._phrase_matches(phrase, doc_id)
+            if not phrase_matches:
+                return {}
+            per_phrase.append(phrase_matches)
+        return self._pages_with_all(per_phrase)
+    
+    def _snippet(self, text: str, start: int, end: int) -> str:
+        return text[max(0, start - SNIPPET_CONTEXT):min(len(text), end + SNIPPET_CONTEXT)]
     
     def search_document(self, doc_id: str, query: str) -> List[Dict[str, Any]]:
         """
@@ -171,31 +382,84 @@ class PDFProcessor:
         
         Args:
             doc_id: The document ID.
-            query: The search query.
+            query: The search query. "Quoted words" are matched as a phrase, other words as
+                single terms; a page has to contain all of them.
             
         Returns:
-            A list of search results with page numbers and snippets.
+            A list of search results with page numbers and snippets, one per occurrence.
         """
-        doc_data = self.get_document_content(doc_id)
+        self._document_row(doc_id)
+        matches = self._match_phrases(parse_query(query), doc_id)
         results = []
         
-        for page in doc_data["pages"]:
-            page_num = page["page_num"]
-            text = page["text"]
-            
-            if query.lower() in text.lower():
-                # Find the position of the query
-                pos = text.lower().find(query.lower())
-                
-                # Get a snippet of text around the query
-                start = max(0, pos - 100)
-                end = min(len(text), pos + len(query) + 100)
-                snippet = text[start:end]
-                
-                # Add to results
+        for (_, page_num), phrase_occurrences in sorted(matches.items()):
+            text = self.get_page(doc_id, page_num)["text"]
+            occurrences = sorted(occurrence for occurrences in phrase_occurrences for occurrence in occurrences)
+            for start, end in occurrences:
                 results.append({
                     "page_num": page_num,
-                    "snippet": snippet
+                    "offset": start,
+                    "snippet": self._snippet(text, start, end)
                 })
         
         return results
+    
+    def search(self, query: str, doc_ids: Optional[List[str]] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search all processed documents and rank the matching pages (BM25).
+        
+        Args:
+            query: The search query, same syntax as search_document.
+            doc_ids: Only search these documents.
+            limit: Maximum number of pages returned.
+            
+        Returns:
+            Best pages first, each with doc_id, page_num, score, occurrence count and snippets.
+        """
+        phrases = parse_query(query)
+        if not phrases:
+            return []
+        # The matches of each phrase on its own also give its document frequency, over all pages
+        per_phrase = [self._phrase_matches(phrase) for phrase in phrases]
+        frequencies = [len(phrase_matches) for phrase_matches in per_phrase]
+        matches = self._pages_with_all(per_phrase)
+        if doc_ids is not None:
+            allowed = set(doc_ids)
+            matches = {page: occurrences for page, occurrences in matches.items() if page[0] in allowed}
+        if not matches:
+            return []
+        
+        with self._lock:
+            page_count, average_length = self._db.execute(
+                "SELECT COUNT(*), AVG(token_count) FROM pages").fetchone()
+            # Lengths of the matching pages in one query (every page of the matching documents)
+            matched_docs = sorted({doc_id for doc_id, _ in matches})
+            rows = self._db.execute(
+                f"SELECT doc_id, page_num, token_count FROM pages WHERE doc_id IN ({', '.join('?' * len(matched_docs))})",
+                matched_docs).fetchall()
+        average_length = average_length or 1
+        lengths = {(row[0], row[1]): row[2] or 0 for row in rows}
+        
+        scored = []
+        for (doc_id, page_num), phrase_occurrences in matches.items():
+            length = lengths[(doc_id, page_num)]
+            score = 0.0
+            for occurrences, frequency in zip(phrase_occurrences, frequencies):
+                idf = math.log(1 + (page_count - frequency + 0.5) / (frequency + 0.5))
+                tf = len(occurrences)
+                score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average_length))
+            scored.append((score, doc_id, page_num, phrase_occurrences))
+        scored.sort(key=lambda item: (-item[0], item[1], item[2]))
+        
+        results = []
+        for score, doc_id, page_num, phrase_occurrences in scored[:limit]:
+            text = self.get_page(doc_id, page_num)["text"]
+            occurrences = sorted(occurrence for occurrences in phrase_occurrences for occurrence in occurrences)
+            results.append({
+                "doc_id": doc_id,
+                "page_num": page_num,
+                "score": round(score, 4),
+                "occurrences": len(occurrences),
+                "snippets": [self._snippet(text, start, end) for start, end in occurrences[:3]]
+            })
+        return results
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+SearchCache Tester
+
+Exercises the web search cache of the scraping agent offline, with the
+file-backed fake search backend: hits, TTL expiry, stale-while-revalidate
+and size-bounded eviction.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../Model/scraping_agent')))
+from search_cache import FileSearchBackend, SearchCache
+
+def test_search_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = FileSearchBackend(os.path.join(tmp, "fixtures.json"))
+        cache = SearchCache(os.path.join(tmp, "cache.sqlite3"), ttl=0.5, stale=2.0, max_entries=3)
+        params = {"q": "derivata unei funcții", "engine": "google", "num": 3}
+
+        print("\n1. Miss, then hit:")
+        first = cache.search(backend, params)
+        second = cache.search(backend, params)
+        ok = first == second and backend.calls == 1
+        print(f"{'✓' if ok else '✗'} backend calls: {backend.calls}, stats: {cache.stats}")
+
+        print("\n2. Stale entry served at once and refreshed in the background:")
+        time.sleep(0.6)
+        start = time.perf_counter()
+        cache.search(backend, params)
+        elapsed = (time.perf_counter() - start) * 1000
+        time.sleep(0.2)
+        ok = cache.stats["stale"] == 1 and backend.calls == 2
+        print(f"{'✓' if ok else '✗'} served in {elapsed:.1f} ms, backend calls: {backend.calls}")
+
+        print("\n3. Expired beyond the stale window:")
+        time.sleep(2.6)
+        cache.search(backend, params)
+        ok = cache.stats["miss"] == 2
+        print(f"{'✓' if ok else '✗'} stats: {cache.stats}")
+
+        print("\n4. Least recently used entries are evicted:")
+        for question in ("a", "b", "c", "d"):
+            cache.search(backend, {**params, "q": question})
+        count = cache.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        print(f"{'✓' if count == 3 else '✗'} entries kept: {count}")
+
+    print("\nAll tests completed!")
+
+if __name__ == "__main__":
+    test_search_cache()
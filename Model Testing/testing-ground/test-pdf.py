@@ -118,6 +118,17 @@ def test_pdf_processor(pdf_path):
     else:
         print("  Could not find any common words in the document.")
     
+    # Test 7: search method (ranked, across all processed documents)
+    print("\n7. Testing search() method:")
+    try:
+        results = processor.search(" ".join(common_words[:2]))
+        print(f"✓ Successfully searched all documents")
+        for result in results[:3]:
+            print(f"  {result['doc_id']} page {result['page_num']}: score {result['score']}, "
+                  f"{result['occurrences']} occurrence(s)")
+    except Exception as e:
+        print(f"✗ Error in search(): {str(e)}")
+    
     print("\nAll tests completed!")
     
     return doc_id
@@ -2,6 +2,16 @@ import os
 from openai import OpenAI
 from typing import Optional, List, Dict, Any, Tuple
 
+try:
+    from monitoring.metrics import track_llm_call
+except ImportError:
+    try:
+        from Model.monitoring.metrics import track_llm_call
+    except ImportError:
+        import sys
+        sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+        from Model.monitoring.metrics import track_llm_call
+
 class EducationalAiAgent:
     """
     An AI agent designed specifically for educational purposes that provides
@@ -126,8 +136,10 @@ Once you've identified the variables, try setting up the initial equation. What
         messages.append({"role": "user", "content": question})
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = track_llm_call(
+                "openai",
+                self.model,
+                self.client.chat.completions.create,
                 messages=messages,
                 temperature=0.7,  # Slightly higher temperature for more varied educational responses
             )
@@ -174,8 +186,10 @@ Once you've identified the variables, try setting up the initial equation. What
         messages.append({"role": "user", "content": question})
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = track_llm_call(
+                "openai",
+                self.model,
+                self.client.chat.completions.create,
                 messages=messages
             )
             return response.choices[0].message.content
@@ -216,8 +230,10 @@ Once you've identified the variables, try setting up the initial equation. What
         messages.append({"role": "user", "content": question})
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = track_llm_call(
+                "openai",
+                self.model,
+                self.client.chat.completions.create,
                 messages=messages
             )
             
@@ -10,30 +10,38 @@ With fixed mode switching to ensure prompts go to the correct model.
 """
 
 import os
+import threading
 from typing import Optional, List, Dict, Any, Tuple
 
-# Import the specialized agents - modify these imports based on your project structure
-# For absolute imports (when running as a module):
-# from Model.context_agent.educational_agent import EducationalAiAgent
-# from Model.pdf_agent.groq_pdf_processor import PDFContextQA
+# The specialized agents are imported on first use: the PDF agent pulls in the embedding
+# model (sentence-transformers/torch) and the Groq client, the guide agent the OpenAI client,
+# and callers that only need one mode, or none yet, shouldn't pay for the others.
+def _import_guide_agent():
+    try:
+        # Try local imports first
+        from context_agent.educational_agent import EducationalAiAgent
+    except ImportError:
+        try:
+            # Try absolute imports if local imports fail
+            from Model.context_agent.educational_agent import EducationalAiAgent
+        except ImportError:
+            # Try relative imports as a last resort
+            import sys
+            sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+            from Model.context_agent.educational_agent import EducationalAiAgent
+    return EducationalAiAgent
 
-# For local imports (when running directly):
-try:
-    # Try local imports first
-    from context_agent.educational_agent import EducationalAiAgent
-    from pdf_agent.groq_pdf_processor import PDFContextQA
-except ImportError:
+def _import_qa_agent():
     try:
-        # Try absolute imports if local imports fail
-        from Model.context_agent.educational_agent import EducationalAiAgent
-        from Model.pdf_agent.groq_pdf_processor import PDFContextQA
+        from pdf_agent.groq_pdf_processor import PDFContextQA
     except ImportError:
-        # Try relative imports as a last resort
-        import sys
-        import os
-        sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-        from Model.context_agent.educational_agent import EducationalAiAgent
-        from Model.pdf_agent.groq_pdf_processor import PDFContextQA
+        try:
+            from Model.pdf_agent.groq_pdf_processor import PDFContextQA
+        except ImportError:
+            import sys
+            sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+            from Model.pdf_agent.groq_pdf_processor import PDFContextQA
+    return PDFContextQA
 
 class CombinedEducationalAgent:
     """
@@ -51,31 +59,17 @@ class CombinedEducationalAgent:
         openai_model: str = "gpt-3.5-turbo",
         groq_model: str = "llama3-70b-8192"
     ):
-        """Initialize the agent with API keys and create specialized agent instances."""
-        # Initialize OpenAI-based Educational Agent
+        """Initialize the agent with API keys; the specialized agents are created on first use."""
+        # OpenAI-based Educational Agent
         self.guide_agent = None
         self.openai_api_key = openai_api_key
         self.openai_model = openai_model
-        
-        if openai_api_key:
-            try:
-                self.guide_agent = EducationalAiAgent(api_key=openai_api_key)
-                self.guide_agent.set_model(openai_model)
-                print("Guide agent initialized successfully with OpenAI.")
-            except Exception as e:
-                print(f"Warning: Failed to initialize guide agent: {str(e)}")
             
-        # Initialize Groq-based PDF QA Agent
+        # Groq-based PDF QA Agent
         self.qa_agent = None
         self.groq_api_key = groq_api_key
         self.groq_model = groq_model
-        
-        if groq_api_key:
-            try:
-                self.qa_agent = PDFContextQA(api_key=groq_api_key, model_name=groq_model)
-                print("QA agent initialized successfully with Groq.")
-            except Exception as e:
-                print(f"Warning: Failed to initialize QA agent: {str(e)}")
+        self._agents_lock = threading.Lock()
             
         # Current operating mode
         self.mode = self.MODE_GUIDE  # Default to guide mode
@@ -89,22 +83,25 @@ class CombinedEducationalAgent:
     
     def _ensure_guide_agent(self):
         """Make sure the guide agent is initialized."""
-        if not self.guide_agent and self.openai_api_key:
-            try:
-                self.guide_agent = EducationalAiAgent(api_key=self.openai_api_key)
-                self.guide_agent.set_model(self.openai_model)
-                print("Guide agent initialized.")
-            except Exception as e:
-                print(f"Error initializing guide agent: {str(e)}")
+        with self._agents_lock:
+            if not self.guide_agent and self.openai_api_key:
+                try:
+                    guide_agent = _import_guide_agent()(api_key=self.openai_api_key)
+                    guide_agent.set_model(self.openai_model)
+                    self.guide_agent = guide_agent
+                    print("Guide agent initialized.")
+                except Exception as e:
+                    print(f"Error initializing guide agent: {str(e)}")
                 
     def _ensure_qa_agent(self):
         """Make sure the QA agent is initialized."""
-        if not self.qa_agent and self.groq_api_key:
-            try:
-                self.qa_agent = PDFContextQA(api_key=self.groq_api_key, model_name=self.groq_model)
-                print("QA agent initialized.")
-            except Exception as e:
-                print(f"Error initializing QA agent: {str(e)}")
+        with self._agents_lock:
+            if not self.qa_agent and self.groq_api_key:
+                try:
+                    self.qa_agent = _import_qa_agent()(api_key=self.groq_api_key, model_name=self.groq_model)
+                    print("QA agent initialized.")
+                except Exception as e:
+                    print(f"Error initializing QA agent: {str(e)}")
     
     def set_mode(self, mode: str) -> str:
         """
@@ -183,13 +180,63 @@ class CombinedEducationalAgent:
             
         except Exception as e:
             return f"Error loading PDF: {str(e)}"
-    
-    def query(self, question: str) -> Dict[str, Any]:
+
+    def load_index(self, index_dir: str, pdf_path: Optional[str] = None) -> str:
+        """
+        Load a PDF index that was built ahead of time (see PDFContextQA.save_index).
+
+        Args:
+            index_dir: Directory of the saved index
+            pdf_path: Path of the PDF the index was built from, for status reporting
+
+        Returns:
+            Status message
+        """
+        self._ensure_qa_agent()
+
+        if not self.qa_agent:
+            return "Error: Loading PDFs requires a Groq API key, which is not available or invalid."
+
+        try:
+            self.qa_agent.load_index(index_dir)
+
+            self.pdf_loaded = True
+            self.pdf_path = pdf_path or index_dir
+
+            return f"PDF index loaded successfully: {self.pdf_path}. {len(self.qa_agent.chunks)} chunks available."
+
+        except Exception as e:
+            return f"Error loading PDF index: {str(e)}"
+
+    def open_document(self, index_dir: Optional[str] = None, pdf_path: Optional[str] = None):
+        """
+        Get a PDF as a document for query(), without making it the loaded PDF.
+        
+        Unlike load_index/load_pdf, this doesn't change the agent's state, so concurrent
+        requests (the API) can each ask about a different PDF.
+        
+        Args:
+            index_dir: Directory of an index built ahead of time (cached, see PDFContextQA.preload_index)
+            pdf_path: PDF to process now when there is no index
+            
+        Returns:
+            (chunks, embeddings, index) tuple, or None if the QA agent is not available
+        """
+        self._ensure_qa_agent()
+        if not self.qa_agent:
+            return None
+        if index_dir:
+            return self.qa_agent.preload_index(index_dir)
+        return self.qa_agent.build_document(pdf_path)
+
+    def query(self, question: str, document=None) -> Dict[str, Any]:
         """
         Process a query based on the current mode.
         
         Args:
             question: The user's question
+            document: In QA mode, a document from open_document to answer from instead
+                of the loaded PDF
             
         Returns:
             Dictionary with the response and metadata
@@ -206,18 +253,18 @@ class CombinedEducationalAgent:
         })
 
         if self.mode == self.MODE_QA:
-            return self._handle_qa_query(question)
+            return self._handle_qa_query(question, document)
         else:  # MODE_GUIDE
             return self._handle_guide_query(question)
     
-    def _handle_qa_query(self, question: str) -> Dict[str, Any]:
+    def _handle_qa_query(self, question: str, document=None) -> Dict[str, Any]:
         """Handle a query in QA mode."""
         # Ensure QA agent is initialized
         self._ensure_qa_agent()
         
         try:
             # Ensure PDF is loaded for QA mode
-            if not self.pdf_loaded:
+            if document is None and not self.pdf_loaded:
                 result = {
                     "answer": "Please load a PDF document first using the load_pdf method.",
                     "mode": self.mode
@@ -244,7 +291,7 @@ class CombinedEducationalAgent:
             
             # Get answer from the PDFContextQA agent
             print("Querying PDFContextQA agent...")
-            qa_result = self.qa_agent.answer_question(question)
+            qa_result = self.qa_agent.answer_question(question, document=document)
             
             result = {
                 "answer": qa_result["answer"],
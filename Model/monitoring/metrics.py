@@ -0,0 +1,438 @@
+"""
+Lightweight Prometheus-style metrics
+
+Counters and histograms kept in process memory and rendered in the Prometheus
+text exposition format, so the API can expose them on /metrics without any
+extra dependency.
+
+With several server processes (Api/serve.py), each process writes a snapshot of
+its metrics to a shared directory and /metrics renders the sum of all of them, so
+any worker answers with the totals of the whole server (see enable_multiprocess).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing value, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(total: Dict[Tuple[str, ...], float], key: Tuple[str, ...], value: float) -> None:
+        total[key] = total.get(key, 0.0) + value
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], float]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        values = self.snapshot() if values is None else values
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Observations grouped into cumulative buckets, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], List[float]]:
+        with self._lock:
+            return {key: list(series) for key, series in self._values.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(total: Dict[Tuple[str, ...], List[float]], key: Tuple[str, ...], series: List[float]) -> None:
+        if key in total:
+            total[key] = [a + b for a, b in zip(total[key], series)]
+        else:
+            total[key] = list(series)
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], List[float]]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        values = self.snapshot() if values is None else values
+        for key, series in sorted(values.items()):
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> Dict[str, list]:
+        """Values of every metric as JSON-serializable data: {name: [[label values, value], ...]}."""
+        with self._lock:
+            metrics = list(self._metrics)
+        return {metric.name: [[list(key), value] for key, value in metric.snapshot().items()] for metric in metrics}
+
+    def reset(self) -> None:
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            metric.reset()
+
+    def combine(self, snapshots: List[Dict[str, list]]) -> Dict[str, dict]:
+        """Sum several snapshots: {name: {label values: value}}. Unknown metrics are ignored."""
+        with self._lock:
+            metrics = list(self._metrics)
+        combined = {}
+        for metric in metrics:
+            values = combined[metric.name] = {}
+            for snapshot in snapshots:
+                for key, value in snapshot.get(metric.name, []):
+                    metric.merge(values, tuple(key), value)
+        return combined
+
+    def render(self, snapshots: Optional[List[Dict[str, list]]] = None) -> str:
+        """
+        Render the metrics in the Prometheus text format.
+
+        Args:
+            snapshots: Render the sum of these snapshots (see snapshot) instead of this process's values
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        combined = self.combine(snapshots) if snapshots is not None else {}
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render(combined.get(metric.name)))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Processing stages of a chat request: pdf_extract, embedding_encode, retrieval
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "edu_stage_duration_seconds", "Time spent in each processing stage.", ("stage",)))
+PDF_PAGES = REGISTRY.register(Counter(
+    "edu_pdf_pages_extracted_total", "Number of PDF pages extracted."))
+PDF_TEXT_CACHE = REGISTRY.register(Counter(
+    "edu_pdf_text_cache_total", "PDF text cache lookups.", ("result",)))
+EMBEDDED_TEXTS = REGISTRY.register(Counter(
+    "edu_embedding_texts_total", "Number of texts encoded by the embedding model."))
+
+LLM_SECONDS = REGISTRY.register(Histogram(
+    "edu_llm_request_duration_seconds", "LLM chat completion latency.", ("provider", "model")))
+LLM_REQUESTS = REGISTRY.register(Counter(
+    "edu_llm_requests_total", "LLM chat completion calls.", ("provider", "model", "status")))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "edu_llm_tokens_total", "Tokens reported by the LLM provider.", ("provider", "model", "kind")))
+
+MONGO_SECONDS = REGISTRY.register(Histogram(
+    "edu_mongo_command_duration_seconds", "MongoDB command latency.", ("command", "status")))
+
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "edu_http_request_duration_seconds", "Total HTTP request time.", ("method", "endpoint", "status")))
+
+
+# Stage timings of the request currently being handled, if the caller asked for them
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings():
+    """
+    Start collecting stage timings for the current request (thread or context).
+
+    Returns:
+        Token to pass to stop_request_timings
+    """
+    return _request_timings.set([])
+
+
+def stop_request_timings(token) -> List[Tuple[str, float]]:
+    """
+    Stop collecting stage timings for the current request.
+
+    Args:
+        token: Value returned by start_request_timings
+
+    Returns:
+        List of (stage name, seconds), in the order the stages finished
+    """
+    timings = _request_timings.get() or []
+    try:
+        _request_timings.reset(token)
+    except ValueError:
+        # Token created in another context (e.g. a different thread); just stop collecting here
+        _request_timings.set(None)
+    return timings
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """
+    Add a stage timing to the current request, if timings are being collected.
+
+    Args:
+        name: Stage name
+        seconds: Duration of the stage
+    """
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a processing stage.
+
+    Args:
+        name: Stage name, used as the `stage` label
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        record_timing(name, elapsed)
+
+
+def track_llm_call(provider: str, model: str, create, **kwargs):
+    """
+    Call a chat completions `create` function and record latency, outcome and token usage.
+
+    Args:
+        provider: LLM provider name (openai, groq, ...)
+        model: Model name, passed through to `create`
+        create: The client's chat.completions.create method
+        **kwargs: Other arguments for `create`
+
+    Returns:
+        The provider response
+    """
+    start = time.perf_counter()
+    status = "error"
+    try:
+        response = create(model=model, **kwargs)
+        status = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        LLM_SECONDS.observe(elapsed, provider=provider, model=model)
+        LLM_REQUESTS.inc(provider=provider, model=model, status=status)
+        record_timing(f"llm_{provider}", elapsed)
+
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, provider=provider, model=model, kind="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, provider=provider, model=model, kind="completion")
+    return response
+
+
+# Multi-process mode: directory of per-process snapshots, and this process's snapshot name
+_multiprocess_dir: Optional[str] = None
+_snapshot_name: Optional[str] = None
+SNAPSHOT_INTERVAL = 5.0
+RETIRED_SNAPSHOT = "retired"
+
+
+def enable_multiprocess(directory: str, name: str) -> None:
+    """
+    Share metrics between the processes of a server through snapshot files.
+
+    Every process writes <directory>/<name>.json; render_metrics() sums all of them.
+    Call it in the parent before forking (the parent's own values are written with
+    write_snapshot), then start_process_snapshots() in each child.
+
+    Args:
+        directory: Directory shared by the processes; should be emptied when the server starts
+        name: Snapshot name of this process
+    """
+    global _multiprocess_dir, _snapshot_name
+    os.makedirs(directory, exist_ok=True)
+    _multiprocess_dir = directory
+    _snapshot_name = name
+
+
+def start_process_snapshots(name: str, interval: float = SNAPSHOT_INTERVAL) -> None:
+    """
+    Start writing this (forked) process's snapshot every `interval` seconds.
+
+    The values inherited from the parent are cleared first: they are already in the parent's snapshot.
+
+    Args:
+        name: Snapshot name, unique among the running processes (e.g. "worker-<pid>")
+        interval: Seconds between writes
+    """
+    global _snapshot_name
+    REGISTRY.reset()
+    _snapshot_name = name
+
+    def write_loop():
+        while True:
+            time.sleep(interval)
+            try:
+                write_snapshot()
+            except OSError as e:
+                print("Error writing the metrics snapshot:", e)
+
+    threading.Thread(target=write_loop, name="metrics-snapshot", daemon=True).start()
+
+
+def _snapshot_path(name: str) -> str:
+    return os.path.join(_multiprocess_dir, f"{name}.json")
+
+
+@contextmanager
+def _directory_lock(exclusive: bool):
+    import fcntl
+    with open(os.path.join(_multiprocess_dir, ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _write_json(path: str, data) -> None:
+    # Written to a temporary file and renamed, so readers never see a partial snapshot
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, list]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot() -> None:
+    """Write this process's current values to its snapshot file (multi-process mode only)."""
+    if _multiprocess_dir is None or _snapshot_name is None:
+        return
+    _write_json(_snapshot_path(_snapshot_name), REGISTRY.snapshot())
+
+
+def retire_snapshot(name: str) -> None:
+    """
+    Fold the snapshot of a process that has exited into the retired totals.
+
+    Called by the parent when it reaps a child, so counters keep growing when workers
+    are recycled, and the directory holds one file per running process.
+
+    Args:
+        name: Snapshot name of the exited process
+    """
+    if _multiprocess_dir is None:
+        return
+    path = _snapshot_path(name)
+    # Readers hold the shared lock, so they never see the values in both files or in neither
+    with _directory_lock(exclusive=True):
+        snapshot = _read_json(path)
+        if snapshot is None:
+            return
+        retired = _read_json(_snapshot_path(RETIRED_SNAPSHOT)) or {}
+        combined = REGISTRY.combine([retired, snapshot])
+        _write_json(_snapshot_path(RETIRED_SNAPSHOT),
+                    {name: [[list(key), value] for key, value in values.items()] for name, values in combined.items()})
+        os.remove(path)
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    if _multiprocess_dir is None:
+        return REGISTRY.render()
+
+    # Current values of this process, then the sum over every process of the server
+    write_snapshot()
+    snapshots = []
+    with _directory_lock(exclusive=False):
+        for file_name in sorted(os.listdir(_multiprocess_dir)):
+            if file_name.endswith(".json"):
+                snapshot = _read_json(os.path.join(_multiprocess_dir, file_name))
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+    return REGISTRY.render(snapshots)
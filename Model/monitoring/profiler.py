@@ -0,0 +1,86 @@
+"""
+Sampling profiler for a single thread
+
+Periodically captures the call stack of one thread and aggregates the samples
+in the "collapsed stack" format (one `frame;frame;frame count` line per stack),
+which flamegraph.pl, speedscope and inferno read directly.
+"""
+
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+
+class StackSampler:
+    """
+    Samples the stack of a thread until stopped.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005):
+        """
+        Initialize the sampler.
+
+        Args:
+            thread_id: Thread to sample. Defaults to the calling thread.
+            interval: Seconds between samples
+        """
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """
+        Return the samples in collapsed stack format.
+
+        Returns:
+            One `stack count` line per distinct stack
+        """
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    def dump(self, directory: str, name: str) -> str:
+        """
+        Write the collapsed stacks to a file.
+
+        Args:
+            directory: Output directory
+            name: Label included in the file name
+
+        Returns:
+            Path of the written file
+        """
+        os.makedirs(directory, exist_ok=True)
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name).strip("_") or "request"
+        # Threaded servers can finish two slow requests for the same route within one second
+        suffix = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{suffix}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        return path
@@ -0,0 +1,272 @@
+"""
+Multi-process embedding pool
+
+Encodes chunk batches on N worker processes, each with its own copy of the
+embedding model and a share of the CPU threads. Batches go through a bounded
+queue (callers block when it is full), results come back in submission order,
+and a worker that dies is restarted with its unfinished batches queued again.
+
+    pool = EmbeddingPool(processes=8)
+    embeddings = pool.encode(chunks)
+    pool.close()
+"""
+
+import atexit
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from pdf_agent.embeddings import create_embedder, DEFAULT_MODEL, EMBEDDING_BACKEND
+    from monitoring.metrics import EMBEDDED_TEXTS
+except ImportError:
+    try:
+        from Model.pdf_agent.embeddings import create_embedder, DEFAULT_MODEL, EMBEDDING_BACKEND
+        from Model.monitoring.metrics import EMBEDDED_TEXTS
+    except ImportError:
+        import sys
+        sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+        from Model.pdf_agent.embeddings import create_embedder, DEFAULT_MODEL, EMBEDDING_BACKEND
+        from Model.monitoring.metrics import EMBEDDED_TEXTS
+
+DEFAULT_BATCH_SIZE = 64
+
+
+@contextmanager
+def _without_main_module():
+    # A spawned child re-runs the parent's main script (e.g. the whole Flask app) unless it
+    # doesn't know its path; the workers only need this module, so hide it while starting them
+    main = sys.modules.get("__main__")
+    main_file = getattr(main, "__file__", None)
+    if main_file is not None:
+        del main.__file__
+    try:
+        yield
+    finally:
+        if main_file is not None:
+            main.__file__ = main_file
+
+
+def _worker(index: int, backend: str, model_name: str, threads: int, tasks, results) -> None:
+    # Limit the math libraries before they are imported, so N workers don't oversubscribe the CPU
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[name] = str(threads)
+    try:
+        embedder = create_embedder(backend, model_name, threads=threads)
+    except Exception as e:
+        results.put(("failed", index, repr(e)))
+        return
+    results.put(("ready", index, None))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        batch_id, texts = task
+        results.put(("taken", index, batch_id))
+        try:
+            embeddings = np.asarray(embedder.encode(list(texts)), dtype=np.float32)
+            results.put(("done", batch_id, embeddings))
+        except Exception as e:
+            results.put(("error", batch_id, repr(e)))
+
+
+class EmbeddingPool:
+    """Pool of embedding worker processes, safe to share between threads."""
+
+    def __init__(self, processes: Optional[int] = None, backend: str = EMBEDDING_BACKEND,
+                 model_name: str = DEFAULT_MODEL, max_pending: Optional[int] = None,
+                 threads_per_process: Optional[int] = None, start_timeout: float = 600.0):
+        """
+        Start the workers.
+
+        Args:
+            processes: Number of worker processes, defaults to the number of CPUs
+            backend: Embedding backend of every worker (see embeddings.py)
+            model_name: sentence-transformers model name
+            max_pending: Batches waiting in the queue before callers block, defaults to 2 per worker
+            threads_per_process: Compute threads per worker, defaults to CPUs / processes
+            start_timeout: Seconds to wait for the first worker to load the model
+        """
+        cpus = os.cpu_count() or 1
+        self.processes = processes or cpus
+        self.backend = backend
+        self.model_name = model_name
+        self.threads = threads_per_process or max(1, cpus // self.processes)
+
+        # spawn: a fresh interpreter per worker, safe with the threads of the parent process
+        self._context = multiprocessing.get_context("spawn")
+        self._tasks = self._context.Queue(maxsize=max_pending or 2 * self.processes)
+        self._results = self._context.Queue()
+        self._workers: List = [None] * self.processes
+        self._futures = {}
+        self._pending_texts = {}
+        self._assigned = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._broken = None
+        self.restarts = 0
+
+        # The first worker exports/tunes the model if needed, the others then find it cached
+        self._start_worker(0)
+        self._wait_ready(start_timeout)
+        for index in range(1, self.processes):
+            self._start_worker(index)
+
+        self._collector = threading.Thread(target=self._collect, name="embedding-pool", daemon=True)
+        self._collector.start()
+        atexit.register(self.close)
+
+    def _start_worker(self, index: int) -> None:
+        process = self._context.Process(
+            target=_worker, name=f"embedding-worker-{index}", daemon=True,
+            args=(index, self.backend, self.model_name, self.threads, self._tasks, self._results))
+        with _without_main_module():
+            process.start()
+        self._workers[index] = process
+
+    def _wait_ready(self, timeout: float) -> None:
+        try:
+            kind, _, error = self._results.get(timeout=timeout)
+        except queue.Empty:
+            raise RuntimeError("The embedding worker did not start in time")
+        if kind == "failed":
+            raise RuntimeError(f"The embedding worker could not load the model: {error}")
+
+    def _collect(self) -> None:
+        while not self._closed:
+            try:
+                kind, key, value = self._results.get(timeout=1.0)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            except (EOFError, OSError):
+                return
+
+            with self._lock:
+                if kind == "taken":
+                    self._assigned[value] = key
+                    continue
+                if kind == "ready":
+                    continue
+                if kind == "failed":
+                    # Restarting would fail the same way; stop taking work instead
+                    print(f"Embedding worker {key} could not start: {value}")
+                    self._broken = value
+                    failed, self._futures = list(self._futures.values()), {}
+                    self._pending_texts.clear()
+                    for future in failed:
+                        future.set_exception(RuntimeError(f"Embedding worker could not start: {value}"))
+                    continue
+                future = self._futures.pop(key, None)
+                self._pending_texts.pop(key, None)
+                self._assigned.pop(key, None)
+            if future is None:
+                continue  # batch already answered by a restarted worker
+            if kind == "done":
+                EMBEDDED_TEXTS.inc(len(value))
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(f"Embedding batch failed: {value}"))
+            self._check_workers()
+
+    def _check_workers(self) -> None:
+        for index, process in enumerate(self._workers):
+            if self._closed or self._broken or process is None or process.is_alive():
+                continue
+            print(f"Embedding worker {index} exited with code {process.exitcode}, restarting it")
+            self.restarts += 1
+            self._start_worker(index)
+            # Batches the dead worker had taken go back in the queue. Its last "taken" message may
+            # not have been read yet, so unassigned batches are queued again too: a batch answered
+            # twice is simply ignored the second time
+            with self._lock:
+                lost = [(batch_id, texts) for batch_id, texts in self._pending_texts.items()
+                        if self._assigned.get(batch_id, index) == index]
+                for batch_id, _ in lost:
+                    self._assigned.pop(batch_id, None)
+            for task in lost:
+                threading.Thread(target=self._tasks.put, args=(task,), daemon=True).start()
+
+    def submit(self, texts: Sequence[str]) -> Future:
+        """
+        Queue one batch; blocks while the queue is full.
+
+        Args:
+            texts: Texts of the batch
+
+        Returns:
+            Future with the embedding matrix of the batch
+        """
+        if self._closed:
+            raise RuntimeError("The embedding pool is closed")
+        if self._broken:
+            raise RuntimeError(f"Embedding worker could not start: {self._broken}")
+        batch_id = next(self._ids)
+        future = Future()
+        with self._lock:
+            self._futures[batch_id] = future
+            self._pending_texts[batch_id] = list(texts)
+        self._tasks.put((batch_id, list(texts)))
+        return future
+
+    def imap(self, batches: Iterable[Sequence[str]]) -> Iterator[np.ndarray]:
+        """
+        Encode batches in parallel, yielding their embeddings in the order of `batches`.
+
+        Args:
+            batches: Iterable of text batches
+
+        Returns:
+            Iterator of embedding matrices
+        """
+        window = []
+        for batch in batches:
+            window.append(self.submit(batch))
+            # Keep a bounded number of batches in flight, but always more than there are workers
+            if len(window) > 2 * self.processes:
+                yield window.pop(0).result()
+        for future in window:
+            yield future.result()
+
+    def encode(self, texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+        """
+        Encode a list of texts.
+
+        Args:
+            texts: Texts to encode
+            batch_size: Texts per worker batch
+
+        Returns:
+            Embedding matrix, one row per text
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        batches = (texts[start:start + batch_size] for start in range(0, len(texts), batch_size))
+        return np.vstack(list(self.imap(batches)))
+
+    def close(self) -> None:
+        """Stop the workers."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            try:
+                self._tasks.put(None, timeout=1.0)
+            except queue.Full:
+                break
+        for process in self._workers:
+            if process is not None:
+                process.join(timeout=5.0)
+                if process.is_alive():
+                    process.terminate()
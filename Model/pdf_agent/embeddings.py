@@ -0,0 +1,298 @@
+"""
+Embedding backends
+
+"sentence-transformers" runs all-MiniLM-L6-v2 in PyTorch, as before. "onnx" and
+"onnx-int8" run the same model exported to ONNX (optionally with int8 dynamic
+quantization) on onnxruntime, which is noticeably faster on CPU-only hosts.
+
+The export happens once per model and is cached under EMBEDDING_CACHE_DIR.
+Right after exporting, the ONNX embeddings are compared with the PyTorch
+reference; if they drift beyond the tolerance the backend falls back to
+sentence-transformers. Batch size and thread count are tuned for the host on
+first use and remembered next to the export.
+"""
+
+import json
+import os
+import platform
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+BACKENDS = ("sentence-transformers", "onnx", "onnx-int8")
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "sentence-transformers")
+CACHE_DIR = os.path.expanduser(os.environ.get("EMBEDDING_CACHE_DIR", os.path.join("~", ".cache", "edu_embeddings")))
+# Minimum cosine similarity between an ONNX embedding and the PyTorch one
+EMBEDDING_TOLERANCE = float(os.environ.get("EMBEDDING_TOLERANCE", "0.98"))
+
+VALIDATION_TEXTS = [
+    "A binary search tree keeps smaller keys in the left subtree and larger keys in the right one.",
+    "The derivative of x squared is two x.",
+    "Merge sort splits the array in halves, sorts each half and merges the results.",
+    "Linear regression fits a line that minimizes the squared error.",
+    "Un număr complex are o parte reală și o parte imaginară.",
+    "What is the difference between a stack and a queue?",
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "Explain the quadratic formula.",
+]
+BATCH_SIZES = (8, 16, 32, 64, 128)
+
+
+class SentenceTransformerEmbedder:
+    """Reference backend: the model run by sentence-transformers on PyTorch."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, threads: Optional[int] = None):
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            self.set_threads(threads)
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: Union[str, Sequence[str]]) -> np.ndarray:
+        return self.model.encode(texts)
+
+    def set_threads(self, threads: int) -> None:
+        """Change the number of intra-op threads (e.g. 1 before forking, then per worker)."""
+        import torch
+        torch.set_num_threads(threads)
+
+
+class OnnxEmbedder:
+    """The same model exported to ONNX and run with onnxruntime."""
+
+    def __init__(self, model_dir: str, quantized: bool = False, batch_size: int = 32, threads: Optional[int] = None):
+        """
+        Load an exported model (see export_onnx).
+
+        Args:
+            model_dir: Export directory
+            quantized: Use the int8 model instead of the float32 one
+            batch_size: Texts per inference call
+            threads: onnxruntime intra-op threads, defaults to onnxruntime's choice
+        """
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, "config.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.name = "onnx-int8" if quantized else "onnx"
+        self.batch_size = batch_size
+        self.threads = threads
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=config["pad_token_id"])
+        self.normalize = config["normalize"]
+
+        self.model_path = os.path.join(model_dir, "model-int8.onnx" if quantized else "model.onnx")
+        self.session = self._create_session(threads)
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def _create_session(self, threads: Optional[int]):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return onnxruntime.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+
+    def set_threads(self, threads: int) -> None:
+        """
+        Recreate the inference session with a new number of intra-op threads.
+
+        A session's thread pool does not survive fork(), so a process that forks workers
+        should run single-threaded (threads=1 starts no pool threads) and let each worker
+        set its own thread count after the fork.
+        """
+        self.threads = threads
+        self.session = self._create_session(threads)
+
+    def encode(self, texts: Union[str, Sequence[str]]) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Sorting by length keeps padding (and wasted work) small inside each batch
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, embedding in zip(batch, self._encode_batch([texts[i] for i in batch])):
+                embeddings[i] = embedding
+        result = np.vstack(embeddings)
+        return result[0] if single else result
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+
+        # Mean pooling over the real tokens, like the sentence-transformers Pooling layer
+        mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+def export_onnx(model_name: str = DEFAULT_MODEL, model_dir: Optional[str] = None) -> str:
+    """
+    Export a sentence-transformers model to ONNX (float32 and int8) and validate it.
+
+    Args:
+        model_name: sentence-transformers model name
+        model_dir: Export directory, defaults to CACHE_DIR/<model_name>
+
+    Returns:
+        The export directory
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    model_dir = model_dir or os.path.join(CACHE_DIR, model_name.replace("/", "__"))
+    os.makedirs(model_dir, exist_ok=True)
+    reference = SentenceTransformer(model_name, device="cpu")
+    transformer = reference[0].auto_model.eval()
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    sample = reference.tokenizer(["export sample"], return_tensors="pt")
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    dynamic = {0: "batch", 1: "sequence"}
+    torch.onnx.export(
+        Encoder(transformer),
+        (sample["input_ids"], sample["attention_mask"], sample.get("token_type_ids", torch.zeros_like(sample["input_ids"]))),
+        fp32_path,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic, "token_type_ids": dynamic,
+                      "last_hidden_state": dynamic},
+        opset_version=14,
+    )
+    quantize_dynamic(fp32_path, os.path.join(model_dir, "model-int8.onnx"), weight_type=QuantType.QInt8)
+
+    reference.tokenizer.save_pretrained(model_dir)
+    config = {
+        "model_name": model_name,
+        "max_seq_length": reference.max_seq_length,
+        "pad_token_id": reference.tokenizer.pad_token_id,
+        "normalize": any(type(module).__name__ == "Normalize" for module in reference),
+    }
+    with open(os.path.join(model_dir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+    expected = reference.encode(VALIDATION_TEXTS)
+    validation = {}
+    for quantized in (False, True):
+        embedder = OnnxEmbedder(model_dir, quantized=quantized)
+        validation["onnx-int8" if quantized else "onnx"] = min_cosine(expected, embedder.encode(VALIDATION_TEXTS))
+    with open(os.path.join(model_dir, "validation.json"), "w", encoding="utf-8") as f:
+        json.dump(validation, f, indent=2)
+    return model_dir
+
+
+def min_cosine(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Lowest cosine similarity between matching rows of two embedding matrices."""
+    expected = expected / np.linalg.norm(expected, axis=1, keepdims=True)
+    actual = actual / np.linalg.norm(actual, axis=1, keepdims=True)
+    return float(np.min(np.sum(expected * actual, axis=1)))
+
+
+def tune(model_dir: str, quantized: bool, sample_texts: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Find the batch size and thread count with the best throughput on this host.
+
+    Args:
+        model_dir: Export directory
+        quantized: Tune the int8 model
+        sample_texts: Texts to time, defaults to chunk-sized synthetic texts
+
+    Returns:
+        {"batch_size": ..., "threads": ...}
+    """
+    texts = sample_texts or [" ".join(VALIDATION_TEXTS[i:] + VALIDATION_TEXTS[:i]) * 2 for i in range(8)] * 16
+    cpus = os.cpu_count() or 1
+    thread_options = sorted({1, max(1, cpus // 2), cpus})
+
+    best, best_rate = {"batch_size": 32, "threads": cpus}, 0.0
+    for threads in thread_options:
+        embedder = OnnxEmbedder(model_dir, quantized=quantized, threads=threads)
+        embedder.encode(texts[:8])  # warm-up
+        for batch_size in BATCH_SIZES:
+            embedder.batch_size = batch_size
+            start = time.perf_counter()
+            embedder.encode(texts)
+            rate = len(texts) / (time.perf_counter() - start)
+            if rate > best_rate:
+                best, best_rate = {"batch_size": batch_size, "threads": threads}, rate
+    return best
+
+
+def _host_key() -> str:
+    return f"{platform.machine()}-{os.cpu_count()}cpu"
+
+
+def create_embedder(backend: str = EMBEDDING_BACKEND, model_name: str = DEFAULT_MODEL,
+                    tolerance: float = EMBEDDING_TOLERANCE, threads: Optional[int] = None):
+    """
+    Create an embedding backend, exporting, validating and tuning the ONNX model on first use.
+
+    Args:
+        backend: One of BACKENDS
+        model_name: sentence-transformers model name
+        tolerance: Minimum cosine similarity to the PyTorch embeddings for the ONNX backends
+        threads: Compute threads, instead of the tuned count (e.g. one process of a worker pool)
+
+    Returns:
+        An object with encode(texts) -> np.ndarray
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+    if backend == "sentence-transformers":
+        return SentenceTransformerEmbedder(model_name, threads)
+
+    model_dir = os.path.join(CACHE_DIR, model_name.replace("/", "__"))
+    if not os.path.exists(os.path.join(model_dir, "validation.json")):
+        print(f"Exporting {model_name} to ONNX in {model_dir}...")
+        export_onnx(model_name, model_dir)
+
+    with open(os.path.join(model_dir, "validation.json"), "r", encoding="utf-8") as f:
+        similarity = json.load(f)[backend]
+    if similarity < tolerance:
+        print(f"The {backend} embeddings differ from the reference (cosine {similarity:.4f} < {tolerance}), "
+              f"using sentence-transformers instead")
+        return SentenceTransformerEmbedder(model_name, threads)
+
+    quantized = backend == "onnx-int8"
+    tuning_path = os.path.join(model_dir, "tuning.json")
+    tuning = {}
+    if os.path.exists(tuning_path):
+        with open(tuning_path, "r", encoding="utf-8") as f:
+            tuning = json.load(f)
+    key = f"{_host_key()}-{backend}"
+    if key not in tuning:
+        tuning[key] = tune(model_dir, quantized)
+        tmp_path = f"{tuning_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(tuning, f, indent=2)
+        os.replace(tmp_path, tuning_path)
+
+    settings = dict(tuning[key])
+    if threads:
+        settings["threads"] = threads
+    return OnnxEmbedder(model_dir, quantized=quantized, **settings)
@@ -1,28 +1,80 @@
 import os
-from pypdf import PdfReader
+import threading
+from collections import OrderedDict
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import groq
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
+
+try:
+    from pdf_agent.index_store import save_index, load_index, resolve_index
+    from pdf_agent.retrieval import create_index
+    from pdf_agent.embeddings import create_embedder, EMBEDDING_BACKEND
+    from pdf_agent.text_cache import extract_text as extract_pdf_text
+    from monitoring.metrics import stage, track_llm_call, EMBEDDED_TEXTS
+except ImportError:
+    try:
+        from Model.pdf_agent.index_store import save_index, load_index, resolve_index
+        from Model.pdf_agent.retrieval import create_index
+        from Model.pdf_agent.embeddings import create_embedder, EMBEDDING_BACKEND
+        from Model.pdf_agent.text_cache import extract_text as extract_pdf_text
+        from Model.monitoring.metrics import stage, track_llm_call, EMBEDDED_TEXTS
+    except ImportError:
+        import sys
+        sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+        from Model.pdf_agent.index_store import save_index, load_index, resolve_index
+        from Model.pdf_agent.retrieval import create_index
+        from Model.pdf_agent.embeddings import create_embedder, EMBEDDING_BACKEND
+        from Model.pdf_agent.text_cache import extract_text as extract_pdf_text
+        from Model.monitoring.metrics import stage, track_llm_call, EMBEDDED_TEXTS
+
+# Loaded indexes kept in memory, so switching between the courses' PDFs doesn't re-read them
+INDEX_CACHE_SIZE = int(os.environ.get("INDEX_CACHE_SIZE", "16"))
 
 class PDFContextQA:
-    def __init__(self, api_key: str, model_name: str = "llama3-70b-8192"):
+    def __init__(self, api_key: str, model_name: str = "llama3-70b-8192", retrieval_backend: str = "exact",
+                 embedding_backend: str = EMBEDDING_BACKEND):
         """
         Initialize the PDF Context QA system
         
         Args:
             api_key: Groq API key
             model_name: Model to use for Q&A
+            retrieval_backend: Chunk search backend, "exact" or "ivf" (see retrieval.py)
+            embedding_backend: "sentence-transformers", "onnx" or "onnx-int8" (see embeddings.py)
         """
         self.groq_client = groq.Groq(api_key=api_key)
         self.model_name = model_name
+        self.retrieval_backend = retrieval_backend
         
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # The embedding model is loaded on first use (see embedding_model)
+        self.embedding_backend = embedding_backend
+        self._embedding_model = None
+        self._embedding_lock = threading.Lock()
         
         # Storage for document chunks and their embeddings
-        self.chunks = []
-        self.chunk_embeddings = []
+        self._set_document(([], np.zeros((0, 0), dtype=np.float32),
+                            create_index(self.retrieval_backend, np.zeros((0, 0), dtype=np.float32))))
+        self._index_cache = OrderedDict()
+        self._index_cache_lock = threading.Lock()
+        
+    @property
+    def embedding_model(self):
+        """The embedding model, loaded on first use: loading it imports torch or onnxruntime."""
+        if self._embedding_model is None:
+            with self._embedding_lock:
+                if self._embedding_model is None:
+                    self._embedding_model = create_embedder(self.embedding_backend)
+        return self._embedding_model
+        
+    def _set_chunks(self, chunks: List[str], embeddings: np.ndarray):
+        """Replace the loaded chunks and rebuild the retrieval index over them."""
+        self._set_document((chunks, embeddings, create_index(self.retrieval_backend, embeddings)))
+        
+    def _set_document(self, document: Tuple[List[str], np.ndarray, object]):
+        # The (chunks, embeddings, index) tuple is swapped in one assignment, so a query running
+        # at the same time sees either the old document or the new one, never a mix of both
+        self.document = document
+        self.chunks, self.chunk_embeddings, self.retrieval_index = document
         
     def load_pdf(self, pdf_path: str, chunk_size: int = 1000, overlap: int = 200):
         """
@@ -33,58 +85,180 @@ class PDFContextQA:
             chunk_size: Size of chunks in characters
             overlap: Overlap between chunks in characters
         """
-        # Extract text from PDF
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
+        self._set_chunks(*self.build_index(pdf_path, chunk_size, overlap))
+        print(f"Loaded {len(self.chunks)} chunks from PDF")
+    
+    def extract_text(self, pdf_path: str) -> str:
+        """
+        Extract the text of every page of a PDF, from the shared text cache when possible
+        
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            The document text, one page per line block
+        """
+        return extract_pdf_text(pdf_path)
+    
+    def split_into_chunks(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
+        """
+        Split text into overlapping chunks
         
-        # Split text into chunks with overlap
-        self.chunks = []
+        Args:
+            text: Text to split
+            chunk_size: Size of chunks in characters
+            overlap: Overlap between chunks in characters
+            
+        Returns:
+            List of text chunks
+        """
+        chunks = []
         for i in range(0, len(text), chunk_size - overlap):
             chunk = text[i:i + chunk_size]
             if len(chunk) >= 200:  # Only keep chunks of sufficient size
-                self.chunks.append(chunk)
+                chunks.append(chunk)
+        return chunks
+    
+    def build_index(self, pdf_path: str, chunk_size: int = 1000, overlap: int = 200) -> Tuple[List[str], np.ndarray]:
+        """
+        Extract, chunk and embed a PDF without changing the loaded document
         
-        # Generate embeddings for chunks
-        self.chunk_embeddings = self.embedding_model.encode(self.chunks)
-        print(f"Loaded {len(self.chunks)} chunks from PDF")
+        Args:
+            pdf_path: Path to the PDF file
+            chunk_size: Size of chunks in characters
+            overlap: Overlap between chunks in characters
+            
+        Returns:
+            Tuple of (chunks, chunk embeddings)
+        """
+        chunks = self.split_into_chunks(self.extract_text(pdf_path), chunk_size, overlap)
+        return chunks, self.encode(chunks)
+    
+    def encode(self, texts):
+        """
+        Embed one text or a list of texts with the embedding model
+        
+        Args:
+            texts: A string or list of strings
+            
+        Returns:
+            Embedding vector, or matrix with one row per text
+        """
+        with stage("embedding_encode"):
+            embeddings = self.embedding_model.encode(texts)
+        EMBEDDED_TEXTS.inc(1 if isinstance(texts, str) else len(texts))
+        return embeddings
+    
+    def save_index(self, index_dir: str, metadata: Optional[Dict] = None):
+        """
+        Save the loaded chunks and embeddings so they can be reused without re-embedding
+        
+        Args:
+            index_dir: Directory to write the index to
+            metadata: Extra information stored with the index
+        """
+        save_index(index_dir, self.chunks, self.chunk_embeddings, metadata)
+    
+    def load_index(self, index_dir: str):
+        """
+        Load chunks and embeddings previously saved with save_index
+        
+        Args:
+            index_dir: Directory of the index
+        """
+        with stage("index_load"):
+            self._set_document(self.preload_index(index_dir))
+        print(f"Loaded {len(self.chunks)} chunks from index")
         
-    def get_relevant_chunks(self, query: str, top_k: int = 3) -> List[str]:
+    def build_document(self, pdf_path: str, chunk_size: int = 1000,
+                       overlap: int = 200) -> Tuple[List[str], np.ndarray, object]:
+        """
+        Extract, chunk and embed a PDF into a document usable with answer_question,
+        without changing the loaded document
+        
+        Args:
+            pdf_path: Path to the PDF file
+            chunk_size: Size of chunks in characters
+            overlap: Overlap between chunks in characters
+            
+        Returns:
+            Tuple of (chunks, chunk embeddings, retrieval index)
+        """
+        chunks, embeddings = self.build_index(pdf_path, chunk_size, overlap)
+        return chunks, embeddings, create_index(self.retrieval_backend, embeddings)
+        
+    def preload_index(self, index_dir: str) -> Tuple[List[str], np.ndarray, object]:
+        """
+        Read an index and build its retrieval index, without making it the loaded document
+        
+        Indexes are cached by published version (up to INDEX_CACHE_SIZE, least recently
+        used first out), so a newly published version is picked up on the next load. The
+        embeddings are memory-mapped, shared with every other process that loads the index.
+        
+        Args:
+            index_dir: Directory of the index
+            
+        Returns:
+            Tuple of (chunks, chunk embeddings, retrieval index)
+        """
+        version_dir = resolve_index(index_dir)
+        if version_dir is None:
+            raise FileNotFoundError(f"Index not found: {index_dir}")
+        key = os.path.abspath(version_dir)
+        with self._index_cache_lock:
+            if key in self._index_cache:
+                self._index_cache.move_to_end(key)
+                return self._index_cache[key]
+        
+        # Load that exact version, even if a newer one is published meanwhile
+        chunks, embeddings, _ = load_index(version_dir)
+        entry = (chunks, embeddings, create_index(self.retrieval_backend, embeddings))
+        with self._index_cache_lock:
+            self._index_cache[key] = entry
+            while len(self._index_cache) > INDEX_CACHE_SIZE:
+                self._index_cache.popitem(last=False)
+        return entry
+        
+    def get_relevant_chunks(self, query: str, top_k: int = 3,
+                            document: Optional[Tuple[List[str], np.ndarray, object]] = None) -> List[str]:
         """
         Retrieve most relevant chunks for a query
         
         Args:
             query: User question
             top_k: Number of top chunks to retrieve
+            document: (chunks, embeddings, index) from preload_index or build_document;
+                defaults to the loaded document
             
         Returns:
             List of most relevant text chunks
         """
-        # Create embedding for the query
-        query_embedding = self.embedding_model.encode(query)
+        chunks, _, retrieval_index = document or self.document
         
-        # Calculate similarity scores
-        similarities = np.dot(self.chunk_embeddings, query_embedding)
+        # Create embedding for the query
+        query_embedding = self.encode(query)
         
-        # Get indices of top_k most similar chunks
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
+        with stage("retrieval"):
+            # Get indices of top_k most similar chunks
+            top_indices = retrieval_index.search(query_embedding, top_k)
         
         # Return top chunks
-        return [self.chunks[i] for i in top_indices]
+        return [chunks[i] for i in top_indices]
     
-    def answer_question(self, query: str) -> Dict:
+    def answer_question(self, query: str, document: Optional[Tuple[List[str], np.ndarray, object]] = None) -> Dict:
         """
         Answer question based on PDF context
         
         Args:
             query: User question
+            document: (chunks, embeddings, index) to answer from; defaults to the loaded
+                document. Concurrent callers should pass their own instead of loading one.
             
         Returns:
             Dict containing answer and token usage info
         """
         # Get relevant context chunks
-        relevant_chunks = self.get_relevant_chunks(query)
+        relevant_chunks = self.get_relevant_chunks(query, document=document)
         context = "\n\n".join(relevant_chunks)
         
         # Create system prompt with context
@@ -96,8 +270,10 @@ CONTEXT:
 Answer the question based ONLY on the information provided in the context. If the answer cannot be found in the context, say "I don't have enough information to answer this question." Do not make up information."""
         
         # Send request to Groq
-        response = self.groq_client.chat.completions.create(
-            model=self.model_name,
+        response = track_llm_call(
+            "groq",
+            self.model_name,
+            self.groq_client.chat.completions.create,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": query}
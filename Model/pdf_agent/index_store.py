@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+CHUNKS_FILE = "chunks.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+META_FILE = "meta.json"
+
+# An index directory holds one subdirectory per saved version and a CURRENT file naming the
+# published one. A new version is written in full under a temporary name, renamed into place
+# and published by swapping CURRENT, so readers always see one complete version. Embeddings
+# are opened memory-mapped and read-only: every process that loads the same version shares
+# one copy of the matrix through the page cache. Replaced versions are deleted later; on
+# POSIX, processes that still have one mapped keep reading it until they let go.
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "v-"
+KEEP_VERSIONS = 2
+
+
+def resolve_index(index_dir: str) -> Optional[str]:
+    """
+    Find the directory holding the files of the published version of an index.
+
+    Args:
+        index_dir: Directory of the index
+
+    Returns:
+        Path of the published version, or None if no complete index has been saved
+    """
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            version_dir = os.path.join(index_dir, f.read().strip())
+        if os.path.exists(os.path.join(version_dir, META_FILE)):
+            return version_dir
+    except FileNotFoundError:
+        pass
+    # Indexes saved before versioning keep their files directly in index_dir;
+    # meta.json is written last, so its presence marks a finished index
+    if os.path.exists(os.path.join(index_dir, META_FILE)):
+        return index_dir
+    return None
+
+
+def index_exists(index_dir: str) -> bool:
+    """
+    Check whether a complete index has been saved in a directory.
+
+    Args:
+        index_dir: Directory of the index
+
+    Returns:
+        True if the index can be loaded
+    """
+    return resolve_index(index_dir) is not None
+
+
+def save_index(index_dir: str, chunks: List[str], embeddings: np.ndarray,
+               metadata: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Persist document chunks and their embeddings as a new version of an index and publish it.
+
+    Args:
+        index_dir: Directory to write the index to
+        chunks: Text chunks
+        embeddings: Embedding matrix, one row per chunk
+        metadata: Extra information stored with the index (source path, chunking, ...)
+
+    Returns:
+        Path of the published version
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if len(chunks) != len(embeddings):
+        raise ValueError(f"Got {len(chunks)} chunks but {len(embeddings)} embeddings")
+
+    meta = dict(metadata or {})
+    meta["chunk_count"] = len(chunks)
+    meta["dimension"] = int(embeddings.shape[1]) if embeddings.ndim == 2 else 0
+
+    # Version names sort by creation time
+    version = f"{VERSION_PREFIX}{time.time_ns():020d}-{os.getpid()}"
+    tmp_dir = os.path.join(index_dir, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+    try:
+        with open(os.path.join(tmp_dir, CHUNKS_FILE), "w", encoding="utf-8") as f:
+            json.dump(chunks, f, ensure_ascii=False)
+        np.save(os.path.join(tmp_dir, EMBEDDINGS_FILE), np.ascontiguousarray(embeddings))
+        with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.rename(tmp_dir, os.path.join(index_dir, version))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _write_atomic(os.path.join(index_dir, CURRENT_FILE), lambda f: f.write(version.encode("utf-8")))
+    _remove_old_versions(index_dir, version)
+    return os.path.join(index_dir, version)
+
+
+def load_index(index_dir: str, mmap: bool = True) -> Tuple[List[str], np.ndarray, Dict[str, Any]]:
+    """
+    Load the published version of a persisted index.
+
+    Args:
+        index_dir: Directory of the index
+        mmap: Open the embeddings memory-mapped and read-only instead of reading them into memory
+
+    Returns:
+        Tuple of (chunks, embeddings, metadata); metadata["version_dir"] is the version loaded
+    """
+    for _ in range(3):
+        version_dir = resolve_index(index_dir)
+        if version_dir is None:
+            raise FileNotFoundError(f"Index not found: {index_dir}")
+        try:
+            return _load_version(version_dir, mmap)
+        except FileNotFoundError:
+            # The version was removed after newer ones were published; load the current one
+            if resolve_index(index_dir) == version_dir:
+                raise
+    return _load_version(resolve_index(index_dir) or index_dir, mmap)
+
+
+def _load_version(version_dir: str, mmap: bool) -> Tuple[List[str], np.ndarray, Dict[str, Any]]:
+    with open(os.path.join(version_dir, META_FILE), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    with open(os.path.join(version_dir, CHUNKS_FILE), "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    # An empty matrix has no data to map
+    mmap_mode = "r" if mmap and chunks else None
+    embeddings = np.load(os.path.join(version_dir, EMBEDDINGS_FILE), mmap_mode=mmap_mode)
+    metadata["version_dir"] = version_dir
+    return chunks, embeddings, metadata
+
+
+def _remove_old_versions(index_dir: str, current: str) -> None:
+    versions = sorted(name for name in os.listdir(index_dir)
+                      if name.startswith(VERSION_PREFIX) and name != current)
+    for name in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+    # Files of an index saved before versioning, now superseded
+    for name in (META_FILE, CHUNKS_FILE, EMBEDDINGS_FILE):
+        path = os.path.join(index_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _write_atomic(path: str, write) -> None:
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
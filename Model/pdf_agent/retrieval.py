@@ -0,0 +1,157 @@
+import numpy as np
+from typing import Dict, List, Optional, Type
+
+
+class ExactIndex:
+    """
+    Brute-force inner product search over every chunk embedding.
+    """
+
+    name = "exact"
+
+    def __init__(self, embeddings: np.ndarray):
+        """
+        Build the index
+
+        Args:
+            embeddings: Matrix with one embedding per chunk
+        """
+        self.embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 3) -> List[int]:
+        """
+        Find the chunks most similar to a query
+
+        Args:
+            query_embedding: Embedding of the query
+            top_k: Number of chunks to return
+
+        Returns:
+            Chunk indices, most similar first
+        """
+        if len(self.embeddings) == 0:
+            return []
+        similarities = self.embeddings @ np.asarray(query_embedding, dtype=np.float32)
+        return _top_k(similarities, top_k).tolist()
+
+    def memory_bytes(self) -> int:
+        return self.embeddings.nbytes
+
+
+class IVFIndex:
+    """
+    Inverted file index: chunks are clustered with k-means and a query only scans
+    the chunks of the `n_probe` clusters whose centroids are closest to it.
+    Approximate, but much faster than ExactIndex on large collections.
+    """
+
+    name = "ivf"
+
+    def __init__(self, embeddings: np.ndarray, n_lists: Optional[int] = None, n_probe: int = 8,
+                 iterations: int = 10, seed: int = 0):
+        """
+        Build the index
+
+        Args:
+            embeddings: Matrix with one embedding per chunk
+            n_lists: Number of clusters, defaults to sqrt(number of chunks)
+            n_probe: Number of clusters scanned per query
+            iterations: k-means iterations
+            seed: Random seed for the k-means initialization
+        """
+        self.embeddings = np.asarray(embeddings, dtype=np.float32)
+        self.n_probe = n_probe
+        count = len(self.embeddings)
+        if count == 0:
+            self.centroids = np.zeros((0, 0), dtype=np.float32)
+            self.order = np.zeros(0, dtype=np.int64)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            return
+
+        n_lists = n_lists or max(1, int(np.sqrt(count)))
+        n_lists = min(n_lists, count)
+        rng = np.random.default_rng(seed)
+
+        # Train the centroids on a sample, then assign every chunk to its closest centroid
+        sample_size = min(count, n_lists * 64)
+        sample = self.embeddings[rng.choice(count, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = _assign(sample, centroids)
+            for cluster in range(n_lists):
+                members = sample[assignment == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+        self.centroids = centroids
+
+        assignment = _assign(self.embeddings, centroids)
+        # Chunks sorted by cluster: the ids of cluster c are order[offsets[c]:offsets[c + 1]]
+        self.order = np.argsort(assignment, kind="stable")
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=n_lists))))
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 3) -> List[int]:
+        """
+        Find the chunks most similar to a query
+
+        Args:
+            query_embedding: Embedding of the query
+            top_k: Number of chunks to return
+
+        Returns:
+            Chunk indices, most similar first
+        """
+        if len(self.embeddings) == 0:
+            return []
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        clusters = _top_k(self.centroids @ query_embedding, self.n_probe)
+        candidates = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in clusters])
+        if len(candidates) == 0:
+            return []
+        similarities = self.embeddings[candidates] @ query_embedding
+        return candidates[_top_k(similarities, top_k)].tolist()
+
+    def memory_bytes(self) -> int:
+        return self.embeddings.nbytes + self.centroids.nbytes + self.order.nbytes + self.offsets.nbytes
+
+
+BACKENDS: Dict[str, Type] = {
+    ExactIndex.name: ExactIndex,
+    IVFIndex.name: IVFIndex,
+}
+
+
+def create_index(backend: str, embeddings: np.ndarray, **options):
+    """
+    Build a retrieval index
+
+    Args:
+        backend: Name of the backend ("exact" or "ivf")
+        embeddings: Matrix with one embedding per chunk
+        **options: Backend specific options
+
+    Returns:
+        Index object with a search(query_embedding, top_k) method
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown retrieval backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[backend](embeddings, **options)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    # argpartition finds the k best in linear time, only those k get sorted
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        best = np.argpartition(scores, -k)[-k:]
+    else:
+        best = np.arange(len(scores))
+    return best[np.argsort(scores[best])[::-1]]
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, block_size: int = 65536) -> np.ndarray:
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_size):
+        block = vectors[start:start + block_size]
+        assignment[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
@@ -0,0 +1,138 @@
+"""
+Cached PDF text extraction
+
+Every module that needs the text of a PDF goes through this one extractor. The
+text of each page is cached on disk, keyed by the SHA-256 of the file and the
+extractor version, so a document is parsed once per change instead of once per
+use. The cache directory is PDF_TEXT_CACHE_DIR (default ~/.cache/pdf_text).
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+try:
+    from monitoring.metrics import stage, PDF_PAGES, PDF_TEXT_CACHE
+except ImportError:
+    try:
+        from Model.monitoring.metrics import stage, PDF_PAGES, PDF_TEXT_CACHE
+    except ImportError:
+        import sys
+        sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+        from Model.monitoring.metrics import stage, PDF_PAGES, PDF_TEXT_CACHE
+
+# Bump when the extraction output changes, so older cache entries are ignored
+EXTRACTOR_VERSION = f"pymupdf-{fitz.VersionBind}-1"
+CACHE_DIR = os.path.expanduser(os.environ.get("PDF_TEXT_CACHE_DIR", os.path.join("~", ".cache", "pdf_text")))
+
+# (path, size, mtime) -> sha256, so unchanged files are not hashed again in the same process
+_hashes: Dict[tuple, str] = {}
+_hashes_lock = threading.Lock()
+
+
+def file_hash(path: str) -> str:
+    """
+    SHA-256 of a file, memoized on its size and modification time.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Hex digest
+    """
+    info = os.stat(path)
+    key = (os.path.abspath(path), info.st_size, info.st_mtime_ns)
+    with _hashes_lock:
+        if key in _hashes:
+            return _hashes[key]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    with _hashes_lock:
+        _hashes[key] = digest.hexdigest()
+    return _hashes[key]
+
+
+def extract_document(path: Optional[str] = None, data: Optional[bytes] = None,
+                     cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extract a PDF, from the cache when this exact file was extracted before.
+
+    Args:
+        path: Path to the PDF file
+        data: PDF content, instead of a path (e.g. a file read from a zip archive)
+        cache_dir: Cache directory, defaults to CACHE_DIR
+
+    Returns:
+        Dict with "sha256", "pages" (text of every page), "toc" and "metadata"
+    """
+    if data is None and path is None:
+        raise ValueError("Give a path or the PDF data")
+    sha256 = hashlib.sha256(data).hexdigest() if data is not None else file_hash(path)
+    cache_path = os.path.join(cache_dir or CACHE_DIR, sha256[:2], f"{sha256}-{EXTRACTOR_VERSION}.json")
+
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            document = json.load(f)
+        PDF_TEXT_CACHE.inc(result="hit")
+        return document
+    except (OSError, ValueError):
+        PDF_TEXT_CACHE.inc(result="miss")
+
+    with stage("pdf_extract"):
+        doc = fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(path)
+        try:
+            document = {
+                "sha256": sha256,
+                "extractor": EXTRACTOR_VERSION,
+                "pages": [page.get_text() for page in doc],
+                "toc": doc.get_toc(),
+                "metadata": dict(doc.metadata or {})
+            }
+        finally:
+            doc.close()
+    PDF_PAGES.inc(len(document["pages"]))
+
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Written under a temporary name first, so concurrent readers never see a partial file
+        tmp_path = f"{cache_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Could not write the PDF text cache: {e}")
+    return document
+
+
+def extract_pages(path: Optional[str] = None, data: Optional[bytes] = None) -> List[str]:
+    """
+    Text of every page of a PDF.
+
+    Args:
+        path: Path to the PDF file
+        data: PDF content, instead of a path
+
+    Returns:
+        List with the text of each page
+    """
+    return extract_document(path, data)["pages"]
+
+
+def extract_text(path: Optional[str] = None, data: Optional[bytes] = None) -> str:
+    """
+    Full text of a PDF, pages separated by a newline.
+
+    Args:
+        path: Path to the PDF file
+        data: PDF content, instead of a path
+
+    Returns:
+        The document text
+    """
+    return "\n".join(extract_pages(path, data))
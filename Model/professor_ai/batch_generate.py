@@ -0,0 +1,167 @@
+# batch_generate.py – Build question banks for whole course folders, non-interactively
+#
+# Examples:
+#   python batch_generate.py --folder ./semester1 --output semester1_questions.jsonl
+#   python batch_generate.py --course-id 101 --to-mongo --workers 4 --rpm 30
+#
+# Progress is checkpointed, so an interrupted run picks up where it stopped.
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from groq import Groq
+
+from batch_utils import Checkpoint, JsonlWriter, RateLimiter, call_with_retries, file_sha256
+from question_bank import QUESTION_MODEL, QuestionBank, generate_questions
+from task2_generate_from_pdf import generate_questions_map_reduce
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "Api"))
+
+def materials_from_folder(folder: str):
+	items = []
+	for root, _, files in os.walk(folder):
+		for name in sorted(files):
+			if name.lower().endswith(SUPPORTED_EXTENSIONS):
+				path = os.path.join(root, name)
+				items.append({"path": path, "title": os.path.splitext(name)[0], "courseID": None})
+	return items
+
+def materials_from_course(db, course_id: int, base_dir: str):
+	course = db["courses"].find_one({"courseID": course_id})
+	if course is None:
+		raise ValueError(f"Course {course_id} not found")
+	items = []
+	for pdf in course.get("pdfs", []):
+		# PDFs removed from the course stay in the list as a marker, so the positions don't shift
+		if pdf.get("deleted") or not pdf.get("pdfPath"):
+			continue
+		path = pdf["pdfPath"]
+		if not os.path.isabs(path):
+			path = os.path.normpath(os.path.join(base_dir, path))
+		items.append({"path": path, "title": pdf.get("pdfTitle", os.path.basename(path)), "courseID": course_id})
+	return items
+
+def process_item(client, item, args, limiter, bank=None):
+	if item["path"].lower().endswith(".pdf"):
+		# PDFs go through the per-section map-reduce generation, each section call is rate limited
+		def generate(count):
+			questions = generate_questions_map_reduce(client, item["path"], count, args.model,
+													  max_workers=args.section_workers, before_call=limiter.acquire,
+													  level=args.level)
+			if not questions:
+				raise ValueError("no extractable text")
+			return questions
+	else:
+		with open(item["path"], "r", encoding="utf-8") as f:
+			text = f.read()
+		if not text.strip():
+			raise ValueError("no extractable text")
+
+		def generate(count):
+			limiter.acquire()
+			return generate_questions(client, text, count, args.model, args.level)
+
+	reused = 0
+	if bank is not None:
+		# Only the questions the bank doesn't already hold for this file are generated
+		questions, reused = bank.get_or_generate(
+			args.count, lambda missing: call_with_retries(lambda: generate(missing), retries=args.retries),
+			material_hash=item["sha256"], topic=item["title"], level=args.level, model=args.model)
+	else:
+		questions = call_with_retries(lambda: generate(args.count), retries=args.retries)
+	return {
+		"source": item["path"],
+		"title": item["title"],
+		"courseID": item["courseID"],
+		"sha256": item["sha256"],
+		"model": args.model,
+		"level": args.level,
+		"count": args.count,
+		"reused": reused,
+		"questions": questions,
+		"generatedAt": datetime.now(timezone.utc).isoformat()
+	}
+
+def main():
+	parser = argparse.ArgumentParser(description="Generate question banks for many course materials at once.")
+	source = parser.add_mutually_exclusive_group(required=True)
+	source.add_argument("--folder", help="Folder to walk for .pdf/.txt/.md materials")
+	source.add_argument("--course-id", type=int, help="Use the `pdfs` list of this course from MongoDB")
+	parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/")
+	parser.add_argument("--db", default="databaseAPI")
+	parser.add_argument("--base-dir", default=API_DIR, help="Directory that relative course pdfPath values start from")
+	parser.add_argument("--output", default="question_bank.jsonl", help="JSONL output file")
+	parser.add_argument("--to-mongo", action="store_true", help="Store questions in the questionBanks collection instead")
+	parser.add_argument("--count", type=int, default=5, help="Questions per material")
+	parser.add_argument("--level", help="Student level the questions are written for")
+	parser.add_argument("--model", default=QUESTION_MODEL)
+	parser.add_argument("--workers", type=int, default=4, help="Concurrent generations")
+	parser.add_argument("--section-workers", type=int, default=2,
+						help="Concurrent section calls inside one PDF (all calls still share --rpm)")
+	parser.add_argument("--rpm", type=float, default=30, help="Maximum LLM requests per minute")
+	parser.add_argument("--retries", type=int, default=3)
+	parser.add_argument("--checkpoint", default=".batch_generate.checkpoint.json")
+	parser.add_argument("--api-key", default=os.environ.get("GROQ_API_KEY"))
+	args = parser.parse_args()
+
+	if not args.api_key:
+		print("❌ Set GROQ_API_KEY or pass --api-key.")
+		sys.exit(1)
+
+	db = None
+	if args.course_id is not None or args.to_mongo:
+		from pymongo import MongoClient
+		db = MongoClient(args.mongo_uri)[args.db]
+
+	items = materials_from_folder(args.folder) if args.folder else materials_from_course(db, args.course_id, args.base_dir)
+	checkpoint = Checkpoint(args.checkpoint)
+	pending = []
+	for item in items:
+		if not os.path.exists(item["path"]):
+			print(f"⚠️ Missing file, skipped: {item['path']}")
+			continue
+		item["sha256"] = file_sha256(item["path"])
+		item["key"] = f"{item['sha256']}:{args.count}:{args.model}:{args.level}"
+		if not checkpoint.is_done(item["key"]):
+			pending.append(item)
+
+	print(f"📚 {len(items)} materials found, {len(items) - len(pending)} already done, {len(pending)} to generate.")
+	if not pending:
+		return
+
+	client = Groq(api_key=args.api_key)
+	limiter = RateLimiter(args.rpm)
+	writer = None if args.to_mongo else JsonlWriter(args.output)
+	bank = QuestionBank(db["questionBanks"]) if args.to_mongo else None
+
+	started = time.perf_counter()
+	done = failed = 0
+	with ThreadPoolExecutor(max_workers=args.workers) as executor:
+		futures = {executor.submit(process_item, client, item, args, limiter, bank): item for item in pending}
+		for future in as_completed(futures):
+			item = futures[future]
+			try:
+				record = future.result()
+			except Exception as e:
+				failed += 1
+				print(f"❌ {item['path']}: {e}")
+				continue
+			if writer is not None:
+				writer.write(record)
+			checkpoint.mark_done(item["key"])
+			done += 1
+			reused = f" ({record['reused']} from the bank)" if record["reused"] else ""
+			print(f"✅ [{done + failed}/{len(pending)}] {item['title']}{reused}")
+
+	elapsed = time.perf_counter() - started
+	print(f"\n🏁 {done} generated, {failed} failed in {elapsed:.1f}s ({done / elapsed * 60:.1f} materials/min).")
+	if failed:
+		print("Run the same command again to retry the failed materials.")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,154 @@
+# batch_grade.py – Grade a whole class set of essay PDFs, non-interactively
+#
+# Examples:
+#   python batch_grade.py essays/ --output grades.jsonl
+#   python batch_grade.py class_10B.zip --workers 6 --rpm 30
+#
+# Every grade is appended to the output file as soon as it is ready; running the
+# same command again after a crash only grades the essays that are missing.
+
+import argparse
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from groq import Groq
+
+from batch_utils import JsonlWriter, RateLimiter, call_with_retries
+from task3_evaluate_essay_pdf import GRADING_MODEL, evaluate_essay, extract_essay_text
+
+def list_essays(source: str):
+	"""Return [{"name", "path", "member"}] for every PDF in a directory or zip archive."""
+	essays = []
+	if zipfile.is_zipfile(source):
+		with zipfile.ZipFile(source) as archive:
+			for member in sorted(archive.namelist()):
+				if member.lower().endswith(".pdf") and not member.startswith("__MACOSX/"):
+					essays.append({"name": member, "path": source, "member": member})
+	else:
+		for root, _, files in os.walk(source):
+			for name in sorted(files):
+				if name.lower().endswith(".pdf"):
+					path = os.path.join(root, name)
+					essays.append({"name": os.path.relpath(path, source), "path": path, "member": None})
+	return essays
+
+def extract(essay):
+	# Runs in a worker process: PDF parsing is CPU bound
+	if essay["member"] is not None:
+		with zipfile.ZipFile(essay["path"]) as archive:
+			return extract_essay_text(data=archive.read(essay["member"]))
+	return extract_essay_text(essay["path"])
+
+def load_graded(path: str):
+	graded = set()
+	if os.path.exists(path):
+		with open(path, "r", encoding="utf-8") as f:
+			for line in f:
+				try:
+					graded.add(json.loads(line)["essay"])
+				except (json.JSONDecodeError, KeyError):
+					continue  # partially written last line of a crashed run
+	return graded
+
+def main():
+	parser = argparse.ArgumentParser(description="Grade many essay PDFs concurrently.")
+	parser.add_argument("source", help="Directory or .zip file with essay PDFs")
+	parser.add_argument("--output", default="grades.jsonl", help="JSONL file with one grade per essay")
+	parser.add_argument("--model", default=GRADING_MODEL)
+	parser.add_argument("--workers", type=int, default=4, help="Essays graded concurrently")
+	parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 2, help="Processes extracting PDFs")
+	parser.add_argument("--rpm", type=float, default=30, help="Maximum LLM requests per minute")
+	parser.add_argument("--retries", type=int, default=3)
+	parser.add_argument("--api-key", default=os.environ.get("GROQ_API_KEY"))
+	args = parser.parse_args()
+
+	if not args.api_key:
+		print("❌ Set GROQ_API_KEY or pass --api-key.")
+		sys.exit(1)
+	if not os.path.exists(args.source):
+		print(f"❌ Not found: {args.source}")
+		sys.exit(1)
+
+	essays = list_essays(args.source)
+	graded = load_graded(args.output)
+	pending = [essay for essay in essays if essay["name"] not in graded]
+	print(f"📝 {len(essays)} essays found, {len(essays) - len(pending)} already graded, {len(pending)} to grade.")
+	if not pending:
+		return
+
+	client = Groq(api_key=args.api_key)
+	limiter = RateLimiter(args.rpm)
+	writer = JsonlWriter(args.output)
+
+	def grade(essay, text):
+		def call():
+			limiter.acquire()
+			return evaluate_essay(client, text, args.model)
+
+		started = time.perf_counter()
+		evaluation = call_with_retries(call, retries=args.retries)
+		# The evaluation goes first: a key the model made up (e.g. "essay") must not overwrite
+		# the fields written here, which load_graded reads to resume a run
+		return {
+			**evaluation,
+			"essay": essay["name"],
+			"source": args.source,
+			"model": args.model,
+			"words": len(text.split()),
+			"gradingSeconds": round(time.perf_counter() - started, 2),
+			"gradedAt": datetime.now(timezone.utc).isoformat()
+		}
+
+	started = time.perf_counter()
+	done = failed = 0
+	scores = []
+	with ProcessPoolExecutor(max_workers=args.extract_workers) as extractors, \
+			ThreadPoolExecutor(max_workers=args.workers) as graders:
+		# Grading starts as soon as each essay is extracted, not after all of them
+		extractions = {extractors.submit(extract, essay): essay for essay in pending}
+		gradings = {}
+		for future in as_completed(extractions):
+			essay = extractions[future]
+			try:
+				text = future.result()
+			except Exception as e:
+				failed += 1
+				print(f"❌ {essay['name']}: cannot read PDF ({e})")
+				continue
+			if not text.strip():
+				failed += 1
+				print(f"❌ {essay['name']}: no extractable text")
+				continue
+			gradings[graders.submit(grade, essay, text)] = essay
+
+		for future in as_completed(gradings):
+			essay = gradings[future]
+			try:
+				record = future.result()
+			except Exception as e:
+				failed += 1
+				print(f"❌ {essay['name']}: {e}")
+				continue
+			writer.write(record)
+			done += 1
+			if record["score"] is not None:
+				scores.append(record["score"])
+			elapsed = time.perf_counter() - started
+			print(f"✅ [{done + failed}/{len(pending)}] {essay['name']}: {record['score']}/10 "
+				  f"({done / elapsed * 60:.1f} essays/min)")
+
+	elapsed = time.perf_counter() - started
+	print(f"\n🏁 {done} graded, {failed} failed in {elapsed:.1f}s ({done / elapsed * 60:.1f} essays/min).")
+	if scores:
+		print(f"   Average score: {sum(scores) / len(scores):.2f}/10 (min {min(scores)}, max {max(scores)})")
+	print(f"   Results: {args.output}")
+	if failed:
+		print("Run the same command again to retry the failed essays.")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,86 @@
+# batch_utils.py – Shared helpers for the non-interactive batch tools
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+class RateLimiter:
+	"""Token bucket: allows `rate` calls per `per` seconds, shared by all worker threads."""
+
+	def __init__(self, rate: float, per: float = 60.0):
+		self.capacity = max(1.0, rate)
+		self.tokens = self.capacity
+		self.fill_rate = rate / per
+		self.updated = time.monotonic()
+		self.lock = threading.Lock()
+
+	def acquire(self):
+		while True:
+			with self.lock:
+				now = time.monotonic()
+				self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+				self.updated = now
+				if self.tokens >= 1:
+					self.tokens -= 1
+					return
+				wait = (1 - self.tokens) / self.fill_rate
+			time.sleep(wait)
+
+class Checkpoint:
+	"""Set of finished item keys, saved to disk after every update so a crashed run can resume."""
+
+	def __init__(self, path: str):
+		self.path = path
+		self.lock = threading.Lock()
+		self.done = set()
+		if os.path.exists(path):
+			with open(path, "r", encoding="utf-8") as f:
+				self.done = set(json.load(f))
+
+	def is_done(self, key: str) -> bool:
+		with self.lock:
+			return key in self.done
+
+	def mark_done(self, key: str):
+		with self.lock:
+			self.done.add(key)
+			tmp_path = f"{self.path}.tmp"
+			with open(tmp_path, "w", encoding="utf-8") as f:
+				json.dump(sorted(self.done), f)
+			os.replace(tmp_path, self.path)
+
+class JsonlWriter:
+	"""Thread-safe append-only JSON Lines output; every record is flushed as soon as it is written."""
+
+	def __init__(self, path: str):
+		self.path = path
+		self.lock = threading.Lock()
+
+	def write(self, record: dict):
+		line = json.dumps(record, ensure_ascii=False) + "\n"
+		with self.lock:
+			with open(self.path, "a", encoding="utf-8") as f:
+				f.write(line)
+				f.flush()
+				os.fsync(f.fileno())
+
+def file_sha256(path: str) -> str:
+	digest = hashlib.sha256()
+	with open(path, "rb") as f:
+		for block in iter(lambda: f.read(1024 * 1024), b""):
+			digest.update(block)
+	return digest.hexdigest()
+
+def call_with_retries(fn, retries: int = 3, base_delay: float = 2.0):
+	"""Call fn(), retrying with exponential backoff (rate limits, timeouts, server errors)."""
+	for attempt in range(retries + 1):
+		try:
+			return fn()
+		except Exception as e:
+			if attempt == retries:
+				raise
+			delay = base_delay * (2 ** attempt)
+			print(f"⚠️ {e} – retrying in {delay:.0f}s")
+			time.sleep(delay)
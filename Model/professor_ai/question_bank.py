@@ -0,0 +1,197 @@
+# question_bank.py – Structured multiple choice questions and a reusable MongoDB question bank
+#
+# Questions are stored one document per question, keyed by the hash of the material they
+# were generated from plus topic and level. Requests for material or a topic already in
+# the bank are served from it; the LLM is only asked for the questions that are missing.
+
+import hashlib
+import json
+import re
+from datetime import datetime, timezone
+
+OPTION_LETTERS = "ABCD"
+QUESTION_START = re.compile(r"^\s*(?:\*\*)?\s*(?:Question\s*\d+|Q\d+|\d+[.)])", re.IGNORECASE)
+OPTION_LINE = re.compile(r"^\s*(?:\*\*)?\s*\(?([A-Da-d])[.):]\s*(.+?)(?:\*\*)?\s*$")
+ANSWER_LINE = re.compile(r"^\s*(?:\*\*)?\s*(?:Correct\s+)?Answer\s*:?\s*(?:\*\*)?\s*:?\s*\(?([A-Da-d])\b", re.IGNORECASE)
+
+QUESTION_MODEL = "llama3-8b-8192"
+STRUCTURED_FORMAT = (
+	'Answer with a JSON object only, in this format: {"questions": [{"question": "...", '
+	'"options": ["...", "...", "...", "..."], "answer": "A", "explanation": "..."}]}'
+)
+
+def material_hash(text: str) -> str:
+	"""Hash of pasted material, insensitive to whitespace differences."""
+	return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+def _normalize(value):
+	return " ".join(value.lower().split()) if value else None
+
+def stem_key(question: str) -> str:
+	return hashlib.sha1(re.sub(r"\W+", " ", question.lower()).strip().encode("utf-8")).hexdigest()
+
+def _clean_question(item):
+	if not isinstance(item, dict):
+		return None
+	question = str(item.get("question", "")).strip()
+	options = [str(option).strip() for option in item.get("options", []) if str(option).strip()]
+	# Models sometimes prefix options with their letter, e.g. "B) Paris"
+	options = [re.sub(r"^\(?[A-Da-d][.):]\s+", "", option) for option in options]
+	answer = item.get("answer")
+	if isinstance(answer, int) and 0 <= answer < len(options):
+		answer = OPTION_LETTERS[answer]
+	elif isinstance(answer, str) and answer.strip() in options:
+		answer = OPTION_LETTERS[options.index(answer.strip())]
+	else:
+		answer = str(answer or "").strip()[:1].upper()
+	if not question or len(options) != 4 or answer not in OPTION_LETTERS:
+		return None
+	return {"question": question, "options": options, "answer": answer,
+			"explanation": str(item.get("explanation") or "").strip()}
+
+def _parse_free_text(answer: str):
+	blocks, current = [], []
+	for line in answer.splitlines():
+		if QUESTION_START.match(line) and current:
+			blocks.append(current)
+			current = []
+		current.append(line)
+	if current:
+		blocks.append(current)
+
+	questions = []
+	for lines in blocks:
+		if not QUESTION_START.match(lines[0]):
+			continue  # the model's preamble ("Here are 5 questions...")
+		stem = QUESTION_START.sub("", lines[0]).strip(" *:")
+		options, correct = [], None
+		for line in lines[1:]:
+			answer_match = ANSWER_LINE.match(line)
+			option_match = OPTION_LINE.match(line)
+			if answer_match:
+				correct = answer_match.group(1).upper()
+			elif option_match:
+				options.append(option_match.group(2))
+			elif not options and line.strip():
+				stem = f"{stem} {line.strip()}".strip()
+		question = _clean_question({"question": stem, "options": options, "answer": correct})
+		if question:
+			questions.append(question)
+	return questions
+
+def parse_questions(answer: str):
+	"""Parse the model's answer (JSON, or numbered free text as a fallback) into question dicts."""
+	try:
+		match = re.search(r"\{.*\}", answer, re.DOTALL)
+		data = json.loads(match.group() if match else answer)
+		items = data.get("questions", []) if isinstance(data, dict) else data
+		questions = [question for question in map(_clean_question, items) if question]
+		if questions:
+			return questions
+	except (json.JSONDecodeError, AttributeError, TypeError):
+		pass
+	return _parse_free_text(answer)
+
+def generate_questions(client, text: str, count: int = 5, model: str = QUESTION_MODEL, level: str = None):
+	"""Generate `count` multiple choice questions from material. Returns [{"question", "options", "answer", "explanation"}]."""
+	audience = f" for {level} students" if level else ""
+	prompt = (
+		f"Generate {count} multiple choice questions{audience} from the material below. "
+		f"Each question should have 1 correct answer and 3 distractors.\n"
+		f"{STRUCTURED_FORMAT}\n\n{text}"
+	)
+
+	response = client.chat.completions.create(
+		model=model,
+		messages=[{"role": "user", "content": prompt}],
+		response_format={"type": "json_object"}
+	)
+	return parse_questions(response.choices[0].message.content)
+
+def format_question(question: dict, number: int = None) -> str:
+	prefix = f"{number}. " if number is not None else ""
+	lines = [f"{prefix}{question['question']}"]
+	lines.extend(f"   {letter}) {option}" for letter, option in zip(OPTION_LETTERS, question["options"]))
+	lines.append(f"   Answer: {question['answer']}")
+	if question.get("explanation"):
+		lines.append(f"   Explanation: {question['explanation']}")
+	return "\n".join(lines)
+
+class QuestionBank:
+	"""Questions stored in MongoDB, one document per question."""
+
+	def __init__(self, collection):
+		self.collection = collection
+		self.collection.create_index([("materialHash", 1), ("level", 1), ("timesServed", 1)], name="material_level")
+		self.collection.create_index([("topic", 1), ("level", 1), ("timesServed", 1)], name="topic_level")
+		self.collection.create_index([("materialHash", 1), ("stemKey", 1)], name="material_stem", unique=True)
+
+	def _query(self, material_hash=None, topic=None, level=None):
+		# The same material is reused whatever topic it was filed under; a topic alone matches any material
+		query = {}
+		if material_hash:
+			query["materialHash"] = material_hash
+		elif topic:
+			query["topic"] = _normalize(topic)
+		if level:
+			query["level"] = _normalize(level)
+		if not query:
+			raise ValueError("Give a material hash or a topic")
+		return query
+
+	def find(self, count: int, material_hash: str = None, topic: str = None, level: str = None):
+		"""Return up to `count` stored questions, least served first, and mark them as served."""
+		cursor = self.collection.find(self._query(material_hash, topic, level), {"_id": 1, "question": 1, "options": 1,
+									  "answer": 1, "explanation": 1, "section": 1}).sort("timesServed", 1).limit(count)
+		questions = list(cursor)
+		if questions:
+			self.collection.update_many({"_id": {"$in": [q["_id"] for q in questions]}}, {"$inc": {"timesServed": 1}})
+		for question in questions:
+			question.pop("_id")
+		return questions
+
+	def add(self, questions, material_hash: str = None, topic: str = None, level: str = None, model: str = None):
+		"""Store new questions; returns the ones that were not already in the bank for this material."""
+		added = []
+		for question in questions:
+			document = {
+				**question,
+				"materialHash": material_hash,
+				"topic": _normalize(question.get("topic") or topic),
+				"level": _normalize(level),
+				"stemKey": stem_key(question["question"]),
+				"model": model,
+				"timesServed": 1,
+				"createdAt": datetime.now(timezone.utc)
+			}
+			result = self.collection.update_one({"materialHash": material_hash, "stemKey": document["stemKey"]},
+												{"$setOnInsert": document}, upsert=True)
+			if result.upserted_id is not None:
+				added.append(question)
+		return added
+
+	def get_or_generate(self, count: int, generate, material_hash: str = None, topic: str = None,
+						level: str = None, model: str = None):
+		"""
+		Serve `count` questions from the bank, calling generate(missing) -> [question] for the shortfall only.
+
+		Returns (questions, number served from the bank).
+		"""
+		stored = self.find(count, material_hash, topic, level)
+		missing = count - len(stored)
+		if missing <= 0:
+			return stored, len(stored)
+		generated = self.add(generate(missing), material_hash, topic, level, model)
+		return stored + generated[:missing], len(stored)
+
+def open_question_bank(mongo_uri: str = "mongodb://localhost:27017/", db_name: str = "databaseAPI",
+					   collection: str = "questionBanks", timeout_ms: int = 2000):
+	"""Connect to the bank, or return None (questions are then generated every time) if MongoDB is unavailable."""
+	try:
+		from pymongo import MongoClient
+		client = MongoClient(mongo_uri, serverSelectionTimeoutMS=timeout_ms)
+		client.admin.command("ping")
+		return QuestionBank(client[db_name][collection])
+	except Exception as e:
+		print(f"⚠️ Question bank unavailable ({e}); questions will not be saved.")
+		return None
@@ -2,7 +2,9 @@
 
 from groq import Groq
 
-def run_task_1(api_key: str):
+from question_bank import QUESTION_MODEL, format_question, generate_questions, material_hash
+
+def run_task_1(api_key: str, bank=None):
 	client = Groq(api_key=api_key)
 
 	print("\n✍️ Paste the course material below (press Enter twice to finish):")
@@ -14,14 +16,16 @@ def run_task_1(api_key: str):
 		lines.append(line)
 	text = "\n".join(lines)
 
-	prompt = (
-		f"Generate 5 multiple choice questions from the material below. "
-		f"Each question should have 1 correct answer and 3 distractors.\n\n{text}"
-	)
+	if bank is None:
+		questions = generate_questions(client, text)
+	else:
+		topic = input("🏷️ Topic (optional): ").strip() or None
+		level = input("🎓 Student level [beginner/intermediate/advanced] (optional): ").strip() or None
+		questions, reused = bank.get_or_generate(
+			5, lambda missing: generate_questions(client, text, missing, level=level),
+			material_hash=material_hash(text), topic=topic, level=level, model=QUESTION_MODEL)
+		if reused:
+			print(f"📦 {reused} question(s) served from the question bank.")
 
-	response = client.chat.completions.create(
-		model="llama3-8b-8192",
-		messages=[{"role": "user", "content": prompt}]
-	)
 	print("\n🧠 Generated Questions:\n")
-	print(response.choices[0].message.content)
\ No newline at end of file
+	print("\n\n".join(format_question(question, i) for i, question in enumerate(questions, 1)))
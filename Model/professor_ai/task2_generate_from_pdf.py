@@ -1,27 +1,186 @@
 # task2_generate_from_pdf.py – Generate questions from PDF content
+#
+# Long PDFs are handled map-reduce style: the document is split into sections (by its
+# table of contents when it has one), small neighbouring sections are merged so there is
+# about one call per question, questions are generated for every section in parallel,
+# then near-duplicate questions are dropped and the rest are picked round-robin across
+# sections so the whole document is covered.
+
+import math
+from concurrent.futures import ThreadPoolExecutor
 
-import fitz  # PyMuPDF
 from groq import Groq
 
-def run_task_2(api_key: str):
+from batch_utils import file_sha256
+from question_bank import QUESTION_MODEL, format_question, generate_questions
+
+try:
+	from pdf_agent.embeddings import create_embedder
+	from pdf_agent.text_cache import extract_document, extract_text
+except ImportError:
+	try:
+		from Model.pdf_agent.embeddings import create_embedder
+		from Model.pdf_agent.text_cache import extract_document, extract_text
+	except ImportError:
+		import os
+		import sys
+		sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+		from Model.pdf_agent.embeddings import create_embedder
+		from Model.pdf_agent.text_cache import extract_document, extract_text
+
+# About 3k tokens of material per prompt, well inside the model's 8k context
+SECTION_MAX_CHARS = 12000
+DUPLICATE_SIMILARITY = 0.9
+# Section calls beyond the number of questions asked for, so deduplication still leaves enough
+SPARE_CALLS = 1
+
+def extract_pdf_text(path: str) -> str:
+	return extract_text(path)
+
+def extract_sections(path: str, max_chars: int = SECTION_MAX_CHARS):
+	"""Split a PDF into [{"title", "text"}] sections using the TOC, or page groups when there is none."""
+	document = extract_document(path)
+	pages, toc = document["pages"], document["toc"]
+
+	ranges = []
+	if toc:
+		top_level = min(entry[0] for entry in toc)
+		starts = [(title, page - 1) for level, title, page in toc if level == top_level and page >= 1]
+		starts = sorted({start: title for title, start in starts}.items())
+		if starts and starts[0][0] > 0:
+			starts.insert(0, (0, "Introduction"))
+		for i, (start, title) in enumerate(starts):
+			end = starts[i + 1][0] if i + 1 < len(starts) else len(pages)
+			if end > start:
+				ranges.append((title, start, end))
+	if not ranges:
+		ranges = [("Pages", 0, len(pages))]
+
+	sections = []
+	for title, start, end in ranges:
+		# Sections that are still too long are cut into groups of whole pages
+		groups, group_start = [], start
+		for page_num in range(start + 1, end + 1):
+			if page_num == end or sum(len(p) for p in pages[group_start:page_num + 1]) > max_chars:
+				groups.append((group_start, page_num))
+				group_start = page_num
+		for group_start, group_end in groups:
+			group_title = title
+			if len(groups) > 1 or len(ranges) == 1:
+				group_title = f"{title} (pages {group_start + 1}-{group_end})"
+			text = "\n".join(pages[group_start:group_end])[:max_chars]
+			if text.strip():
+				sections.append({"title": group_title, "text": text})
+	return sections
+
+_embedder = None
+
+def _embedding_model():
+	# Loaded on first use only: short PDFs with a single section never need it.
+	# Same backend (and ONNX cache) as the PDF agents, instead of a separate sentence-transformers model
+	global _embedder
+	if _embedder is None:
+		_embedder = create_embedder()
+	return _embedder
+
+def deduplicate_questions(questions, threshold: float = DUPLICATE_SIMILARITY):
+	"""Keep the first of every group of questions whose stems are near-identical."""
+	if len(questions) < 2:
+		return questions
+	import numpy as np
+
+	stems = [question["question"] for question in questions]
+	embeddings = np.asarray(_embedding_model().encode(stems), dtype=np.float32)
+	embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+	kept, kept_embeddings = [], []
+	for question, embedding in zip(questions, embeddings):
+		if kept_embeddings and float(np.max(np.dot(kept_embeddings, embedding))) >= threshold:
+			continue
+		kept.append(question)
+		kept_embeddings.append(embedding)
+	return kept
+
+def balance_questions(questions, count: int):
+	"""Pick `count` questions round-robin across sections so every part of the document is covered."""
+	by_section = {}
+	for question in questions:
+		by_section.setdefault(question["section"], []).append(question)
+	picked = []
+	while len(picked) < count and any(by_section.values()):
+		for section in list(by_section):
+			if by_section[section] and len(picked) < count:
+				picked.append(by_section[section].pop(0))
+	return picked
+
+def plan_sections(sections, count: int, max_chars: int = SECTION_MAX_CHARS):
+	"""Merge neighbouring sections that fit in one prompt, and keep at most count + SPARE_CALLS of them."""
+	merged = []
+	for section in sections:
+		last = merged[-1] if merged else None
+		if last and len(last["text"]) + len(section["text"]) + 1 <= max_chars:
+			merged[-1] = {"title": f"{last['title']}; {section['title']}", "text": f"{last['text']}\n{section['text']}"}
+		else:
+			merged.append(dict(section))
+
+	# More sections than questions: every extra call would still ask for a question, so keep
+	# sections spread evenly through the document instead
+	limit = max(1, count + SPARE_CALLS)
+	if len(merged) > limit:
+		step = len(merged) / limit
+		merged = [merged[int(i * step)] for i in range(limit)]
+	return merged
+
+def generate_questions_map_reduce(client, path: str, count: int = 5, model: str = QUESTION_MODEL,
+								  max_workers: int = None, before_call=None, sections=None, level: str = None):
+	"""Generate `count` questions for a PDF of any length. Returns question dicts with a "section" key."""
+	if sections is None:
+		sections = extract_sections(path)
+	sections = plan_sections(sections, count)
+	if not sections:
+		return []
+
+	# Ask every section for its share of the questions, plus one spare for deduplication
+	total_chars = sum(len(section["text"]) for section in sections)
+	per_section = [max(1, math.ceil(count * len(section["text"]) / total_chars)) + 1 for section in sections]
+
+	def generate(section, section_count):
+		if before_call:
+			before_call()
+		questions = generate_questions(client, section["text"], section_count, model, level)
+		return [{**question, "section": section["title"]} for question in questions]
+
+	# One thread per call, so they all run at once (max_workers caps it, e.g. under a rate limit)
+	workers = min(max_workers, len(sections)) if max_workers else len(sections)
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		results = list(executor.map(generate, sections, per_section))
+
+	questions = [question for section_questions in results for question in section_questions]
+	return balance_questions(deduplicate_questions(questions), count)
+
+def format_questions(questions) -> str:
+	return "\n\n".join(f"[{question['section']}]\n{format_question(question, i)}"
+						 for i, question in enumerate(questions, 1))
+
+def run_task_2(api_key: str, bank=None):
 	client = Groq(api_key=api_key)
 	path = input("📄 Enter the path to your course PDF: ").strip()
 	try:
-		doc = fitz.open(path)
-		text = "\n".join(page.get_text() for page in doc)
-		doc.close()
+		sections = extract_sections(path)
 	except Exception as e:
 		print(f"❌ Error reading PDF: {e}")
 		return
 
-	prompt = (
-		f"Generate 5 multiple choice questions from the content below. "
-		f"Each question should include 1 correct answer and 3 distractors.\n\n{text}"
-	)
+	if bank is None:
+		print(f"📑 {len(sections)} section(s), generating questions in parallel...")
+		questions = generate_questions_map_reduce(client, path, sections=sections)
+	else:
+		topic = input("🏷️ Topic (optional): ").strip() or None
+		level = input("🎓 Student level [beginner/intermediate/advanced] (optional): ").strip() or None
+		questions, reused = bank.get_or_generate(
+			5, lambda missing: generate_questions_map_reduce(client, path, missing, sections=sections, level=level),
+			material_hash=file_sha256(path), topic=topic, level=level, model=QUESTION_MODEL)
+		if reused:
+			print(f"📦 {reused} question(s) served from the question bank.")
 
-	response = client.chat.completions.create(
-		model="llama3-8b-8192",
-		messages=[{"role": "user", "content": prompt}]
-	)
 	print("\n🧠 Generated Questions from PDF:\n")
-	print(response.choices[0].message.content)
+	print(format_questions(questions))
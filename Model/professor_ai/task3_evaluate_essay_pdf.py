@@ -1,28 +1,95 @@
 # task3_evaluate_essay_pdf.py – Evaluate student essay from a PDF
 
-import fitz
+import json
+import re
+
 from groq import Groq
 
-def run_task_3(api_key: str):
-	client = Groq(api_key=api_key)
-	path = input("📄 Enter the path to the student's essay PDF: ").strip()
+try:
+	from pdf_agent.text_cache import extract_text
+except ImportError:
 	try:
-		doc = fitz.open(path)
-		text = "\n".join(page.get_text() for page in doc)
-		doc.close()
-	except Exception as e:
-		print(f"❌ Error reading PDF: {e}")
-		return
+		from Model.pdf_agent.text_cache import extract_text
+	except ImportError:
+		import os
+		import sys
+		sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+		from Model.pdf_agent.text_cache import extract_text
+
+GRADING_MODEL = "llama3-8b-8192"
+CRITERIA = ("content", "structure", "grammar", "coherence")
+
+def extract_essay_text(path: str = None, data: bytes = None) -> str:
+	return extract_text(path, data)
 
+def evaluate_essay(client, text: str, model: str = GRADING_MODEL) -> dict:
+	"""Grade an essay. Returns {"score", "criteria": {name: {"score", "comment"}}, "summary", "improvements"}."""
 	prompt = (
 		"Evaluate the following student essay. Analyze content, structure, grammar, and coherence. "
-		"Then give a score from 1 to 10 and a summary of improvements.\n\n"
+		"Then give a score from 1 to 10 and a summary of improvements.\n"
+		"Answer with a JSON object only, in this format:\n"
+		'{"score": <1-10>, "criteria": {"content": {"score": <1-10>, "comment": "..."}, '
+		'"structure": {...}, "grammar": {...}, "coherence": {...}}, '
+		'"summary": "...", "improvements": ["...", "..."]}\n\n'
 		f"Essay:\n{text}"
 	)
 
 	response = client.chat.completions.create(
-		model="llama3-8b-8192",
-		messages=[{"role": "user", "content": prompt}]
+		model=model,
+		messages=[{"role": "user", "content": prompt}],
+		response_format={"type": "json_object"}
 	)
+	return parse_evaluation(response.choices[0].message.content)
+
+def parse_evaluation(answer: str) -> dict:
+	try:
+		match = re.search(r"\{.*\}", answer, re.DOTALL)
+		evaluation = json.loads(match.group() if match else answer)
+	except (json.JSONDecodeError, AttributeError):
+		evaluation = None
+	if not isinstance(evaluation, dict):
+		# The model ignored the format (or answered with a bare number or string):
+		# keep the text and look for an "x/10" score in it
+		score = re.search(r"(\d+(?:\.\d+)?)\s*/\s*10", answer)
+		evaluation = {"score": float(score.group(1)) if score else None, "criteria": {}, "summary": answer, "improvements": []}
+
+	# Missing, null or mistyped fields get their empty value, so callers can rely on the types
+	evaluation["score"] = _to_score(evaluation.get("score"))
+	if not isinstance(evaluation.get("criteria"), dict):
+		evaluation["criteria"] = {}
+	if not isinstance(evaluation.get("summary"), str):
+		evaluation["summary"] = "" if evaluation.get("summary") is None else str(evaluation["summary"])
+	improvements = evaluation.get("improvements")
+	if not isinstance(improvements, list):
+		evaluation["improvements"] = [] if improvements is None else [str(improvements)]
+	return evaluation
+
+def _to_score(value):
+	try:
+		return float(value)
+	except (TypeError, ValueError):
+		return None
+
+def format_evaluation(evaluation: dict) -> str:
+	lines = [f"Score: {evaluation['score']}/10"]
+	for name in CRITERIA:
+		criterion = evaluation["criteria"].get(name)
+		if isinstance(criterion, dict):
+			lines.append(f"- {name.capitalize()} ({criterion.get('score')}/10): {criterion.get('comment', '')}")
+	lines.append(f"\nSummary: {evaluation['summary']}")
+	if evaluation["improvements"]:
+		lines.append("Improvements:")
+		lines.extend(f"  • {item}" for item in evaluation["improvements"])
+	return "\n".join(lines)
+
+def run_task_3(api_key: str):
+	client = Groq(api_key=api_key)
+	path = input("📄 Enter the path to the student's essay PDF: ").strip()
+	try:
+		text = extract_essay_text(path)
+	except Exception as e:
+		print(f"❌ Error reading PDF: {e}")
+		return
+
 	print("\n📝 Essay Evaluation:\n")
-	print(response.choices[0].message.content)
+	print(format_evaluation(evaluate_essay(client, text)))
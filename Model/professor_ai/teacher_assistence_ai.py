@@ -1,4 +1,5 @@
 import os
+from question_bank import open_question_bank
 from task1_generate_questions import run_task_1
 from task2_generate_from_pdf import run_task_2
 from task3_evaluate_essay_pdf import run_task_3
@@ -6,6 +7,8 @@ from task4_custom_material import run_task_4
 
 def main():
 	api_key = input("Enter your Groq API key: ").strip()
+	# Generated questions are kept in MongoDB and reused for the same material or topic
+	bank = open_question_bank(os.environ.get("MONGO_URI", "mongodb://localhost:27017/"))
 
 	while True:
 		print("\nAI Assistant for Teachers: Choose a task")
@@ -17,9 +20,9 @@ def main():
 		choice = input("Enter choice: ").strip()
 
 		if choice == "1":
-			run_task_1(api_key)
+			run_task_1(api_key, bank)
 		elif choice == "2":
-			run_task_2(api_key)
+			run_task_2(api_key, bank)
 		elif choice == "3":
 			run_task_3(api_key)
 		elif choice == "4":
@@ -1,15 +1,47 @@
 # ai_web_search_assistant/main.py – single-language source (ro/en) version
+#
+# WebSearchAssistant can be imported and reused: configuration is passed to the constructor
+# (or read from OPENAI_API_KEY / SERP_API_KEY), and one instance keeps a warm OpenAI client,
+# the search cache and the page fetcher for all the questions it answers, from any thread.
+# Running this file starts the interactive console version.
 
 import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import parse_qsl, urlencode, urlsplit
 from openai import OpenAI
-from serpapi import GoogleSearch
 import langdetect
 
+try:
+	from search_cache import SearchCache, create_search_backend
+	from page_fetcher import PageFetcher, best_passages, format_passages
+except ImportError:
+	from Model.scraping_agent.search_cache import SearchCache, create_search_backend
+	from Model.scraping_agent.page_fetcher import PageFetcher, best_passages, format_passages
+
+try:
+	from monitoring.metrics import track_llm_call
+except ImportError:
+	try:
+		from Model.monitoring.metrics import track_llm_call
+	except ImportError:
+		import sys
+		sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+		from Model.monitoring.metrics import track_llm_call
+
 # CONFIG
-OPENAI_API_KEY = input("🔑 Enter your OpenAI API key: ") 
-SERP_API_KEY = input("🔑 Enter your SerpAPI key: ")
+SOURCES = ("general", "scholar", "youtube.com", "all")
+# "All sources" mode: every engine is queried in parallel, within one shared deadline
+ALL_SOURCES = ("general", "scholar", "youtube.com")
+SEARCH_DEADLINE = float(os.environ.get("SEARCH_DEADLINE", "6"))
+MERGED_RESULTS = 5
+
+# Fetch stage: the top result pages are downloaded and their best passages added to the context
+FETCH_PAGES = os.environ.get("FETCH_PAGES", "1") != "0"
+FETCH_TOP_PAGES = 4
+FETCH_DEADLINE = float(os.environ.get("FETCH_DEADLINE", "8"))
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+DEFAULT_MODEL = os.environ.get("WEB_SEARCH_MODEL", "gpt-4o")
+OPENAI_TIMEOUT = float(os.environ.get("WEB_SEARCH_OPENAI_TIMEOUT", "60"))
 
 def get_user_preferences():
 	print("\n🔧 Set your search preferences:")
@@ -34,12 +66,13 @@ def get_user_preferences():
 	}
 	level = levels.get(level_choice, "elev")
 
-	print("3. Resource Type: [1] General Web [2] Academic [3] Videos")
+	print("3. Resource Type: [1] General Web [2] Academic [3] Videos [4] All sources")
 	source_choice = input("Enter resource type: ").strip()
 	sources = {
 		"1": "general",
 		"2": "scholar",
-		"3": "youtube.com"
+		"3": "youtube.com",
+		"4": "all"
 	}
 	source = sources.get(source_choice, "general")
 
@@ -54,26 +87,46 @@ def build_query(question: str, domain: str, level: str, source: str, lang: str =
 	else:
 		return f"{question} {domain} {level}{lang_filter}"
 
-def search_web(query: str, mode: str = "general") -> str:
-	print(f"\n🌐 Searching the web for: {query} [mode: {mode}]\n")
-	params = {
+def search_params(query: str, mode: str = "general", num: int = 3) -> dict:
+	return {
 		"q": query,
-		"api_key": SERP_API_KEY,
-		"num": 3,
+		"num": num,
 		"engine": "google_scholar" if mode == "scholar" else "google"
 	}
-	search = GoogleSearch(params)
-	results = search.get_dict()
 
+def format_results(results: list) -> str:
 	output = []
-	for r in results.get("organic_results", [])[:3]:
+	for r in results:
 		title = r.get("title", "Fără titlu")
 		link = r.get("link", "Fără link")
 		snippet = r.get("snippet", "")
-		output.append(f"{title}\n{link}\n{snippet}\n")
-
+		label = f"[{r['source']}] " if r.get("source") else ""
+		output.append(f"{label}{title}\n{link}\n{snippet}\n")
 	return "\n".join(output)
 
+def normalize_url(url: str) -> str:
+	# The same page found by two engines: ignore scheme, "www.", trailing slash and tracking parameters
+	parts = urlsplit(url)
+	host = parts.netloc.lower().removeprefix("www.")
+	query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not k.startswith("utm_")])
+	return f"{host}{parts.path.rstrip('/')}" + (f"?{query}" if query else "")
+
+def merge_results(results_by_source: dict, limit: int = MERGED_RESULTS) -> list:
+	"""Deduplicate by URL and rank with reciprocal rank fusion: pages found by several engines go first."""
+	merged = {}
+	for source, results in results_by_source.items():
+		for rank, result in enumerate(results):
+			link = result.get("link")
+			if not link:
+				continue
+			key = normalize_url(link)
+			entry = merged.setdefault(key, {**result, "source": source, "score": 0.0})
+			entry["score"] += 1.0 / (60 + rank + 1)
+			# Keep the longest snippet seen for the page
+			if len(result.get("snippet", "")) > len(entry.get("snippet", "")):
+				entry["snippet"] = result["snippet"]
+	return sorted(merged.values(), key=lambda r: r["score"], reverse=True)[:limit]
+
 def detect_language(text: str) -> str:
 	try:
 		lang = langdetect.detect(text)
@@ -81,7 +134,7 @@ def detect_language(text: str) -> str:
 	except:
 		return "ro"  # fallback în română dacă nu e detectabil
 
-def ask_ai(question: str, context: str, domain: str, level: str, source: str, lang: str) -> str:
+def build_prompt(question: str, context: str, domain: str, level: str, source: str, lang: str) -> str:
 	if lang == "ro":
 		intro = (
 			f"Ești un asistent educațional care ajută un elev de nivel {level} interesat de domeniul {domain}.")
@@ -96,37 +149,156 @@ def ask_ai(question: str, context: str, domain: str, level: str, source: str, la
 			" You have access to one online source. Provide a short, clear explanation, followed by guiding questions. "
 			"Include a relevant source link."
 		)
+	if source == "all":
+		guidance += (
+			" Sursele provin din web, articole academice și videoclipuri; folosește-le pe cele mai relevante."
+			if lang == "ro" else
+			" The sources come from the web, academic papers and videos; use the most relevant ones."
+		)
 
-	prompt = (
+	return (
 		f"{intro}\n{guidance}\n\n"
 		f"Search Result:\n{context}\n\n"
 		f"Student Question: {question}\n\n"
 		"Generate the answer based on the single-language source above."
 	)
 
-	response = client.chat.completions.create(
-		model="gpt-4o",
-		messages=[
-			{"role": "system", "content": "You are a helpful AI tutor."},
-			{"role": "user", "content": prompt}
-		]
-	)
-	return response.choices[0].message.content
+class WebSearchAssistant:
+	"""Answers educational questions from web search results. One instance is shared by all callers."""
+
+	def __init__(self, openai_api_key: str = None, serp_api_key: str = None, model: str = DEFAULT_MODEL,
+				 client=None, search_backend=None, search_cache=None, page_fetcher=None,
+				 fetch_pages: bool = FETCH_PAGES, search_deadline: float = SEARCH_DEADLINE,
+				 fetch_deadline: float = FETCH_DEADLINE, embedder_provider=None):
+		self.model = model
+		self.client = client or OpenAI(api_key=openai_api_key or os.environ.get("OPENAI_API_KEY"),
+									   timeout=OPENAI_TIMEOUT)
+		# Repeated questions are answered from the on-disk cache instead of a paid SerpAPI call
+		self.search_backend = search_backend or create_search_backend(serp_api_key or os.environ.get("SERP_API_KEY"))
+		self.search_cache = search_cache or SearchCache()
+		self.fetch_pages = fetch_pages
+		self.page_fetcher = page_fetcher or (PageFetcher() if fetch_pages else None)
+		self.search_deadline = search_deadline
+		self.fetch_deadline = fetch_deadline
+		# embedder_provider() returns the embedding model to rank passages with (e.g. the QA agent's,
+		# so the API process loads it once); without one, page_fetcher loads its own on first use
+		self.embedder_provider = embedder_provider
+		self.search_executor = ThreadPoolExecutor(max_workers=4 * len(ALL_SOURCES), thread_name_prefix="search")
+
+	def search_results(self, query: str, mode: str = "general", num: int = 3) -> list:
+		results = self.search_cache.search(self.search_backend, search_params(query, mode, num))
+		return results.get("organic_results", [])[:num]
+
+	def search_all_sources(self, question: str, domain: str, level: str, lang: str = "en") -> list:
+		futures = {}
+		for source in ALL_SOURCES:
+			query = build_query(question, domain, level, source, lang=lang)
+			futures[self.search_executor.submit(self.search_results, query, source)] = source
+		print(f"\n🌐 Searching {len(futures)} sources in parallel for: {question}\n")
+
+		# Engines that miss the deadline are left out; their results still land in the cache
+		done, not_done = wait(futures, timeout=self.search_deadline)
+		results_by_source = {}
+		for future in done:
+			try:
+				results_by_source[futures[future]] = future.result()
+			except Exception as e:
+				print(f"⚠️ {futures[future]} search failed: {e}")
+		for future in not_done:
+			print(f"⚠️ {futures[future]} search did not answer within {self.search_deadline:.0f}s")
+		return merge_results(results_by_source)
+
+	def search(self, question: str, domain: str, level: str, source: str, lang: str = "en") -> list:
+		if source == "all":
+			return self.search_all_sources(question, domain, level, lang=lang)
+		mode = source if source == "scholar" else "general"
+		query = build_query(question, domain, level, source, lang=lang)
+		print(f"\n🌐 Searching the web for: {query} [mode: {mode}]\n")
+		return self.search_results(query, mode)
+
+	def page_passages(self, question: str, results: list, top_pages: int = FETCH_TOP_PAGES) -> str:
+		# Videos have no readable text, only the web and scholar results are fetched
+		urls = [r["link"] for r in results if r.get("link") and "youtube.com" not in r["link"]][:top_pages]
+		if not urls:
+			return ""
+		print(f"📄 Reading {len(urls)} result pages...")
+		pages = self.page_fetcher.fetch_all(urls, deadline=self.fetch_deadline)
+		try:
+			embedder = self.embedder_provider() if self.embedder_provider else None
+			return format_passages(best_passages(question, pages, embedder=embedder))
+		except Exception as e:
+			print(f"⚠️ Could not rank the page passages: {e}")
+			return ""
+
+	def build_context(self, question: str, results: list) -> str:
+		context = format_results(results)
+		if self.fetch_pages:
+			passages = self.page_passages(question, results)
+			if passages:
+				context += f"\n\nRelevant passages from the pages:\n{passages}"
+		return context
+
+	def ask_ai(self, question: str, context: str, domain: str, level: str, source: str, lang: str) -> str:
+		response = track_llm_call(
+			"openai",
+			self.model,
+			self.client.chat.completions.create,
+			messages=[
+				{"role": "system", "content": "You are a helpful AI tutor."},
+				{"role": "user", "content": build_prompt(question, context, domain, level, source, lang)}
+			]
+		)
+		return response.choices[0].message.content
+
+	def answer(self, question: str, domain: str = "general", level: str = "elev", source: str = "general",
+			   lang: str = None) -> dict:
+		"""
+		Search the web for a question and answer it from the results.
+
+		Args:
+			question: The student's question
+			domain: Subject area, e.g. "matematică"
+			level: Student level, e.g. "liceu" or "universitate"
+			source: One of SOURCES
+			lang: "ro" or "en"; detected from the question when omitted
+
+		Returns:
+			Dict with the answer, the language and the sources used
+		"""
+		if source not in SOURCES:
+			raise ValueError(f"Unknown source '{source}'. Choose from: {', '.join(SOURCES)}")
+		lang = lang or detect_language(question)
+		results = self.search(question, domain, level, source, lang=lang)
+		answer = self.ask_ai(question, self.build_context(question, results), domain, level, source, lang)
+		return {
+			"answer": answer,
+			"lang": lang,
+			"sources": [{"title": r.get("title"), "link": r.get("link"), "source": r.get("source", source)}
+						for r in results]
+		}
+
+	def close(self):
+		self.search_executor.shutdown(wait=False)
+		if self.page_fetcher is not None:
+			self.page_fetcher.close()
 
 def main():
+	# Keys from the environment; asked for only when missing
+	openai_api_key = os.environ.get("OPENAI_API_KEY") or input("🔑 Enter your OpenAI API key: ")
+	serp_api_key = os.environ.get("SERP_API_KEY") or input("🔑 Enter your SerpAPI key: ")
+	assistant = WebSearchAssistant(openai_api_key=openai_api_key, serp_api_key=serp_api_key)
 	domain, level, source_type = get_user_preferences()
 
-	while True:
-		question = input("\n❓ Ask your educational question (or type 'exit'): ")
-		if question.lower() == "exit":
-			break
-
-		lang = detect_language(question)
-		query = build_query(question, domain, level, source_type, lang=lang)
-		results = search_web(query, mode=source_type if source_type == "scholar" else "general")
+	try:
+		while True:
+			question = input("\n❓ Ask your educational question (or type 'exit'): ")
+			if question.lower() == "exit":
+				break
 
-		ai_reply = ask_ai(question, results, domain, level, source_type, lang)
-		print(f"\n🤖 AI Response:\n{ai_reply}")
+			reply = assistant.answer(question, domain, level, source_type)
+			print(f"\n🤖 AI Response:\n{reply['answer']}")
+	finally:
+		assistant.close()
 
 if __name__ == "__main__":
-	main()
\ No newline at end of file
+	main()
@@ -0,0 +1,205 @@
+# page_fetcher.py – Fetch search result pages concurrently and retrieve the best passages
+#
+# Search snippets are only a sentence or two. This stage downloads the top result pages
+# over one pooled HTTP client (with a per-host concurrency limit, timeouts and a size cap),
+# extracts their readable text, splits it into passages and embeds them into a short-lived
+# index, so the answer can be grounded in the passages closest to the question.
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+
+import httpx
+
+FETCH_TIMEOUT = float(os.environ.get("FETCH_TIMEOUT", "5"))
+FETCH_MAX_BYTES = int(os.environ.get("FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+FETCH_MAX_CONNECTIONS = int(os.environ.get("FETCH_MAX_CONNECTIONS", "16"))
+FETCH_PER_HOST = int(os.environ.get("FETCH_PER_HOST", "2"))
+PASSAGE_CHARS = 800
+PASSAGE_OVERLAP = 150
+
+SKIPPED_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe", "template"}
+BLOCK_TAGS = {"p", "div", "li", "ul", "ol", "br", "tr", "td", "th", "pre", "blockquote", "section", "article",
+			  "h1", "h2", "h3", "h4", "h5", "h6", "dd", "dt", "table", "main"}
+VOID_TAGS = {"br", "img", "hr", "meta", "link", "input", "source", "wbr", "area", "base", "col", "embed", "param", "track"}
+
+class _TextExtractor(HTMLParser):
+	def __init__(self):
+		super().__init__(convert_charrefs=True)
+		self.parts = []
+		self.title = ""
+		self.skipping = 0
+		self.in_title = False
+
+	def handle_starttag(self, tag, attrs):
+		if tag in VOID_TAGS:
+			if tag == "br":
+				self.parts.append("\n")
+			return
+		if tag in SKIPPED_TAGS:
+			self.skipping += 1
+		elif tag == "title":
+			self.in_title = True
+		elif tag in BLOCK_TAGS:
+			self.parts.append("\n")
+
+	def handle_endtag(self, tag):
+		if tag in SKIPPED_TAGS:
+			self.skipping = max(0, self.skipping - 1)
+		elif tag == "title":
+			self.in_title = False
+		elif tag in BLOCK_TAGS:
+			self.parts.append("\n")
+
+	def handle_data(self, data):
+		if self.in_title:
+			self.title += data
+		elif not self.skipping:
+			self.parts.append(data)
+
+def extract_readable_text(html: str):
+	"""Return (title, text) of an HTML page, without scripts, styles and navigation."""
+	parser = _TextExtractor()
+	parser.feed(html)
+	parser.close()
+	lines = (re.sub(r"[ \t\r\f\v]+", " ", line).strip() for line in "".join(parser.parts).split("\n"))
+	# Menus and buttons are short lines; keep lines that read like sentences
+	text = "\n".join(line for line in lines if len(line) >= 40 or line.endswith((".", "?", "!", ":")))
+	return parser.title.strip(), text
+
+def split_passages(text: str, size: int = PASSAGE_CHARS, overlap: int = PASSAGE_OVERLAP):
+	passages, start = [], 0
+	while start < len(text):
+		end = min(len(text), start + size)
+		# End on a sentence or line boundary when there is one close by
+		boundary = max(text.rfind(". ", start + size // 2, end), text.rfind("\n", start + size // 2, end))
+		if end < len(text) and boundary > 0:
+			end = boundary + 1
+		passage = text[start:end].strip()
+		if len(passage) >= 80:
+			passages.append(passage)
+		if end >= len(text):
+			break
+		start = max(end - overlap, start + 1)
+	return passages
+
+class PageFetcher:
+	"""One pooled HTTP client, shared by all fetches, with at most `per_host` requests per host at a time."""
+
+	def __init__(self, max_connections: int = FETCH_MAX_CONNECTIONS, per_host: int = FETCH_PER_HOST,
+				 timeout: float = FETCH_TIMEOUT, max_bytes: int = FETCH_MAX_BYTES):
+		self.per_host = per_host
+		self.timeout = timeout
+		self.max_bytes = max_bytes
+		self.client = httpx.Client(
+			limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+			timeout=httpx.Timeout(timeout, connect=min(timeout, 3.0)),
+			follow_redirects=True,
+			headers={"User-Agent": "Mozilla/5.0 (compatible; EduSearchAssistant/1.0)"}
+		)
+		self.executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="fetch")
+		self.host_limits = {}
+		self.lock = threading.Lock()
+
+	def _host_limit(self, url: str):
+		host = httpx.URL(url).host
+		with self.lock:
+			return self.host_limits.setdefault(host, threading.Semaphore(self.per_host))
+
+	def fetch(self, url: str) -> dict:
+		"""Download one page and extract its text. Returns {"url", "title", "text"}."""
+		with self._host_limit(url):
+			started = time.monotonic()
+			with self.client.stream("GET", url) as response:
+				response.raise_for_status()
+				content_type = response.headers.get("content-type", "").lower()
+				body = bytearray()
+				for block in response.iter_bytes():
+					body.extend(block)
+					if len(body) > self.max_bytes:
+						break
+					# The timeout covers each read; this bounds the whole download
+					if time.monotonic() - started > self.timeout * 2:
+						raise httpx.ReadTimeout("Page download took too long")
+				encoding = response.encoding or "utf-8"
+		body = bytes(body)
+
+		if "pdf" in content_type or url.lower().endswith(".pdf"):
+			return {"url": url, "title": "", "text": _pdf_text(body)}
+		title, text = extract_readable_text(body.decode(encoding, errors="replace"))
+		return {"url": url, "title": title, "text": text}
+
+	def fetch_all(self, urls, deadline: float = None) -> list:
+		"""Fetch pages concurrently; pages that fail or miss the deadline are skipped."""
+		futures = {self.executor.submit(self.fetch, url): url for url in dict.fromkeys(urls)}
+		done, not_done = wait(futures, timeout=deadline or self.timeout * 2)
+		pages = []
+		for future in futures:
+			if future not in done:
+				continue
+			try:
+				page = future.result()
+			except Exception as e:
+				print(f"⚠️ Could not fetch {futures[future]}: {e}")
+				continue
+			if page["text"].strip():
+				pages.append(page)
+		for future in not_done:
+			print(f"⚠️ {futures[future]} did not answer in time")
+		return pages
+
+	def close(self):
+		self.executor.shutdown(wait=False)
+		self.client.close()
+
+def _pdf_text(data: bytes) -> str:
+	try:
+		from pdf_agent.text_cache import extract_text
+	except ImportError:
+		_add_model_path()
+		from Model.pdf_agent.text_cache import extract_text
+	return extract_text(data=data)
+
+def _add_model_path():
+	import sys
+	root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+	if root not in sys.path:
+		sys.path.append(root)
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def get_embedder():
+	# Loaded on first use and kept warm: the same model the PDF agent uses
+	global _embedder
+	with _embedder_lock:
+		if _embedder is None:
+			try:
+				from pdf_agent.embeddings import create_embedder
+			except ImportError:
+				_add_model_path()
+				from Model.pdf_agent.embeddings import create_embedder
+			_embedder = create_embedder()
+		return _embedder
+
+def best_passages(question: str, pages: list, top_k: int = 4, embedder=None) -> list:
+	"""Embed the passages of the fetched pages into a throwaway index and return the closest ones."""
+	passages = [{"url": page["url"], "title": page["title"], "text": passage}
+				for page in pages for passage in split_passages(page["text"])]
+	if not passages:
+		return []
+	try:
+		from pdf_agent.retrieval import ExactIndex
+	except ImportError:
+		_add_model_path()
+		from Model.pdf_agent.retrieval import ExactIndex
+
+	embedder = embedder or get_embedder()
+	index = ExactIndex(embedder.encode([p["text"] for p in passages]))
+	return [passages[i] for i in index.search(embedder.encode(question), top_k)]
+
+def format_passages(passages: list) -> str:
+	return "\n\n".join(f"{p['title'] or p['url']}\n{p['url']}\n{p['text']}" for p in passages)
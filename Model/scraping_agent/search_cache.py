@@ -0,0 +1,175 @@
+# search_cache.py – Persistent cache and pluggable backends for web search results
+#
+# Results are stored in SQLite, keyed by (query, engine, num). An entry is fresh for
+# `ttl` seconds; with stale-while-revalidate, an expired entry younger than
+# `ttl + stale` is still returned at once while a background thread refreshes it.
+# The least recently used entries are evicted beyond `max_entries`.
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+SEARCH_CACHE_FILE = os.path.expanduser(os.environ.get(
+	"SEARCH_CACHE_FILE", os.path.join("~", ".cache", "edu_search", "search_cache.sqlite3")))
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", str(24 * 3600)))
+SEARCH_CACHE_STALE = float(os.environ.get("SEARCH_CACHE_STALE", str(7 * 24 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+class SerpApiBackend:
+	"""Live results from SerpAPI."""
+
+	def __init__(self, api_key: str):
+		self.api_key = api_key
+
+	def search(self, params: dict) -> dict:
+		from serpapi import GoogleSearch
+		return GoogleSearch({**params, "api_key": self.api_key}).get_dict()
+
+class FileSearchBackend:
+	"""Offline stand-in: results read from a JSON fixture file, {"<engine>|<num>|<query>": results}.
+
+	Queries missing from the file get generated results, so any question works offline.
+	With `record_from`, missing queries are fetched from that backend and saved to the file.
+	"""
+
+	def __init__(self, path: str, record_from=None):
+		self.path = path
+		self.record_from = record_from
+		self.lock = threading.Lock()
+		self.calls = 0
+		self.fixtures = {}
+		if os.path.exists(path):
+			with open(path, "r", encoding="utf-8") as f:
+				self.fixtures = json.load(f)
+
+	def search(self, params: dict) -> dict:
+		key = f"{params['engine']}|{params['num']}|{params['q']}"
+		with self.lock:
+			self.calls += 1
+			if key in self.fixtures:
+				return self.fixtures[key]
+		if self.record_from is None:
+			return fake_results(params)
+
+		results = self.record_from.search(params)
+		with self.lock:
+			self.fixtures[key] = results
+			tmp_path = f"{self.path}.tmp"
+			with open(tmp_path, "w", encoding="utf-8") as f:
+				json.dump(self.fixtures, f, ensure_ascii=False, indent=2)
+			os.replace(tmp_path, self.path)
+		return results
+
+def fake_results(params: dict) -> dict:
+	slug = re.sub(r"[^a-z0-9]+", "-", params["q"].lower()).strip("-")[:60]
+	return {"organic_results": [
+		{
+			"position": i + 1,
+			"title": f"{params['q']} – result {i + 1}",
+			"link": f"https://example.org/{params['engine']}/{slug}/{i + 1}",
+			"snippet": f"Offline result {i + 1} for '{params['q']}'."
+		}
+		for i in range(params["num"])
+	]}
+
+def create_search_backend(api_key: str = None):
+	"""SEARCH_BACKEND=file (with SEARCH_FIXTURES) selects the offline backend; SerpAPI otherwise."""
+	if os.environ.get("SEARCH_BACKEND", "serpapi") == "file":
+		return FileSearchBackend(os.environ.get("SEARCH_FIXTURES", "search_fixtures.json"))
+	return SerpApiBackend(api_key)
+
+def cache_key(params: dict) -> str:
+	# The API key is deliberately not part of the key
+	identity = {"q": params["q"], "engine": params["engine"], "num": params["num"]}
+	return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+
+class SearchCache:
+	def __init__(self, path: str = SEARCH_CACHE_FILE, ttl: float = SEARCH_CACHE_TTL,
+				 stale: float = SEARCH_CACHE_STALE, max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+		self.ttl = ttl
+		self.stale = stale
+		self.max_entries = max_entries
+		self.lock = threading.Lock()
+		self.refreshing = set()
+		self.stats = {"hit": 0, "stale": 0, "miss": 0}
+
+		if os.path.dirname(path):
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+		self.db = sqlite3.connect(path, check_same_thread=False)
+		self.db.execute("PRAGMA journal_mode=WAL")
+		self.db.execute(
+			"CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, query TEXT, engine TEXT, num INTEGER, "
+			"results TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+		self.db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+		self.db.commit()
+
+	def get(self, params: dict):
+		"""Return (results, age in seconds) or (None, None)."""
+		key = cache_key(params)
+		now = time.time()
+		with self.lock:
+			row = self.db.execute("SELECT results, created FROM results WHERE key = ?", (key,)).fetchone()
+			if row is None:
+				return None, None
+			self.db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+			self.db.commit()
+		return json.loads(row[0]), now - row[1]
+
+	def put(self, params: dict, results: dict):
+		now = time.time()
+		with self.lock:
+			self.db.execute(
+				"INSERT OR REPLACE INTO results (key, query, engine, num, results, created, accessed) "
+				"VALUES (?, ?, ?, ?, ?, ?, ?)",
+				(cache_key(params), params["q"], params["engine"], params["num"],
+				 json.dumps(results, ensure_ascii=False), now, now))
+			# Least recently used entries go first once the cache is full
+			self.db.execute(
+				"DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+				(self.max_entries,))
+			self.db.commit()
+
+	def search(self, backend, params: dict) -> dict:
+		"""Cached backend.search(params)."""
+		results, age = self.get(params)
+		if results is not None and age <= self.ttl:
+			self._count("hit")
+			return results
+		if results is not None and age <= self.ttl + self.stale:
+			self._count("stale")
+			self._refresh_in_background(backend, params)
+			return results
+
+		self._count("miss")
+		results = backend.search(params)
+		if "error" not in results:
+			self.put(params, results)
+		return results
+
+	def _count(self, outcome: str):
+		with self.lock:
+			self.stats[outcome] += 1
+
+	def _refresh_in_background(self, backend, params: dict):
+		key = cache_key(params)
+		with self.lock:
+			if key in self.refreshing:
+				return
+			self.refreshing.add(key)
+
+		def refresh():
+			try:
+				results = backend.search(params)
+				if "error" not in results:
+					self.put(params, results)
+			except Exception as e:
+				print(f"⚠️ Background search refresh failed: {e}")
+			finally:
+				with self.lock:
+					self.refreshing.discard(key)
+
+		threading.Thread(target=refresh, name="search-refresh", daemon=True).start()
@@ -17,11 +17,10 @@ def install_dependencies():
     required_packages = [
         'openai',          # OpenAI API client for guide mode
         'groq',            # Groq API client for QA mode
-        'pypdf',           # PDF processing 
         'sentence-transformers',  # Text embeddings for PDF search
         'numpy',           # Numerical operations
         'langdetect',      # Language detection for multilingual support
-        'fitz',            # PyMuPDF for PDF processing
+        'pymupdf',         # PDF text extraction (imported as fitz)
         'serpapi',         # For web search functionality
         'pycryptodome',    # For any encryption needs
         'python-dotenv',   # For environment variable management
@@ -34,6 +33,8 @@ def install_dependencies():
         'pandas',          # For data manipulation
         'matplotlib',      # For visualization
         'scikit-learn',    # For machine learning capabilities
+        'onnxruntime',     # Faster CPU embeddings (EMBEDDING_BACKEND=onnx or onnx-int8)
+        'onnx',            # Needed once, to export the embedding model
     ]
     
     # Check if pip is available